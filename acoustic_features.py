@@ -0,0 +1,100 @@
+"""
+Shared acoustic features for the fallback language detector
+A single STFT per clip feeds the mel spectrogram, onset envelope, tempo,
+spectral centroid and MFCCs (instead of one STFT per librosa call). The STFT
+is computed in chunks so long recordings stay within bounded memory, and the
+features are cached per waveform.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils import SAMPLE_RATE
+
+
+# librosa's defaults, so the features match beat_track / spectral_centroid / mfcc on y
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+N_MFCC = 13
+
+# Audio per STFT chunk (seconds)
+CHUNK_SECONDS = 60
+
+MAX_CACHED_CLIPS = 8
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def waveform_key(samples):
+    """Cheap content key for a float32 waveform"""
+    digest = hashlib.blake2b(np.ascontiguousarray(samples).tobytes(), digest_size=16).hexdigest()
+    return f"{len(samples)}:{digest}"
+
+
+def _magnitude_chunks(samples, chunk_seconds=CHUNK_SECONDS):
+    """
+    |STFT| of a clip, chunk by chunk. Frames line up exactly with
+    librosa.stft(center=True, pad_mode="constant") on the whole clip.
+    """
+    import librosa
+
+    padded = np.pad(samples, N_FFT // 2)
+    num_frames = 1 + (len(padded) - N_FFT) // HOP_LENGTH
+    frames_per_chunk = max(1, int(chunk_seconds * SAMPLE_RATE) // HOP_LENGTH)
+
+    for first in range(0, num_frames, frames_per_chunk):
+        last = min(first + frames_per_chunk, num_frames)
+        chunk = padded[first * HOP_LENGTH:(last - 1) * HOP_LENGTH + N_FFT]
+        yield np.abs(librosa.stft(chunk, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False))
+
+
+def compute_features(samples, sr=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS):
+    """
+    Fallback features from one chunked STFT.
+    Returns: {"tempo", "spectral_centroid", "mfcc_var", "seconds"}
+    """
+    import librosa
+
+    samples = np.asarray(samples, dtype=np.float32)
+    if len(samples) < N_FFT:
+        samples = np.pad(samples, (0, N_FFT - len(samples)))
+    mel_basis = librosa.filters.mel(sr=sr, n_fft=N_FFT, n_mels=N_MELS)
+
+    centroids = []
+    mel_chunks = []
+    for magnitude in _magnitude_chunks(samples, chunk_seconds):
+        centroids.append(librosa.feature.spectral_centroid(S=magnitude, sr=sr, n_fft=N_FFT)[0])
+        mel_chunks.append(mel_basis @ magnitude ** 2)
+
+    # dB scaling is clipped relative to the loudest frame, so it runs on the whole clip
+    log_mel = librosa.power_to_db(np.concatenate(mel_chunks, axis=1))
+    mfccs = librosa.feature.mfcc(S=log_mel, n_mfcc=N_MFCC)
+    onset_envelope = librosa.onset.onset_strength(S=log_mel, sr=sr)
+    tempo, _ = librosa.beat.beat_track(onset_envelope=onset_envelope, sr=sr, hop_length=HOP_LENGTH)
+
+    return {
+        "tempo": float(np.atleast_1d(tempo)[0]),
+        "spectral_centroid": float(np.mean(np.concatenate(centroids))),
+        "mfcc_var": float(np.var(mfccs)),
+        "seconds": round(len(samples) / sr, 2),
+    }
+
+
+def acoustic_features(samples, sr=SAMPLE_RATE):
+    """compute_features, cached per waveform (the last MAX_CACHED_CLIPS clips)"""
+    key = waveform_key(samples)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return dict(_cache[key])
+
+    features = compute_features(samples, sr)
+    with _cache_lock:
+        _cache[key] = features
+        while len(_cache) > MAX_CACHED_CLIPS:
+            _cache.popitem(last=False)
+    return dict(features)
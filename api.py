@@ -0,0 +1,320 @@
+"""
+HTTP JSON API alongside the Streamlit UI
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+POST /analyze     {"url": "..."} as JSON, or a multipart upload with a "file" field
+                  (optional: "max_duration", "vad") -> {"job_id": ..., "status": "queued"}
+GET  /jobs/{id}   job status and, once done, the analysis result
+GET  /health      liveness (the process is serving HTTP)
+GET  /ready       readiness: 503 until every inference worker has warmed up its models
+
+Downloads are async (httpx) so many can be in flight at once, audio decoding
+runs in a thread, and the CPU-bound models run in a separate process pool.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+
+from utils import DOWNLOAD_HEADERS, STREAM_CHUNK_SIZE, extract_audio, analyze_speech, cleanup_files
+from result_cache import analysis_options, get_result_cache, url_fingerprint
+from thread_policy import apply_thread_policy, cpu_count
+
+
+INFERENCE_WORKERS = int(os.environ.get("ACCENT_INFERENCE_WORKERS", "2"))
+# Many workers with one thread each by default; "latency" splits the cores between the workers
+THREAD_POLICY = os.environ.get("ACCENT_THREAD_POLICY", "throughput")
+MAX_CONCURRENT_DOWNLOADS = int(os.environ.get("ACCENT_MAX_DOWNLOADS", "32"))
+
+# Finished jobs beyond this many are forgotten, oldest first
+MAX_JOBS = 1000
+FINISHED_STATES = ("done", "failed")
+
+DEFAULT_VAD = "energy"
+
+# Load and run the models in every worker at start-up (ACCENT_PRELOAD_MODELS picks which)
+WARMUP = os.environ.get("ACCENT_WARMUP", "1") != "0"
+
+_jobs = OrderedDict()
+_tasks = set()
+_pool = None
+_download_slots = None
+_warmup = {"ready": False, "workers": {}}
+
+
+# ---------------------------------------------------------------------------
+# Inference worker processes
+# ---------------------------------------------------------------------------
+
+def _worker_threads():
+    """Threads per worker process under THREAD_POLICY"""
+    if THREAD_POLICY == "throughput":
+        return 1
+    return max(1, cpu_count() // INFERENCE_WORKERS)
+
+
+def _init_worker(warmup_reports=None):
+    """
+    Apply the thread policy in each pool process before any model runs, then
+    (with warm-up on) load and run the preloaded models once and report
+    (pid, ready, status) on warmup_reports. The initializer runs exactly once
+    per process, so every worker is warmed up before it takes a request.
+    """
+    apply_thread_policy(THREAD_POLICY, _worker_threads())
+    if warmup_reports is None:
+        return
+    try:
+        from model_registry import warm_up, is_ready
+        status = warm_up()
+        warmup_reports.put((os.getpid(), is_ready(), status))
+    except Exception as e:
+        warmup_reports.put((os.getpid(), False, {"error": str(e)}))
+
+
+def _analyze_in_worker(waveform, max_duration=None, vad=DEFAULT_VAD):
+    """Runs in a pool process; models are loaded once per worker by the registry"""
+    return analyze_speech(waveform, max_duration=max_duration, vad=vad,
+                          result_cache=get_result_cache(), return_details=True)
+
+
+async def _warm_up_workers(warmup_reports):
+    """Start every worker and wait for its warm-up report; the API is ready once they all succeeded"""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    # Worker processes are started on demand: one task each starts all of them
+    started = [loop.run_in_executor(_pool, os.getpid) for _ in range(INFERENCE_WORKERS)]
+
+    ready = True
+    for _ in range(INFERENCE_WORKERS):
+        pid, worker_ready, status = await loop.run_in_executor(None, warmup_reports.get)
+        ready = ready and worker_ready
+        if "error" in status:
+            _warmup["error"] = status["error"]
+        _warmup["workers"][pid] = {"ready": worker_ready, "models": status}
+
+    await asyncio.gather(*started, return_exceptions=True)
+
+    # One report per process, so this also checks that no worker was counted twice
+    ready = ready and len(_warmup["workers"]) == INFERENCE_WORKERS
+    _warmup["ready"] = ready
+    _warmup["warmup_s"] = round(time.perf_counter() - start, 1)
+    print(f"{'✅' if ready else '⚠️'} Warm-up finished in {_warmup['warmup_s']}s (ready: {ready})")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _pool, _download_slots
+    # Audio decoding in this process follows the same policy as the workers
+    apply_thread_policy(THREAD_POLICY, _worker_threads())
+    warmup_reports = multiprocessing.get_context().Queue() if WARMUP else None
+    _pool = ProcessPoolExecutor(max_workers=INFERENCE_WORKERS, initializer=_init_worker,
+                                initargs=(warmup_reports,))
+    _download_slots = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    if WARMUP:
+        task = asyncio.create_task(_warm_up_workers(warmup_reports))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    else:
+        _warmup["ready"] = True
+    print(f"🚀 API started ({INFERENCE_WORKERS} inference workers, {MAX_CONCURRENT_DOWNLOADS} download slots)")
+    try:
+        yield
+    finally:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="English Language & Accent Detection API", lifespan=lifespan)
+
+
+# ---------------------------------------------------------------------------
+# Async I/O
+# ---------------------------------------------------------------------------
+
+async def download_video_async(url):
+    """Non-blocking counterpart of download_video: streams the body to a temp file"""
+    fd, path = tempfile.mkstemp(suffix='.mp4')
+    os.close(fd)
+    try:
+        async with _download_slots:
+            async with httpx.AsyncClient(headers=DOWNLOAD_HEADERS, timeout=30, follow_redirects=True) as client:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    with open(path, 'wb') as f:
+                        async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                            f.write(chunk)
+        if os.path.getsize(path) == 0:
+            raise RuntimeError("Downloaded file is empty")
+        return path
+    except Exception:
+        cleanup_files(path)
+        raise
+
+
+async def _save_upload(upload):
+    """Copy an uploaded file to a temp file without loading it all into memory"""
+    suffix = os.path.splitext(upload.filename or "")[1] or '.mp4'
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, 'wb') as f:
+        while True:
+            chunk = await upload.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+    await upload.close()
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+def _new_job(source):
+    job_id = uuid.uuid4().hex
+    _jobs[job_id] = {
+        "job_id": job_id,
+        "source": source,
+        "status": "queued",
+        "result": None,
+        "error": None,
+        "created_at": time.time(),
+        "finished_at": None,
+    }
+    # Queued and running jobs are never dropped, only finished ones
+    finished = [old_id for old_id, old_job in _jobs.items() if old_job["status"] in FINISHED_STATES]
+    for old_id in finished[:max(len(_jobs) - MAX_JOBS, 0)]:
+        del _jobs[old_id]
+    return _jobs[job_id]
+
+
+async def _run_job(job, url=None, path=None, max_duration=None, vad=DEFAULT_VAD):
+    url_key = None
+    try:
+        if url:
+            # Re-submitted links with unchanged ETag/Last-Modified skip the download entirely
+            url_key = await asyncio.to_thread(url_fingerprint, url, **analysis_options(max_duration=max_duration, vad=vad))
+            cached = await asyncio.to_thread(get_result_cache().get, url_key)
+            if cached is not None:
+                job["result"] = cached
+                job["status"] = "done"
+                return
+
+            job["status"] = "downloading"
+            path = await download_video_async(url)
+
+        job["status"] = "extracting"
+        waveform = await asyncio.to_thread(extract_audio, path, None, True, max_duration)
+        if waveform is None:
+            raise RuntimeError("Audio extraction failed (no audio track or unsupported format)")
+        cleanup_files(path)
+        path = None
+
+        job["status"] = "analyzing"
+        loop = asyncio.get_running_loop()
+        job["result"] = await loop.run_in_executor(_pool, _analyze_in_worker, waveform, max_duration, vad)
+        job["status"] = "done"
+        await asyncio.to_thread(get_result_cache().put, url_key, job["result"])
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        if path:
+            cleanup_files(path)
+        job["finished_at"] = time.time()
+
+
+def _start_job(job, **kwargs):
+    task = asyncio.create_task(_run_job(job, **kwargs))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _parse_options(values):
+    """max_duration / vad options from a JSON body or form"""
+    max_duration = values.get("max_duration")
+    vad = values.get("vad", DEFAULT_VAD)
+    try:
+        max_duration = float(max_duration) if max_duration not in (None, "") else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="max_duration must be a number")
+    if vad in ("", "none", "off"):
+        vad = None
+    if vad not in (None, "energy", "speechbrain"):
+        raise HTTPException(status_code=400, detail="vad must be 'energy', 'speechbrain' or 'none'")
+    return {"max_duration": max_duration, "vad": vad}
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+
+@app.post("/analyze", status_code=202)
+async def analyze(request: Request):
+    """Queue an analysis for a video URL (JSON) or an uploaded video (multipart)"""
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "read"):
+            raise HTTPException(status_code=400, detail="Missing 'file' upload")
+        options = _parse_options(form)
+        job = _new_job(upload.filename)
+        path = await _save_upload(upload)
+        _start_job(job, path=path, **options)
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Expected a JSON body with 'url' or a file upload")
+        url = body.get("url") if isinstance(body, dict) else None
+        if not isinstance(url, str) or not url.strip().startswith(("http://", "https://")):
+            raise HTTPException(status_code=400, detail="'url' must be an http(s) URL")
+        url = url.strip()
+        options = _parse_options(body)
+        job = _new_job(url)
+        _start_job(job, url=url, **options)
+
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Result cache hit/miss counters (this process only)"""
+    return get_result_cache().stats()
+
+
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving HTTP"""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once every inference worker is warm, 503 before (or if warm-up failed)"""
+    if not _warmup["ready"]:
+        raise HTTPException(status_code=503, detail=_warmup)
+    return _warmup
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status and result of a job"""
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8000")))
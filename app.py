@@ -10,14 +10,17 @@ st.set_page_config(
     layout="centered"
 )
 
-# STREAMLIT CLOUD OPTIMIZATIONS
-import torch
-torch.set_num_threads(1)  # Reduce CPU usage
-os.environ['TOKENIZERS_PARALLELISM'] = 'false'  # Avoid threading issues
+# Thread policy for torch, tokenizers and ffmpeg (ACCENT_THREAD_POLICY: latency / throughput).
+# One thread by default: Streamlit Cloud shares a few cores between sessions
+from thread_policy import apply_thread_policy
+apply_thread_policy(os.environ.get("ACCENT_THREAD_POLICY", "throughput"))
 
 # Add error handling for imports
 try:
-    from utils import download_video, extract_audio, analyze_speech, cleanup_files
+    from utils import download_video, extract_audio, stream_audio, cleanup_files, SAMPLE_RATE
+    from inference_server import get_inference_service
+    from result_cache import get_result_cache
+    from model_registry import start_warm_up, is_ready
 except ImportError as e:
     st.error(f"❌ Import Error: {e}")
     st.info("This might be a deployment issue. Please check the logs.")
@@ -26,8 +29,12 @@ except ImportError as e:
 st.title("🌍 English Language & Accent Detection Tool")
 st.write("Upload a video to first detect if the speaker is speaking English, then analyze their English accent.")
 
-# Add a warning for Streamlit Cloud users
-st.info("⚠️ **Note**: First-time model loading may take 2-3 minutes. Please be patient!")
+# Load and run the models in a background thread (once per server process, not per rerun)
+start_warm_up()
+
+# Only shown until the background warm-up has finished
+if not is_ready():
+    st.info("⚠️ **Note**: Models are still loading (2-3 minutes after a restart). Please be patient!")
 
 # Information section
 with st.expander("ℹ️ How this tool works"):
@@ -71,48 +78,89 @@ if st.button("🔍 Analyze Language & Accent", type="primary"):
         st.warning("⚠️ Please enter a video URL first.")
     else:
         video_path = None
-        audio_path = None
+        audio = None
         
         try:
-            # Download video
-            with st.spinner("📥 Downloading video..."):
-                video_path = download_video(video_url.strip())
+            # Stream audio straight from the URL - nothing is written to disk
+            with st.spinner("📡 Streaming audio from video..."):
+                audio = stream_audio(video_url.strip())
+            
+            if audio is not None:
+                st.success(f"✅ Audio streamed ({len(audio) / SAMPLE_RATE:.1f} seconds)")
+            else:
+                st.info("ℹ️ Streaming not possible for this video, downloading it instead...")
+                # Download video
+                with st.spinner("📥 Downloading video..."):
+                    video_path = download_video(video_url.strip())
                 
-                if not video_path or not os.path.exists(video_path):
-                    st.error("❌ **Video download failed!**")
-                    st.write("**Possible reasons:**")
-                    st.write("- URL is not a direct link to a video file")
-                    st.write("- Video is behind authentication/login")
-                    st.write("- Server is blocking requests")
-                    st.write("- URL is incorrect or video doesn't exist")
-                    st.stop()
+                    if not video_path or not os.path.exists(video_path):
+                        st.error("❌ **Video download failed!**")
+                        st.write("**Possible reasons:**")
+                        st.write("- URL is not a direct link to a video file")
+                        st.write("- Video is behind authentication/login")
+                        st.write("- Server is blocking requests")
+                        st.write("- URL is incorrect or video doesn't exist")
+                        st.stop()
                 
-                st.success(f"✅ Video downloaded ({os.path.getsize(video_path):,} bytes)")
+                    st.success(f"✅ Video downloaded ({os.path.getsize(video_path):,} bytes)")
 
-            # Extract audio
-            with st.spinner("🎵 Extracting audio..."):
-                audio_path = extract_audio(video_path)
+                # Extract audio
+                with st.spinner("🎵 Extracting audio..."):
+                    # Decode straight into memory - no temporary WAV on disk
+                    audio = extract_audio(video_path, to_memory=True)
                 
-                if not audio_path or not os.path.exists(audio_path):
-                    st.error("❌ **Audio extraction failed!**")
-                    st.write("**Possible reasons:**")
-                    st.write("- Video file is corrupted")
-                    st.write("- Video format not supported")  
-                    st.write("- Video has no audio track")
-                    st.write("- FFmpeg is not properly installed")
-                    st.stop()
+                    if audio is None or len(audio) == 0:
+                        st.error("❌ **Audio extraction failed!**")
+                        st.write("**Possible reasons:**")
+                        st.write("- Video file is corrupted")
+                        st.write("- Video format not supported")  
+                        st.write("- Video has no audio track")
+                        st.write("- FFmpeg is not properly installed")
+                        st.stop()
                 
-                st.success(f"✅ Audio extracted ({os.path.getsize(audio_path):,} bytes)")
+                    st.success(f"✅ Audio extracted ({len(audio) / SAMPLE_RATE:.1f} seconds)")
 
             # Analyze speech
             with st.spinner("🧠 Analyzing language and accent... This may take 2-3 minutes on first run..."):
                 try:
-                    is_english, language, accent, lang_confidence, accent_confidence = analyze_speech(audio_path)
+                    # Concurrent sessions are micro-batched through the shared service;
+                    # energy VAD drops silence/intro music before classification
+                    # Re-submitted videos are answered from the result cache
+                    service = get_inference_service(vad="energy", result_cache=get_result_cache())
+                    result = service.analyze(audio)
+                    if result.get("error"):
+                        raise RuntimeError(result["error"])
+                    screen = result.get("prescreen") or {}
+                    if screen and not screen["passed"]:
+                        # Rejected in milliseconds by the pre-screen - no model ran
+                        st.warning(f"🔇 **{screen['message']}** - please provide a video with clear speech.")
+                        st.caption(f"Level: {screen['peak_db']:.0f} dBFS peak, "
+                                   f"speech: {screen['speech_seconds']:.1f}s of {screen['seconds']:.1f}s, "
+                                   f"clipped samples: {screen['clipping_ratio']:.1%}")
+                        st.stop()
+                    for warning in screen.get("warnings", []):
+                        st.caption(f"⚠️ {warning}")
+                    is_english = result["is_english"]
+                    language = result["language"]
+                    accent = result["accent"]
+                    lang_confidence = result["lang_confidence"]
+                    accent_confidence = result["accent_confidence"]
                     
                     # Display results
                     st.markdown("---")
                     st.markdown("### 🎯 Analysis Results")
                     
+                    if result["speech_ratio"] is not None:
+                        st.caption(f"🗣️ Speech detected in {result['speech_ratio']:.0%} of the audio")
+                    
+                    timeline = result.get("timeline") or []
+                    if len(timeline) > 1:
+                        with st.expander(f"🕒 Timeline ({len(timeline)} segments)"):
+                            for segment in timeline:
+                                label = segment["accent"] or str(segment["language"]).title()
+                                st.write(f"**{segment['start']:.0f}s - {segment['end']:.0f}s**: "
+                                         f"{label} ({segment['confidence']:.0f}%)")
+                    
                     if not is_english:
                         # NOT ENGLISH
                         st.error("❌ **Speaker is NOT speaking English**")
@@ -168,6 +216,12 @@ if st.button("🔍 Analyze Language & Accent", type="primary"):
                                 value=f"{accent_confidence:.1f}%"
                             )
                         
+                        alternatives = (result.get("accent_distribution") or [])[1:4]
+                        if alternatives:
+                            st.caption("Runner-up accents: " + ", ".join(
+                                f"{entry['label']} ({entry['probability']:.0%})" for entry in alternatives
+                            ))
+                        
                         # Confidence interpretation
                         if accent_confidence >= 80:
                             st.success("🎯 High confidence accent prediction")
@@ -230,8 +284,8 @@ if st.button("🔍 Analyze Language & Accent", type="primary"):
         
         finally:
             # Clean up temporary files
-            if video_path or audio_path:
-                cleanup_files(video_path, audio_path)
+            if video_path:
+                cleanup_files(video_path)
 
 # Use cases section
 st.markdown("---")
@@ -10,10 +10,10 @@ st.set_page_config(
     layout="centered"
 )
 
-# STREAMLIT CLOUD OPTIMIZATIONS
-import torch
-torch.set_num_threads(1)  # Reduce CPU usage
-os.environ['TOKENIZERS_PARALLELISM'] = 'false'  # Avoid threading issues
+# Thread policy for torch, tokenizers and ffmpeg (ACCENT_THREAD_POLICY: latency / throughput).
+# One thread by default: Streamlit Cloud shares a few cores between sessions
+from thread_policy import apply_thread_policy
+apply_thread_policy(os.environ.get("ACCENT_THREAD_POLICY", "throughput"))
 
 # Add error handling for imports
 try:
@@ -108,6 +108,10 @@ if st.button("🔍 Analyze Language & Accent", type="primary"):
             with st.spinner("🧠 Analyzing language and accent... This may take 2-3 minutes on first run..."):
                 try:
                     is_english, language, accent, lang_confidence, accent_confidence = analyze_speech(audio_path)
+                    if language is None:
+                        # Rejected by the pre-screen (silence, no speech or heavy clipping)
+                        st.warning("🔇 **Not enough clear speech in this video** - please try another one.")
+                        st.stop()
                     
                     # Display results
                     st.markdown("---")
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Batch analysis of many videos in one process
+Inputs are downloaded/decoded concurrently while the ECAPA models score
+already-decoded clips in padded mini-batches. One JSONL line per input.
+
+Usage:
+    python batch.py videos/links.txt -o results.jsonl
+    python batch.py inputs.jsonl --batch-size 16 --workers 8 --max-duration 60
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils import SAMPLE_RATE, extract_audio, stream_audio, analyze_speech_batch
+from result_cache import get_result_cache, analysis_options, audio_fingerprint, url_fingerprint
+
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_WORKERS = 4
+
+
+def read_inputs(path):
+    """
+    Read inputs from a text file (one URL or path per line, '#' comments allowed)
+    or a JSONL file (objects with "url" or "path", and optionally "id").
+    Returns a list of dicts with "id" and "source".
+    """
+    inputs = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                source = record.get("url") or record.get("path")
+                if not source:
+                    print(f"⚠️ Line {line_number}: no 'url' or 'path', skipping")
+                    continue
+                inputs.append({"id": record.get("id", source), "source": source})
+            else:
+                inputs.append({"id": line, "source": line})
+    return inputs
+
+
+def _normalize_inputs(urls_or_paths):
+    """Accept plain strings or {"id", "source"} dicts"""
+    return [item if isinstance(item, dict) else {"id": item, "source": item} for item in urls_or_paths]
+
+
+def load_input(source, max_duration=None):
+    """Decode a local file or remote URL into a 16 kHz mono waveform (no temp WAV)"""
+    if os.path.exists(source):
+        return extract_audio(source, to_memory=True, max_duration=max_duration)
+    return stream_audio(source, max_duration=max_duration)
+
+
+def _base_result(item, waveform=None):
+    return {
+        "id": item["id"],
+        "input": item["source"],
+        "is_english": None,
+        "language": None,
+        "accent": None,
+        "lang_confidence": None,
+        "accent_confidence": None,
+        "language_distribution": None,
+        "accent_distribution": None,
+        "timeline": None,
+        "prescreen": None,
+        "language_method": None,
+        "audio_seconds": round(len(waveform) / SAMPLE_RATE, 2) if waveform is not None else None,
+        "error": None,
+    }
+
+
+def _project(item, waveform, details):
+    """Batch result for an input from its analyze_speech details dict"""
+    result = _base_result(item, waveform)
+    for key in ("is_english", "language", "accent", "accent_confidence",
+                "language_distribution", "accent_distribution", "timeline", "prescreen", "language_method"):
+        result[key] = details[key]
+    result["error"] = details.get("error")
+    if waveform is None:
+        # Answered by URL before anything was decoded
+        result["audio_seconds"] = details["total_seconds"]
+    if details["lang_confidence"] is not None:
+        result["lang_confidence"] = round(details["lang_confidence"], 1)
+    return result
+
+
+def _score_batch(batch, vad=None, max_duration=None, cache=None):
+    """Score a mini-batch of (item, waveform, cache_keys) with analyze_speech_batch"""
+    details = analyze_speech_batch([waveform for _, waveform, _ in batch], vad=vad, max_duration=max_duration)
+
+    results = []
+    for (item, waveform, cache_keys), clip in zip(batch, details):
+        # The cache holds the details dict, shared with analyze_speech and the inference service
+        if cache is not None and not clip["error"]:
+            for cache_key in cache_keys:
+                cache.put(cache_key, clip)
+        results.append(_project(item, waveform, clip))
+    return results
+
+
+def _load_with_cache(item, max_duration=None, vad=None, cache=None):
+    """
+    Loader thread: answer from the result cache if possible (by URL validators
+    before downloading, then by PCM hash after decoding), otherwise decode.
+    Returns: (waveform, cached_result, cache_keys)
+    """
+    source = item["source"]
+    cache_keys = []
+
+    if cache is not None and not os.path.exists(source):
+        url_key = url_fingerprint(source, **analysis_options(max_duration=max_duration, vad=vad))
+        cached = cache.get(url_key)
+        if cached is not None:
+            return None, cached, cache_keys
+        if url_key:
+            cache_keys.append(url_key)
+
+    waveform = load_input(source, max_duration)
+
+    if cache is not None and waveform is not None and len(waveform) > 0:
+        pcm_key = audio_fingerprint(waveform, **analysis_options(max_duration=max_duration, vad=vad))
+        cached = cache.get(pcm_key)
+        if cached is not None:
+            for cache_key in cache_keys:
+                cache.put(cache_key, cached)
+            return waveform, cached, cache_keys
+        cache_keys.append(pcm_key)
+
+    return waveform, None, cache_keys
+
+
+def iter_analyze_batch(urls_or_paths, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS,
+                       max_duration=None, vad=None, use_cache=True):
+    """
+    Analyze many inputs, yielding one result dict per input as soon as it is scored.
+    Downloads and decoding run on a thread pool while the models score the
+    clips that are already in memory. Previously seen videos come from the
+    result cache. At most workers + batch_size inputs are loading or waiting
+    for the models at any time, so memory does not grow with the input list.
+    """
+    items = iter(_normalize_inputs(urls_or_paths))
+    cache = get_result_cache() if use_cache else None
+    max_in_flight = workers + batch_size
+    pending = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+
+        def top_up():
+            for item in itertools.islice(items, max(max_in_flight - len(futures) - len(pending), 0)):
+                futures[pool.submit(_load_with_cache, item, max_duration, vad, cache)] = item
+
+        top_up()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Dropped as soon as it is consumed, so its waveform is freed with the batch
+                item = futures.pop(future)
+                try:
+                    waveform, cached, cache_keys = future.result()
+                except Exception as e:
+                    waveform, cached, cache_keys = None, None, []
+                    error = str(e)
+                else:
+                    error = "Could not download or decode audio"
+
+                if cached is not None:
+                    result = _project(item, waveform, cached)
+                    result["cached"] = True
+                    yield result
+                    continue
+
+                if waveform is None or len(waveform) == 0:
+                    result = _base_result(item)
+                    result["error"] = error
+                    yield result
+                    continue
+
+                pending.append((item, waveform, cache_keys))
+                if len(pending) >= batch_size:
+                    yield from _score_batch(pending, vad, max_duration, cache)
+                    pending = []
+            top_up()
+
+    if pending:
+        yield from _score_batch(pending, vad, max_duration, cache)
+
+    if cache is not None:
+        stats = cache.stats()
+        print(f"💾 Result cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+
+
+def analyze_batch(urls_or_paths, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS,
+                  max_duration=None, vad=None, use_cache=True):
+    """
+    Analyze many videos (URLs or local paths) in one process.
+    Returns a list of result dicts in input order.
+    """
+    items = _normalize_inputs(urls_or_paths)
+    order = {item["id"]: i for i, item in enumerate(items)}
+    results = list(iter_analyze_batch(items, batch_size, workers, max_duration, vad, use_cache))
+    return sorted(results, key=lambda result: order.get(result["id"], len(order)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch English language & accent detection")
+    parser.add_argument("inputs", help="Text file with one URL/path per line, or a JSONL file")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL output file (default: results.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Clips per forward pass")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--max-duration", type=float, default=None, help="Only analyze the first N seconds")
+    parser.add_argument("--vad", choices=["energy", "speechbrain"], default=None, help="Drop non-speech first")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the result cache")
+    args = parser.parse_args(argv)
+
+    inputs = read_inputs(args.inputs)
+    print(f"📋 {len(inputs)} input(s) from {args.inputs}")
+
+    start = time.perf_counter()
+    count = 0
+    with open(args.output, "w", encoding="utf-8") as output:
+        for result in iter_analyze_batch(inputs, args.batch_size, args.workers, args.max_duration,
+                                         args.vad, use_cache=not args.no_cache):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            count += 1
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {count} result(s) written to {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
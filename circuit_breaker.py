@@ -0,0 +1,123 @@
+"""
+Circuit breakers for the detector backends
+After FAILURE_THRESHOLD consecutive failures (errors or timeouts) a backend
+is skipped for COOLDOWN_SECONDS, so requests go straight to a working method
+instead of paying for the failure again. Once the cool-down is over a
+background probe (e.g. a dummy forward pass) decides whether the backend is
+healthy again; without a probe the next request is let through as the trial.
+"""
+import os
+import threading
+import time
+
+
+FAILURE_THRESHOLD = int(os.environ.get("ACCENT_BREAKER_FAILURES", "3"))
+COOLDOWN_SECONDS = float(os.environ.get("ACCENT_BREAKER_COOLDOWN", "300"))
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitBreaker:
+    """
+    Health memory of one backend: closed (in use), open (skipped) or
+    half-open (one trial request allowed).
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_SECONDS, probe=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe = probe
+        self.state = "closed"
+        self.failures = 0
+        self.total_failures = 0
+        self.successes = 0
+        self.last_error = None
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may use this backend right now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+
+            if self.probe is not None:
+                # Requests keep skipping the backend until the probe succeeds
+                if not self._probing:
+                    self._probing = True
+                    threading.Thread(target=self._run_probe, daemon=True, name=f"probe-{self.name}").start()
+                return False
+
+            # No probe: this request is the trial; another one is allowed after the next cool-down
+            self.state = "half-open"
+            self._opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.successes += 1
+            if self.state != "closed":
+                print(f"✅ {self.name} is healthy again - circuit closed")
+            self.state = "closed"
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            if error is not None:
+                self.last_error = str(error)[:200]
+            if self.state != "closed" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                print(f"🔌 {self.name} failed {self.failures} time(s) - skipped for {self.cooldown:.0f}s")
+
+    def _run_probe(self):
+        """Background health check once the cool-down is over"""
+        print(f"🩺 Probing {self.name}...")
+        try:
+            self.probe()
+            self.record_success()
+        except Exception as e:
+            self.record_failure(e)
+        finally:
+            with self._lock:
+                self._probing = False
+
+    def status(self):
+        """State, failure counts and last error"""
+        with self._lock:
+            retry_in = None
+            if self.state != "closed":
+                retry_in = round(max(self.cooldown - (time.monotonic() - self._opened_at), 0), 1)
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "total_failures": self.total_failures,
+                "successes": self.successes,
+                "last_error": self.last_error,
+                "retry_in_s": retry_in,
+            }
+
+
+def get_breaker(name, probe=None):
+    """Process-wide breaker for a backend (created on first use; probe is set once)"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, probe=probe)
+        elif breaker.probe is None and probe is not None:
+            breaker.probe = probe
+        return breaker
+
+
+def breaker_status():
+    """Status of every breaker in this process"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.status() for breaker in breakers}
@@ -0,0 +1,73 @@
+"""
+Cold-start timing report
+Imports each entry point in a fresh interpreter and reports how long the
+import took and which heavy libraries (torch, speechbrain, ...) it pulled in.
+Anything that only needs URLs, files or the caches should stay in milliseconds.
+
+    python cold_start.py                 # default entry points
+    python cold_start.py utils api       # specific modules
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+HEAVY_MODULES = ("torch", "torchaudio", "speechbrain", "transformers", "librosa", "onnxruntime")
+
+ENTRY_POINTS = ("cleanup", "thread_policy", "utils", "result_cache", "model_registry",
+                "inference_server", "batch", "api")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"import_ms": elapsed * 1000, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module):
+    """
+    Import one module in a fresh interpreter.
+    Returns: {"module", "import_ms", "process_ms", "heavy"} or {"module", "error"}
+    """
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, cwd=project_dir
+    )
+    process_ms = (time.perf_counter() - start) * 1000
+
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        return {"module": module, "error": lines[-1] if lines else f"exit code {process.returncode}"}
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    return {
+        "module": module,
+        "import_ms": round(result["import_ms"], 1),
+        "process_ms": round(process_ms, 1),
+        "heavy": result["heavy"],
+    }
+
+
+def cold_start_report(modules=ENTRY_POINTS):
+    """Print import / process start-up times per entry point; returns the measurements"""
+    results = [measure_import(module) for module in modules]
+
+    print("⏱️ Cold-start report (fresh interpreter per module)")
+    print(f"{'module':<18} {'import':>10} {'process':>10}  heavy imports")
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']:<18} ❌ {result['error']}")
+            continue
+        heavy = ", ".join(result["heavy"]) or "-"
+        print(f"{result['module']:<18} {result['import_ms']:>8.0f}ms {result['process_ms']:>8.0f}ms  {heavy}")
+    return results
+
+
+if __name__ == "__main__":
+    cold_start_report(sys.argv[1:] or ENTRY_POINTS)
@@ -0,0 +1,181 @@
+"""
+Strategy engine for the language detectors
+Runs detection methods (SpeechBrain, Whisper, ...) one after another or
+concurrently, each with its own timeout, and records which method produced
+the answer and how long every method took.
+    sequential  methods in order of preference, the first one that succeeds wins
+    first       all methods at once; the first answer at or above
+                ACCEPT_CONFIDENCE wins, otherwise the most confident one
+    best        all methods at once; the most confident answer wins
+Selected with ACCENT_DETECTION_STRATEGY (default: sequential).
+Methods whose circuit breaker is open (see circuit_breaker) are skipped.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from circuit_breaker import get_breaker
+
+
+STRATEGIES = ("sequential", "first", "best")
+DEFAULT_STRATEGY = os.environ.get("ACCENT_DETECTION_STRATEGY", "sequential")
+
+# Seconds a method may take before the engine moves on (first use includes model loading)
+DEFAULT_TIMEOUT = float(os.environ.get("ACCENT_DETECTOR_TIMEOUT", "300"))
+
+# "first": an answer at or above this confidence (%) ends the race
+ACCEPT_CONFIDENCE = float(os.environ.get("ACCENT_ACCEPT_CONFIDENCE", "60"))
+
+
+def _call(function, audio):
+    """Run one method; returns (result, seconds)"""
+    start = time.perf_counter()
+    result = function(audio)
+    return result, time.perf_counter() - start
+
+
+def record_timing(timings, name, status, seconds, result=None, error=None):
+    """Add one method's entry (status, seconds, confidence or error) to a timings dict"""
+    timings[name] = {"status": status, "seconds": round(seconds, 3)}
+    if result is not None:
+        timings[name]["confidence"] = round(float(result[1]), 1)
+    if error is not None:
+        timings[name]["error"] = str(error)[:200]
+
+
+def _run_sequential(audio, methods, timings):
+    """Methods in order; the first that succeeds within its timeout wins"""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector")
+    try:
+        for name, function, timeout in methods:
+            start = time.perf_counter()
+            future = executor.submit(_call, function, audio)
+            try:
+                result, seconds = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                record_timing(timings, name, "timeout", time.perf_counter() - start)
+                print(f"⏱️ {name} gave no answer within {timeout:.0f}s, trying the next method")
+                # The stuck call keeps the worker busy; later methods get a fresh one
+                executor.shutdown(wait=False)
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector")
+                continue
+            except Exception as e:
+                record_timing(timings, name, "error", time.perf_counter() - start, error=e)
+                print(f"⚠️ {name} failed: {str(e)[:100]}...")
+                continue
+            record_timing(timings, name, "ok", seconds, result)
+            return name, result
+        return None, None
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _run_concurrent(audio, methods, timings, strategy, accept_confidence):
+    """All methods at once; stops early under "first" once an answer is acceptable"""
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(methods), thread_name_prefix="detector")
+    futures = {executor.submit(_call, function, audio): (name, timeout) for name, function, timeout in methods}
+    answers = {}
+    winner = None
+
+    try:
+        pending = set(futures)
+        while pending and winner is None:
+            elapsed = time.perf_counter() - start
+            # Methods past their own timeout are given up on
+            for future in [f for f in pending if elapsed >= futures[f][1]]:
+                pending.discard(future)
+                record_timing(timings, futures[future][0], "timeout", elapsed)
+            if not pending:
+                break
+
+            wait_for = min(futures[f][1] for f in pending) - elapsed
+            done, _ = wait(pending, timeout=max(wait_for, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                name = futures[future][0]
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    record_timing(timings, name, "error", time.perf_counter() - start, error=e)
+                    print(f"⚠️ {name} failed: {str(e)[:100]}...")
+                    continue
+                record_timing(timings, name, "ok", seconds, result)
+                answers[name] = result
+                if strategy == "first" and result[1] >= accept_confidence and winner is None:
+                    winner = name
+
+        # Whatever is still running is abandoned (threads cannot be interrupted)
+        for future in pending:
+            future.cancel()
+            record_timing(timings, futures[future][0], "abandoned", time.perf_counter() - start)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if winner is None and answers:
+        # Most confident answer; ties go to the method listed first
+        order = [name for name, _, _ in methods]
+        winner = max(answers, key=lambda name: (answers[name][1], -order.index(name)))
+    return winner, answers.get(winner)
+
+
+def run_detectors(audio, methods, strategy=None, accept_confidence=ACCEPT_CONFIDENCE, fallback=None, probes=None):
+    """
+    Run detection methods under a strategy.
+    methods: [(name, function, timeout)] in order of preference; function(audio)
+    returns (label, confidence, distribution) and timeout=None uses DEFAULT_TIMEOUT
+    fallback: optional (name, function) run only when no method produced an answer
+    probes: optional {name: function()} health checks used by the circuit
+    breakers to bring a failing method back
+    Returns: {"label", "confidence", "distribution", "method", "strategy", "timings"}
+    """
+    strategy = strategy or DEFAULT_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown detection strategy: {strategy} (available: {', '.join(STRATEGIES)})")
+
+    probes = probes or {}
+    timings = {}
+    start = time.perf_counter()
+
+    available = []
+    for name, function, timeout in methods:
+        if not get_breaker(name, probes.get(name)).allow():
+            print(f"⏭️ Skipping {name} (circuit open after repeated failures)")
+            record_timing(timings, name, "skipped", 0)
+            continue
+        available.append((name, function, DEFAULT_TIMEOUT if timeout is None else timeout))
+    methods = available
+
+    if strategy == "sequential" or len(methods) < 2:
+        method, result = _run_sequential(audio, methods, timings)
+    else:
+        method, result = _run_concurrent(audio, methods, timings, strategy, accept_confidence)
+
+    # Methods that never ran (sequential) or were abandoned leave their breaker alone
+    for name, _, _ in methods:
+        timing = timings.get(name, {})
+        if timing.get("status") == "ok":
+            get_breaker(name).record_success()
+        elif timing.get("status") in ("error", "timeout"):
+            get_breaker(name).record_failure(timing.get("error", timing["status"]))
+
+    if result is None and fallback is not None:
+        method, function = fallback
+        print(f"🔄 No detector answered, using {method}...")
+        result, seconds = _call(function, audio)
+        record_timing(timings, method, "ok", seconds, result)
+
+    if result is None:
+        raise RuntimeError(f"All detection methods failed: {timings}")
+
+    print(f"🏁 {method} answered ({strategy} strategy, {time.perf_counter() - start:.2f}s)")
+    label, confidence, distribution = result
+    return {
+        "label": label,
+        "confidence": confidence,
+        "distribution": distribution,
+        "method": method,
+        "strategy": strategy,
+        "timings": timings,
+    }
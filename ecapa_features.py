@@ -0,0 +1,357 @@
+"""
+Shared feature extraction for the ECAPA-TDNN classifiers
+The power spectrogram of a clip is computed once and reused by every
+EncoderClassifier whose STFT has the same configuration; only the mel
+filterbank (e.g. 60 bands for VoxLingua107, 80 for CommonAccent) is applied
+per model. Filterbanks themselves are shared when the whole front-end agrees.
+"""
+import torch
+
+from utils import COSINE, LOG_PROBS
+
+
+# CommonAccent outputs cosine scores; softmax at the AAM training scale turns them into probabilities
+COSINE_SCALE = 30.0
+
+SCORE_TYPES = (LOG_PROBS, COSINE)
+
+# Front-end attributes that change the features a model sees
+_FEATURE_ATTRS = (
+    "sample_rate", "n_fft", "win_length", "hop_length", "n_mels",
+    "f_min", "f_max", "n_mfcc", "deltas", "context", "left_frames",
+    "right_frames", "log_mel", "filter_shape", "power_spectrogram",
+    "normalized_stft", "center", "pad_mode", "onesided", "window_fn", "window",
+)
+
+
+def _module_signature(module):
+    """Hashable description of a front-end module and its children"""
+    signature = [type(module).__name__]
+
+    for child_name, child in module.named_modules():
+        for attr in _FEATURE_ATTRS:
+            if not hasattr(child, attr):
+                continue
+            value = getattr(child, attr)
+            if torch.is_tensor(value):
+                value = (tuple(value.shape), round(float(value.double().sum()), 6))
+            elif callable(value):
+                value = getattr(value, "__name__", type(value).__name__)
+            if value is None or isinstance(value, (bool, int, float, str, tuple)):
+                signature.append((child_name, attr, value))
+
+    return tuple(signature)
+
+
+def feature_signature(classifier):
+    """
+    Hashable description of an EncoderClassifier's feature front-end.
+    Two models with the same signature produce identical filterbanks.
+    """
+    return _module_signature(classifier.mods.compute_features)
+
+
+def spectrogram_signature(classifier):
+    """
+    Hashable description of the STFT in front of an Fbank front-end, or None
+    for other front-ends. Models with the same signature see the same power
+    spectrogram even when their mel filterbanks differ.
+    """
+    compute_features = classifier.mods.compute_features
+    if type(compute_features).__name__ != "Fbank":
+        return None
+    return _module_signature(compute_features.compute_STFT)
+
+
+# ECAPA_TDNN layers that are run separately so frame-level outputs can be pooled per segment
+_ECAPA_LAYERS = ("blocks", "mfa", "asp", "asp_bn", "fc")
+
+
+def _is_ecapa(embedding_model):
+    """ECAPA_TDNN, or an exported one (inference_backends.BackendEmbedding)"""
+    if hasattr(embedding_model, "frames") and hasattr(embedding_model, "pool"):
+        return True
+    return all(hasattr(embedding_model, attr) for attr in _ECAPA_LAYERS)
+
+
+def _ecapa_frames(embedding_model, feats, wav_lens):
+    """ECAPA_TDNN.forward up to attentive statistics pooling: (batch, channels, frames)"""
+    if hasattr(embedding_model, "frames"):
+        return embedding_model.frames(feats, wav_lens)
+
+    from speechbrain.lobes.models.ECAPA_TDNN import TDNNBlock
+
+    x = feats.transpose(1, 2)
+    outputs = []
+    for layer in embedding_model.blocks:
+        x = layer(x) if isinstance(layer, TDNNBlock) else layer(x, lengths=wav_lens)
+        outputs.append(x)
+    return embedding_model.mfa(torch.cat(outputs[1:], dim=1))
+
+
+def _ecapa_pool(embedding_model, frames, wav_lens):
+    """Rest of ECAPA_TDNN.forward: pooled embeddings of shape (batch, 1, dim)"""
+    if hasattr(embedding_model, "pool"):
+        return embedding_model.pool(frames, wav_lens)
+
+    x = embedding_model.asp(frames, lengths=wav_lens)
+    x = embedding_model.asp_bn(x)
+    x = embedding_model.fc(x)
+    return x.transpose(1, 2)
+
+
+class FeatureCache:
+    """
+    Per-clip cache of ECAPA intermediate representations.
+    Power spectrograms are keyed by STFT signature, filterbanks by front-end
+    signature (each shared between models that agree on it) and embeddings by
+    model, so no stage is computed twice.
+    For ECAPA_TDNN models the frame-level outputs are kept too, so segments
+    of the clip can be pooled and classified without another pass.
+    """
+
+    def __init__(self, waveform, wav_lens=None):
+        wavs = waveform if torch.is_tensor(waveform) else torch.as_tensor(waveform)
+        wavs = wavs.float()
+        if wavs.dim() == 1:
+            wavs = wavs.unsqueeze(0)
+        self.wavs = wavs
+        self.wav_lens = torch.ones(wavs.shape[0]) if wav_lens is None else wav_lens
+        self._spectrograms = {}
+        self._features = {}
+        self._frames = {}
+        self._embeddings = {}
+        self.hits = 0
+        self.misses = 0
+        self.spectrogram_hits = 0
+
+    def features(self, classifier):
+        """Raw filterbank features for this clip, as seen by classifier"""
+        key = feature_signature(classifier)
+        if key in self._features:
+            self.hits += 1
+            return self._features[key]
+
+        self.misses += 1
+        compute_features = classifier.mods.compute_features
+        with torch.no_grad():
+            if spectrogram_signature(classifier) is None:
+                feats = compute_features(self.wavs.to(classifier.device))
+            else:
+                # Fbank.forward, starting from the shared power spectrogram
+                feats = compute_features.compute_fbanks(self.spectrogram(classifier))
+                if compute_features.deltas:
+                    delta1 = compute_features.compute_deltas(feats)
+                    delta2 = compute_features.compute_deltas(delta1)
+                    feats = torch.cat([feats, delta1, delta2], dim=2)
+                if compute_features.context:
+                    feats = compute_features.context_window(feats)
+        self._features[key] = feats
+        return feats
+
+    def spectrogram(self, classifier):
+        """Power spectrogram of this clip from the STFT of classifier's Fbank front-end"""
+        from speechbrain.processing.features import spectral_magnitude
+
+        key = spectrogram_signature(classifier)
+        if key in self._spectrograms:
+            self.spectrogram_hits += 1
+            return self._spectrograms[key]
+
+        with torch.no_grad():
+            stft = classifier.mods.compute_features.compute_STFT(self.wavs.to(classifier.device))
+            spectrogram = spectral_magnitude(stft)
+        self._spectrograms[key] = spectrogram
+        return spectrogram
+
+    def embeddings(self, classifier):
+        """Normalized ECAPA embeddings of this clip for classifier"""
+        key = id(classifier)
+        if key in self._embeddings:
+            self.hits += 1
+            return self._embeddings[key]
+
+        embedding_model = classifier.mods.embedding_model
+        wav_lens = self.wav_lens.to(classifier.device)
+        with torch.no_grad():
+            if _is_ecapa(embedding_model):
+                embeddings = _ecapa_pool(embedding_model, self.frames(classifier), wav_lens)
+            else:
+                feats = classifier.mods.mean_var_norm(self.features(classifier), wav_lens)
+                embeddings = embedding_model(feats, wav_lens)
+        self._embeddings[key] = embeddings
+        return embeddings
+
+    def frames(self, classifier):
+        """Frame-level ECAPA_TDNN outputs (before pooling) of this clip for classifier"""
+        key = id(classifier)
+        if key in self._frames:
+            self.hits += 1
+            return self._frames[key]
+
+        feats = self.features(classifier)
+        wav_lens = self.wav_lens.to(classifier.device)
+        with torch.no_grad():
+            feats = classifier.mods.mean_var_norm(feats, wav_lens)
+            frames = _ecapa_frames(classifier.mods.embedding_model, feats, wav_lens)
+        self._frames[key] = frames
+        return frames
+
+    def segment_embeddings(self, classifier, spans, item=0):
+        """
+        Embeddings of (start, end) sample spans of one clip in the cache.
+        ECAPA_TDNN models pool the cached frame-level outputs of each span;
+        other models re-run on the span audio.
+        Returns: tensor of shape (num_spans, 1, dim)
+        """
+        embedding_model = classifier.mods.embedding_model
+        num_samples = self.wavs.shape[-1]
+
+        with torch.no_grad():
+            if not _is_ecapa(embedding_model):
+                return torch.cat([FeatureCache(self.wavs[item:item + 1, start:end]).embeddings(classifier)
+                                  for start, end in spans])
+
+            frames = self.frames(classifier)[item]
+            num_frames = frames.shape[-1]
+            bounds = []
+            for start, end in spans:
+                first = min(int(round(start / num_samples * num_frames)), num_frames - 1)
+                last = max(int(round(end / num_samples * num_frames)), first + 1)
+                bounds.append((first, last))
+
+            longest = max(last - first for first, last in bounds)
+            segments = frames.new_zeros(len(bounds), frames.shape[0], longest)
+            lengths = torch.empty(len(bounds))
+            for i, (first, last) in enumerate(bounds):
+                segments[i, :, :last - first] = frames[:, first:last]
+                lengths[i] = (last - first) / longest
+            return _ecapa_pool(embedding_model, segments, lengths.to(frames.device))
+
+    def cached_embeddings(self, classifier):
+        """Embeddings already computed for classifier, or None (never computes)"""
+        return self._embeddings.get(id(classifier))
+
+    def stats(self):
+        """Cache hit/miss counts and number of distinct spectrograms and feature front-ends"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "spectrogram_hits": self.spectrogram_hits,
+            "spectrograms": len(self._spectrograms),
+            "feature_sets": len(self._features),
+        }
+
+
+def classify_cached(classifier, cache):
+    """
+    Same outputs as EncoderClassifier.classify_batch, but feature extraction
+    and embeddings come from (and are stored in) the shared cache.
+    Returns: (out_prob, score, index, text_lab)
+    """
+    embeddings = cache.embeddings(classifier)
+    with torch.no_grad():
+        out_prob = classifier.mods.classifier(embeddings).squeeze(1)
+    score, index = torch.max(out_prob, dim=-1)
+    text_lab = classifier.hparams.label_encoder.decode_torch(index)
+    return out_prob, score, index, text_lab
+
+
+def classify_segments(classifier, cache, spans, item=0):
+    """Classifier outputs (num_spans, num_classes) for (start, end) sample spans of a cached clip"""
+    embeddings = cache.segment_embeddings(classifier, spans, item)
+    with torch.no_grad():
+        return classifier.mods.classifier(embeddings).squeeze(1)
+
+
+def pad_waveforms(waveforms):
+    """
+    Stack 1-D waveforms into a zero-padded batch.
+    Returns: (wavs, wav_lens) with relative lengths, as SpeechBrain expects
+    """
+    waveforms = [torch.as_tensor(w, dtype=torch.float32) for w in waveforms]
+    lengths = torch.tensor([w.shape[-1] for w in waveforms], dtype=torch.float32)
+    wavs = torch.zeros(len(waveforms), int(lengths.max().item()))
+    for i, w in enumerate(waveforms):
+        wavs[i, :w.shape[-1]] = w
+    return wavs, lengths / lengths.max()
+
+
+def classify_padded(classifier, waveforms):
+    """
+    classify_batch over clips of different lengths in a single forward pass.
+    Padding is masked through wav_lens, so results are close to per-clip calls
+    but not identical: the ECAPA convolutions at the end of a short clip see
+    the padded frames instead of their own edge padding, and frame counts are
+    rounded from wav_lens. Differences of about 0.02 in log-probability have
+    been measured on short clips batched with longer ones.
+    Returns: (out_prob, score, index, text_lab) with one row per waveform
+    """
+    wavs, wav_lens = pad_waveforms(waveforms)
+    return classifier.classify_batch(wavs, wav_lens)
+
+
+def log_probabilities(out_prob, scores):
+    """
+    Classifier outputs as log-probabilities.
+    scores: what the model outputs (the caller knows which model ran) -
+    LOG_PROBS are returned as they are, COSINE scores go through a
+    log-softmax at COSINE_SCALE.
+    """
+    if scores not in SCORE_TYPES:
+        raise ValueError(f"Unknown score type: {scores} (available: {', '.join(SCORE_TYPES)})")
+    out_prob = out_prob.detach().float()
+    if scores == LOG_PROBS:
+        return out_prob
+    return torch.log_softmax(out_prob * COSINE_SCALE, dim=-1)
+
+
+def window_spans(num_samples, window, hop):
+    """
+    (start, end) sample offsets of fixed-length windows covering a clip.
+    The last window is aligned to the end of the clip; a clip shorter than
+    one window is a single span.
+    """
+    if num_samples <= window:
+        return [(0, num_samples)]
+    starts = list(range(0, num_samples - window + 1, hop))
+    if starts[-1] + window < num_samples:
+        starts.append(num_samples - window)
+    return [(start, start + window) for start in starts]
+
+
+def classify_windows(classifiers, waveform, window, hop, batch_size=8, return_embeddings=False):
+    """
+    Run EncoderClassifiers over fixed-length overlapping windows of one clip.
+    classifiers: [(EncoderClassifier, score type)] (see log_probabilities).
+    Windows go through the models batch_size at a time and each batch shares
+    its filterbanks between the classifiers, so peak memory depends on the
+    window size, not on the length of the recording.
+    return_embeddings: also return the mean window embedding per classifier
+    (shape (1, 1, dim), like FeatureCache.embeddings of a single clip)
+    Returns: (spans, log-probs of shape (num_windows, num_classes) per classifier)
+    """
+    waveform = torch.as_tensor(waveform, dtype=torch.float32).reshape(-1)
+    spans = window_spans(waveform.numel(), window, hop)
+    outputs = [[] for _ in classifiers]
+    embedding_sums = [0.0 for _ in classifiers]
+
+    for i in range(0, len(spans), batch_size):
+        cache = FeatureCache(torch.stack([waveform[start:end] for start, end in spans[i:i + batch_size]]))
+        for n, (output, (classifier, scores)) in enumerate(zip(outputs, classifiers)):
+            embeddings = cache.embeddings(classifier)
+            with torch.no_grad():
+                out_prob = classifier.mods.classifier(embeddings).squeeze(1)
+            output.append(log_probabilities(out_prob, scores))
+            embedding_sums[n] = embedding_sums[n] + embeddings.sum(dim=0, keepdim=True)
+
+    log_probs = [torch.cat(output) for output in outputs]
+    if return_embeddings:
+        return spans, log_probs, [total / len(spans) for total in embedding_sums]
+    return spans, log_probs
+
+
+def aggregate_log_probs(window_log_probs):
+    """Average per-window log-probabilities into one normalized clip-level distribution"""
+    mean = window_log_probs.mean(dim=0)
+    return mean - torch.logsumexp(mean, dim=-1)
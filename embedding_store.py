@@ -0,0 +1,193 @@
+"""
+Persistent store for ECAPA embeddings
+Each model gets a memory-mapped float16 matrix (one row per clip) plus a
+JSON id index. Re-scoring, re-thresholding or re-mapping labels then runs
+over the saved embeddings without sending any audio through the models again.
+Single writer per store directory.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from utils import CACHE_DIR, COSINE, LOG_PROBS, MAX_ACCENT_CONFIDENCE, top_confidence, readable_accent_name
+
+
+DEFAULT_STORE_DIR = CACHE_DIR / "embeddings"
+
+# Rows allocated the first time a matrix is created (doubled when full)
+INITIAL_CAPACITY = 1024
+
+
+class EmbeddingTable:
+    """One memory-mapped float16 matrix plus its id index"""
+
+    def __init__(self, directory, name, dim=None):
+        self.matrix_path = Path(directory) / f"{name}.f16"
+        self.index_path = Path(directory) / f"{name}.json"
+
+        if self.index_path.exists():
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self.ids = index["ids"]
+            self.capacity = index["capacity"]
+        elif dim is None:
+            raise KeyError(f"No embeddings stored under '{name}'")
+        else:
+            self.dim = int(dim)
+            self.ids = []
+            self.capacity = 0
+
+        self.rows = {clip_id: row for row, clip_id in enumerate(self.ids)}
+        self._matrix = None
+        if self.capacity:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float16, mode="r+",
+                                     shape=(self.capacity, self.dim))
+
+    def _grow(self, needed):
+        capacity = max(self.capacity, INITIAL_CAPACITY)
+        while capacity < needed:
+            capacity *= 2
+
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(capacity * self.dim * np.dtype(np.float16).itemsize)
+
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+        self.capacity = capacity
+
+    def add(self, clip_id, vector):
+        """Insert or overwrite the embedding of a clip"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vector.size != self.dim:
+            raise ValueError(f"Expected a {self.dim}-dim embedding, got {vector.size}")
+
+        row = self.rows.get(clip_id)
+        if row is None:
+            row = len(self.ids)
+            if row >= self.capacity:
+                self._grow(row + 1)
+            self.ids.append(clip_id)
+            self.rows[clip_id] = row
+        self._matrix[row] = vector.astype(np.float16)
+
+    def get(self, clip_id):
+        """Embedding of a clip as float32, or None"""
+        row = self.rows.get(clip_id)
+        if row is None:
+            return None
+        return np.asarray(self._matrix[row], dtype=np.float32)
+
+    def matrix(self):
+        """(count, dim) float16 view of every stored embedding"""
+        if self._matrix is None:
+            return np.zeros((0, self.dim), dtype=np.float16)
+        return self._matrix[:len(self.ids)]
+
+    def flush(self):
+        """Write the matrix and the index to disk (index replaced atomically)"""
+        if self._matrix is not None:
+            self._matrix.flush()
+        temp_path = self.index_path.with_suffix(".json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "capacity": self.capacity, "ids": self.ids}, f)
+        os.replace(temp_path, self.index_path)
+
+
+class EmbeddingStore:
+    """Embeddings of every analyzed clip, one table per model ("language", "accent")"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _table(self, namespace, dim=None):
+        if namespace not in self._tables:
+            self._tables[namespace] = EmbeddingTable(self.root, namespace, dim)
+        return self._tables[namespace]
+
+    def add_clip(self, clip_id, embeddings):
+        """Store {namespace: vector} for one clip and flush"""
+        with self._lock:
+            for namespace, vector in embeddings.items():
+                if torch.is_tensor(vector):
+                    vector = vector.detach().cpu().numpy()
+                vector = np.asarray(vector).reshape(-1)
+                table = self._table(namespace, dim=vector.size)
+                table.add(clip_id, vector)
+                table.flush()
+
+    def get(self, namespace, clip_id):
+        with self._lock:
+            try:
+                return self._table(namespace).get(clip_id)
+            except KeyError:
+                return None
+
+    def ids(self, namespace):
+        with self._lock:
+            try:
+                return list(self._table(namespace).ids)
+            except KeyError:
+                return []
+
+    def matrix(self, namespace):
+        with self._lock:
+            return self._table(namespace).matrix()
+
+    def rescore(self, namespace, classifier, scores, label_map=None, batch_size=4096, max_confidence=100.0):
+        """
+        Run only the classifier head of an EncoderClassifier over stored embeddings.
+        scores: what the head outputs (utils.LOG_PROBS or utils.COSINE).
+        Returns {clip_id: (label, confidence)}; label_map post-processes labels,
+        confidences are calibrated like analyze_speech's and capped at max_confidence.
+        """
+        ids = self.ids(namespace)
+        matrix = self.matrix(namespace)
+        results = {}
+
+        for start in range(0, len(ids), batch_size):
+            embeddings = torch.from_numpy(np.asarray(matrix[start:start + batch_size], dtype=np.float32))
+            with torch.no_grad():
+                out_prob = classifier.mods.classifier(embeddings.unsqueeze(1)).squeeze(1)
+            labels = classifier.hparams.label_encoder.decode_torch(torch.argmax(out_prob, dim=-1))
+
+            for offset, (label, row) in enumerate(zip(labels, out_prob)):
+                label = label_map(label) if label_map else str(label)
+                results[ids[start + offset]] = (label, round(top_confidence(row, scores, max_confidence), 1))
+
+        return results
+
+
+def relabel_accents(store):
+    """Accent labels for every stored clip with the current ACCENT_MAPPING"""
+    from model_registry import ACCENT_MODEL, get_accent_model
+    return store.rescore(ACCENT_MODEL, get_accent_model(), COSINE, label_map=readable_accent_name,
+                         max_confidence=MAX_ACCENT_CONFIDENCE)
+
+
+def relabel_languages(store):
+    """Language labels for every stored clip"""
+    from model_registry import LANGUAGE_MODEL, get_language_model
+    return store.rescore(LANGUAGE_MODEL, get_language_model(), LOG_PROBS, label_map=lambda label: str(label).lower())
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store():
+    """Process-wide EmbeddingStore at the default location"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore()
+        return _store
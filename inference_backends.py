@@ -0,0 +1,406 @@
+"""
+Alternative CPU inference backends for the ECAPA classifiers
+The ECAPA_TDNN embedding model (where nearly all the compute goes) is exported
+in two pieces - frame-level trunk and attentive pooling - so filterbank
+sharing and timeline pooling keep working. Filterbanks, normalization and the
+classifier head stay in PyTorch.
+
+    eager        float32 PyTorch (default)
+    torchscript  traced and frozen TorchScript
+    onnx         ONNX Runtime, float32
+    int8         ONNX Runtime, int8 weights and activations (calibrated on CALIBRATION_AUDIO;
+                 not built if that audio is missing)
+
+Select with ACCENT_INFERENCE_BACKEND=<name> or set_backend(). Compare every
+backend against eager PyTorch with:
+
+    python inference_backends.py [audio_or_video ...]
+"""
+import contextlib
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import torch
+
+from utils import CACHE_DIR, SAMPLE_RATE, extract_audio, load_waveform
+from ecapa_features import _ecapa_frames, _ecapa_pool
+
+
+BACKENDS = ("eager", "torchscript", "onnx", "int8")
+BACKEND_DIR = CACHE_DIR / "backends"
+ONNX_OPSET = 17
+
+# Speech in the repository used to calibrate int8 activation ranges and for the parity check
+CALIBRATION_AUDIO = ("4.mp4", "videos/Spanish.mp4")
+CLIP_SECONDS = 10.0
+MAX_CLIPS = 6
+
+_backend = os.environ.get("ACCENT_INFERENCE_BACKEND", "eager")
+_backend_models = {}
+_failed = set()
+_lock = threading.Lock()
+
+
+def get_backend():
+    """Name of the backend used by get_language_model() / get_accent_model()"""
+    return _backend
+
+
+def set_backend(name):
+    """Select the inference backend for the ECAPA classifiers"""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name} (available: {', '.join(BACKENDS)})")
+    _backend = name
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _traceable_length_to_mask(length, max_len=None, dtype=None, device=None):
+    """speechbrain's length_to_mask without the Python batch size that tracing would freeze"""
+    if max_len is None:
+        max_len = length.max().long().item()
+    mask = torch.arange(max_len, device=length.device, dtype=length.dtype).unsqueeze(0) < length.unsqueeze(1)
+    return mask.to(dtype=dtype or length.dtype, device=device or length.device)
+
+
+@contextlib.contextmanager
+def _export_mode():
+    import speechbrain.lobes.models.ECAPA_TDNN as ecapa_module
+
+    original = ecapa_module.length_to_mask
+    ecapa_module.length_to_mask = _traceable_length_to_mask
+    try:
+        with torch.no_grad():
+            yield
+    finally:
+        ecapa_module.length_to_mask = original
+
+
+class _Trunk(torch.nn.Module):
+    def __init__(self, ecapa):
+        super().__init__()
+        self.ecapa = ecapa
+
+    def forward(self, feats, lengths):
+        return _ecapa_frames(self.ecapa, feats, lengths)
+
+
+class _Pool(torch.nn.Module):
+    def __init__(self, ecapa):
+        super().__init__()
+        self.ecapa = ecapa
+
+    def forward(self, frames, lengths):
+        return _ecapa_pool(self.ecapa, frames, lengths)
+
+
+def _normalized_features(classifier, waveforms):
+    """Normalized filterbanks of equal-length waveforms, as the embedding model sees them"""
+    wavs = torch.stack([torch.as_tensor(w, dtype=torch.float32) for w in waveforms])
+    wav_lens = torch.ones(wavs.shape[0])
+    with torch.no_grad():
+        feats = classifier.mods.compute_features(wavs)
+        return classifier.mods.mean_var_norm(feats, wav_lens), wav_lens
+
+
+def _example_inputs(classifier):
+    """Two-clip batch with unequal lengths, so masking is part of the traced graph"""
+    generator = torch.Generator().manual_seed(0)
+    feats, _ = _normalized_features(classifier, torch.randn(2, 3 * SAMPLE_RATE, generator=generator) * 0.1)
+    return feats, torch.tensor([1.0, 0.8])
+
+
+class _OnnxFunction:
+    """ONNX Runtime session called with and returning torch tensors"""
+
+    def __init__(self, path, input_names):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = onnxruntime.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_names = input_names
+
+    def __call__(self, *inputs):
+        feed = {name: value.detach().cpu().float().contiguous().numpy()
+                for name, value in zip(self.input_names, inputs)}
+        return torch.from_numpy(self.session.run(None, feed)[0])
+
+
+def _export_onnx(module, inputs, input_names, output_name, dynamic_axes, path):
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _export_mode():
+        torch.onnx.export(
+            module.eval(), inputs, str(path), input_names=list(input_names), output_names=[output_name],
+            dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET, dynamo=False,
+        )
+    return path
+
+
+def _calibration_sources():
+    """CALIBRATION_AUDIO files that exist and are not empty placeholders"""
+    return [source for source in CALIBRATION_AUDIO if os.path.exists(source) and os.path.getsize(source) > 0]
+
+
+def _calibration_digest(sources):
+    """Short content hash of the calibration files, part of the int8 model file names"""
+    digest = hashlib.blake2b(f"{CLIP_SECONDS}:{MAX_CLIPS}".encode(), digest_size=6)
+    for source in sources:
+        digest.update(source.encode())
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _calibration_waveforms(seconds=CLIP_SECONDS, max_clips=MAX_CLIPS, noise_fallback=False):
+    """
+    Fixed-length clips cut from CALIBRATION_AUDIO.
+    Raises RuntimeError if none of it decodes, unless noise_fallback (parity check only:
+    activation ranges calibrated on noise would be cached as a bad int8 model).
+    """
+    clips = []
+    for source in _calibration_sources():
+        waveform = extract_audio(source, to_memory=True, max_duration=seconds * max_clips)
+        if waveform is None:
+            continue
+        clip_samples = int(seconds * SAMPLE_RATE)
+        clips.extend(waveform[start:start + clip_samples]
+                     for start in range(0, len(waveform) - clip_samples + 1, clip_samples))
+    if not clips:
+        if not noise_fallback:
+            raise RuntimeError(f"no calibration audio in {', '.join(CALIBRATION_AUDIO)}")
+        print("⚠️ No calibration audio found, using noise clips")
+        generator = torch.Generator().manual_seed(0)
+        clips = list(torch.randn(max_clips, int(seconds * SAMPLE_RATE), generator=generator).numpy() * 0.1)
+    return clips[:max_clips]
+
+
+def _quantize_int8(float_path, int8_path, input_names, batches):
+    """Static int8 quantization (QDQ, per-channel weights) calibrated on the given input batches"""
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._batches = iter(batches)
+
+        def get_next(self):
+            batch = next(self._batches, None)
+            if batch is None:
+                return None
+            return {name: value.detach().float().contiguous().numpy() for name, value in zip(input_names, batch)}
+
+    if not int8_path.exists():
+        quantize_static(str(float_path), str(int8_path), _Reader(), quant_format=QuantFormat.QDQ,
+                        per_channel=True, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class BackendEmbedding:
+    """ECAPA_TDNN stand-in whose trunk and pooling run on another backend"""
+
+    def __init__(self, frames, pool):
+        self._frames = frames
+        self._pool = pool
+
+    def frames(self, feats, lengths):
+        return self._frames(feats, lengths)
+
+    def pool(self, frames, lengths):
+        return self._pool(frames, lengths)
+
+    def __call__(self, feats, lengths=None):
+        if lengths is None:
+            lengths = torch.ones(feats.shape[0])
+        return self.pool(self.frames(feats, lengths), lengths)
+
+
+class _Mods:
+    def __init__(self, mods, embedding_model):
+        self.compute_features = mods.compute_features
+        self.mean_var_norm = mods.mean_var_norm
+        self.embedding_model = embedding_model
+        self.classifier = mods.classifier
+
+
+class BackendClassifier:
+    """EncoderClassifier stand-in: same front-end and classifier head, embedding model on another backend"""
+
+    def __init__(self, classifier, embedding_model, backend):
+        self.backend = backend
+        self.device = classifier.device
+        self.hparams = classifier.hparams
+        self.mods = _Mods(classifier.mods, embedding_model)
+
+    def classify_batch(self, wavs, wav_lens=None):
+        """Same outputs as EncoderClassifier.classify_batch"""
+        wavs = wavs.float()
+        if wav_lens is None:
+            wav_lens = torch.ones(wavs.shape[0])
+        with torch.no_grad():
+            feats = self.mods.compute_features(wavs)
+            feats = self.mods.mean_var_norm(feats, wav_lens)
+            embeddings = self.mods.embedding_model(feats, wav_lens)
+            out_prob = self.mods.classifier(embeddings).squeeze(1)
+        score, index = torch.max(out_prob, dim=-1)
+        text_lab = self.hparams.label_encoder.decode_torch(index)
+        return out_prob, score, index, text_lab
+
+
+def _build(name, classifier, backend):
+    ecapa = classifier.mods.embedding_model
+    feats, lengths = _example_inputs(classifier)
+    trunk, pool = _Trunk(ecapa).eval(), _Pool(ecapa).eval()
+    with torch.no_grad():
+        frames = trunk(feats, lengths)
+
+    if backend == "torchscript":
+        with _export_mode():
+            traced_trunk = torch.jit.freeze(torch.jit.trace(trunk, (feats, lengths)))
+            traced_pool = torch.jit.freeze(torch.jit.trace(pool, (frames, lengths)))
+        return BackendClassifier(classifier, BackendEmbedding(traced_trunk, traced_pool), backend)
+
+    trunk_path = _export_onnx(trunk, (feats, lengths), ("feats", "lengths"), "frames",
+                              {"feats": {0: "batch", 1: "time"}, "lengths": {0: "batch"}, "frames": {0: "batch", 2: "time"}},
+                              BACKEND_DIR / f"{name}-trunk.onnx")
+    pool_path = _export_onnx(pool, (frames, lengths), ("frames", "lengths"), "embeddings",
+                             {"frames": {0: "batch", 2: "time"}, "lengths": {0: "batch"}, "embeddings": {0: "batch"}},
+                             BACKEND_DIR / f"{name}-pool.onnx")
+
+    if backend == "int8":
+        # Quantized models are cached per calibration set, so new audio means a new calibration
+        digest = _calibration_digest(_calibration_sources())
+        trunk_batches, pool_batches = [], []
+        for waveform in _calibration_waveforms():
+            clip_feats, clip_lengths = _normalized_features(classifier, [waveform])
+            with torch.no_grad():
+                clip_frames = trunk(clip_feats, clip_lengths)
+            trunk_batches.append((clip_feats, clip_lengths))
+            pool_batches.append((clip_frames, clip_lengths))
+        trunk_path = _quantize_int8(trunk_path, BACKEND_DIR / f"{name}-trunk-int8-{digest}.onnx",
+                                    ("feats", "lengths"), trunk_batches)
+        pool_path = _quantize_int8(pool_path, BACKEND_DIR / f"{name}-pool-int8-{digest}.onnx",
+                                   ("frames", "lengths"), pool_batches)
+
+    embedding_model = BackendEmbedding(_OnnxFunction(trunk_path, ("feats", "lengths")),
+                                       _OnnxFunction(pool_path, ("frames", "lengths")))
+    return BackendClassifier(classifier, embedding_model, backend)
+
+
+def backend_model(name, classifier, backend=None):
+    """
+    classifier running on backend (default: the selected one), built once per process.
+    Falls back to the eager classifier if the backend can't be built.
+    """
+    backend = backend or _backend
+    key = (name, backend)
+    if backend == "eager" or key in _failed:
+        return classifier
+
+    model = _backend_models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        if key in _backend_models:
+            return _backend_models[key]
+        print(f"⚙️ Building {backend} backend for the {name} model...")
+        start = time.perf_counter()
+        try:
+            model = _build(name, classifier, backend)
+        except Exception as e:
+            print(f"⚠️ {backend} backend unavailable for the {name} model ({str(e)[:100]}), using eager PyTorch")
+            _failed.add(key)
+            return classifier
+        _backend_models[key] = model
+        print(f"✅ {backend} backend for the {name} model ready in {time.perf_counter() - start:.1f}s")
+    return model
+
+
+# ---------------------------------------------------------------------------
+# Parity check
+# ---------------------------------------------------------------------------
+
+def _parity_clips(audio=None):
+    if not audio:
+        return _calibration_waveforms(noise_fallback=True)
+    clips = []
+    for source in audio:
+        waveform = extract_audio(source, to_memory=True) if os.path.exists(source) else None
+        if waveform is not None:
+            clips.append(waveform)
+    return clips
+
+
+def _timed_outputs(classifier, clips, repeats):
+    """Per-clip classifier outputs and total time (best of repeats per clip)"""
+    outputs = []
+    total = 0.0
+    for clip in clips:
+        wavs = load_waveform(clip).unsqueeze(0)
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            out_prob = classifier.classify_batch(wavs)[0]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        outputs.append(out_prob[0])
+        total += best
+    return torch.stack(outputs), total
+
+
+def parity_check(audio=None, backends=("torchscript", "onnx", "int8"), repeats=3):
+    """
+    Run every backend and eager PyTorch on the same clips and compare.
+    audio: paths of audio/video files (default: clips cut from CALIBRATION_AUDIO)
+    Returns: {model: {backend: {"agreement", "max_abs_diff", "eager_ms", "backend_ms", "speedup"}}}
+    """
+    from model_registry import LANGUAGE_MODEL, ACCENT_MODEL, get_model
+
+    clips = _parity_clips(audio)
+    if not clips:
+        raise ValueError("No audio to compare on")
+    print(f"🔬 Parity check on {len(clips)} clip(s)")
+
+    report = {}
+    for name in (LANGUAGE_MODEL, ACCENT_MODEL):
+        eager = get_model(name)
+        eager_out, eager_time = _timed_outputs(eager, clips, repeats)
+        report[name] = {}
+
+        for backend in backends:
+            model = backend_model(name, eager, backend)
+            if model is eager:
+                report[name][backend] = {"error": "backend unavailable"}
+                continue
+            out, backend_time = _timed_outputs(model, clips, repeats)
+            report[name][backend] = {
+                "agreement": round(float((out.argmax(-1) == eager_out.argmax(-1)).float().mean()), 3),
+                "max_abs_diff": round(float((out - eager_out).abs().max()), 5),
+                "eager_ms": round(eager_time * 1000, 1),
+                "backend_ms": round(backend_time * 1000, 1),
+                "speedup": round(eager_time / backend_time, 2) if backend_time else None,
+            }
+
+    print("📊 Backend parity (vs eager PyTorch):")
+    for name, results in report.items():
+        for backend, result in results.items():
+            if "error" in result:
+                print(f"   - {name:<8} {backend:<12} {result['error']}")
+                continue
+            print(f"   - {name:<8} {backend:<12} agreement {result['agreement']:.0%}, "
+                  f"max diff {result['max_abs_diff']:.4f}, speedup {result['speedup']:.2f}x "
+                  f"({result['eager_ms']:.0f} -> {result['backend_ms']:.0f} ms)")
+    return report
+
+
+if __name__ == "__main__":
+    parity_check(sys.argv[1:])
@@ -0,0 +1,196 @@
+"""
+Dynamic micro-batching inference service
+Concurrent requests are queued, grouped into length buckets and run through
+the ECAPA models together. A bucket is flushed when it is full or when its
+oldest request has waited max_wait_ms, so tail latency stays bounded.
+"""
+import bisect
+import threading
+import time
+from concurrent.futures import Future
+
+from utils import SAMPLE_RATE, load_waveform, analyze_speech_batch
+
+
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT_MS = 50
+
+# Upper edges (seconds) of the length buckets; longer clips go in the last bucket
+DEFAULT_BUCKET_EDGES = (5, 10, 20, 40, 80)
+
+
+class _Request:
+    __slots__ = ("waveform", "future", "enqueued_at", "cache_key")
+
+    def __init__(self, waveform, cache_key=None):
+        self.waveform = waveform
+        self.cache_key = cache_key
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class InferenceService:
+    """
+    Micro-batching front-end for analyze_speech.
+    submit() returns a Future resolving to an analyze_speech(return_details=True)
+    style dict; a single worker thread runs the batches.
+    """
+
+    def __init__(self, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 bucket_edges=DEFAULT_BUCKET_EDGES, max_duration=None, vad=None, result_cache=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.bucket_edges = tuple(bucket_edges)
+        self.max_duration = max_duration
+        self.vad = vad
+        self.result_cache = result_cache
+
+        self._buckets = [[] for _ in range(len(self.bucket_edges) + 1)]
+        self._condition = threading.Condition()
+        self._worker = None
+        self._running = False
+
+        self.batches_run = 0
+        self.requests_served = 0
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        """Start the batching worker thread (idempotent)"""
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+            self._worker = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+            self._worker.start()
+        print(f"🚀 Inference service started (batch ≤ {self.max_batch_size}, wait ≤ {self.max_wait * 1000:.0f} ms)")
+        return self
+
+    def stop(self):
+        """Stop the worker after the queued requests have been served"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    # -- requests ----------------------------------------------------------
+
+    def _bucket_index(self, num_samples):
+        return bisect.bisect_left(self.bucket_edges, num_samples / SAMPLE_RATE)
+
+    def submit(self, audio):
+        """Queue a clip (path or 16 kHz mono waveform); returns a Future with the result dict"""
+        if not self._running:
+            self.start()
+
+        waveform = load_waveform(audio)
+        if self.max_duration:
+            waveform = waveform[:int(self.max_duration * SAMPLE_RATE)]
+
+        cache_key = None
+        if self.result_cache is not None:
+            from result_cache import analysis_options, audio_fingerprint
+            cache_key = audio_fingerprint(waveform, **analysis_options(max_duration=self.max_duration, vad=self.vad))
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                future = Future()
+                future.set_result({**cached, "error": None, "cached": True})
+                return future
+
+        request = _Request(waveform, cache_key)
+        with self._condition:
+            self._buckets[self._bucket_index(waveform.numel())].append(request)
+            self._condition.notify()
+        return request.future
+
+    def analyze(self, audio, timeout=None):
+        """Blocking helper: submit and wait for the result"""
+        return self.submit(audio).result(timeout=timeout)
+
+    def pending(self):
+        """Number of queued requests"""
+        with self._condition:
+            return sum(len(bucket) for bucket in self._buckets)
+
+    # -- worker ------------------------------------------------------------
+
+    def _next_batch(self):
+        """
+        Wait until a bucket is full or its oldest request is due, then pop a batch.
+        Returns None when the service is stopped and the queue is empty.
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                next_deadline = None
+
+                for bucket in self._buckets:
+                    if not bucket:
+                        continue
+                    deadline = bucket[0].enqueued_at + self.max_wait
+                    if len(bucket) >= self.max_batch_size or deadline <= now or not self._running:
+                        batch = bucket[:self.max_batch_size]
+                        del bucket[:self.max_batch_size]
+                        return batch
+                    if next_deadline is None or deadline < next_deadline:
+                        next_deadline = deadline
+
+                if not self._running:
+                    return None
+                timeout = None if next_deadline is None else max(next_deadline - now, 0)
+                self._condition.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            try:
+                results = analyze_speech_batch([request.waveform for request in batch], vad=self.vad)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            for request, result in zip(batch, results):
+                # A failure here (e.g. a locked or full cache database) fails this request
+                # only; the worker thread must keep serving the others
+                try:
+                    # Cached before the per-request fields are added
+                    if self.result_cache is not None and not result.get("error"):
+                        self.result_cache.put(request.cache_key, result)
+                    result["latency_ms"] = round((time.monotonic() - request.enqueued_at) * 1000, 1)
+                    result["batch_size"] = len(batch)
+                except Exception as e:
+                    print(f"⚠️ Post-processing failed for one request: {e}")
+                    request.future.set_exception(e)
+                    continue
+                request.future.set_result(result)
+
+            self.batches_run += 1
+            self.requests_served += len(batch)
+
+    def stats(self):
+        """Throughput counters"""
+        return {
+            "batches_run": self.batches_run,
+            "requests_served": self.requests_served,
+            "avg_batch_size": round(self.requests_served / self.batches_run, 2) if self.batches_run else 0.0,
+            "pending": self.pending(),
+        }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_inference_service(**kwargs):
+    """Process-wide InferenceService (created and started on first use)"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = InferenceService(**kwargs).start()
+        return _service
@@ -0,0 +1,303 @@
+"""
+Process-wide model registry
+Each model is loaded once per process and shared (read-only) between requests
+"""
+import os
+import sys
+import threading
+import time
+
+from utils import CACHE_DIR, SAMPLE_RATE
+from thread_policy import configure_torch
+
+
+LANGUAGE_MODEL = "language"
+ACCENT_MODEL = "accent"
+WHISPER_MODEL = "whisper"
+VAD_MODEL = "vad"
+
+# Models loaded and run once by warm_up() (comma-separated, e.g. "language,accent,vad,whisper")
+PRELOAD_MODELS = tuple(
+    name.strip() for name in os.environ.get("ACCENT_PRELOAD_MODELS", "language,accent").split(",") if name.strip()
+)
+
+# Length of the dummy input used for the warm-up forward passes
+WARMUP_SECONDS = 1.0
+
+_models = {}
+_model_stats = {}
+_registry_lock = threading.Lock()
+_load_locks = {}
+
+
+def _freeze(module):
+    """Put a torch module in eval mode and disable gradients so it can be shared"""
+    module.eval()
+    for param in module.parameters():
+        param.requires_grad_(False)
+    return module
+
+
+def _load_language_model():
+    """SpeechBrain VoxLingua107 ECAPA language identifier"""
+    from speechbrain.pretrained import EncoderClassifier
+
+    model = EncoderClassifier.from_hparams(
+        source="speechbrain/lang-id-voxlingua107-ecapa",
+        savedir=str(CACHE_DIR / "lang-id-voxlingua107-ecapa")
+    )
+    _freeze(model.mods)
+    return model
+
+
+def _load_accent_model():
+    """SpeechBrain CommonAccent ECAPA English accent classifier"""
+    from speechbrain.pretrained import EncoderClassifier
+
+    model = EncoderClassifier.from_hparams(
+        source="Jzuluaga/accent-id-commonaccent_ecapa",
+        savedir=str(CACHE_DIR / "accent-id-commonaccent_ecapa")
+    )
+    _freeze(model.mods)
+    return model
+
+
+def _load_whisper():
+    """Whisper processor and model, returned as a (processor, model) pair"""
+    from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+    processor = WhisperProcessor.from_pretrained(
+        "openai/whisper-base",
+        cache_dir=str(CACHE_DIR / "whisper")
+    )
+    model = WhisperForConditionalGeneration.from_pretrained(
+        "openai/whisper-base",
+        cache_dir=str(CACHE_DIR / "whisper")
+    )
+    _freeze(model)
+    return processor, model
+
+
+def _load_vad_model():
+    """SpeechBrain CRDNN voice activity detector (LibriParty)"""
+    from speechbrain.pretrained import VAD
+
+    model = VAD.from_hparams(
+        source="speechbrain/vad-crdnn-libriparty",
+        savedir=str(CACHE_DIR / "vad-crdnn-libriparty")
+    )
+    _freeze(model.mods)
+    return model
+
+
+_LOADERS = {
+    LANGUAGE_MODEL: _load_language_model,
+    ACCENT_MODEL: _load_accent_model,
+    WHISPER_MODEL: _load_whisper,
+    VAD_MODEL: _load_vad_model,
+}
+
+
+def _current_rss_mb():
+    """Resident memory of this process in MB, or None if it can't be measured"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KB on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except (ImportError, OSError):
+        return None
+
+
+def _get_load_lock(name):
+    with _registry_lock:
+        if name not in _load_locks:
+            _load_locks[name] = threading.Lock()
+        return _load_locks[name]
+
+
+def get_model(name):
+    """
+    Return the shared instance of a model, loading it on first use.
+    Concurrent callers asking for the same model wait for a single load.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    if name not in _LOADERS:
+        raise ValueError(f"Unknown model: {name} (available: {', '.join(_LOADERS)})")
+
+    with _get_load_lock(name):
+        # Another thread may have finished loading while we waited
+        if name in _models:
+            return _models[name]
+
+        print(f"📦 Loading {name} model (once per process)...")
+        rss_before = _current_rss_mb()
+        start = time.perf_counter()
+
+        configure_torch()
+        model = _LOADERS[name]()
+
+        load_time = time.perf_counter() - start
+        rss_after = _current_rss_mb()
+        rss_delta = None
+        if rss_before is not None and rss_after is not None:
+            rss_delta = rss_after - rss_before
+
+        _model_stats[name] = {
+            "load_time_s": round(load_time, 2),
+            "rss_mb": round(rss_after, 1) if rss_after is not None else None,
+            "rss_delta_mb": round(rss_delta, 1) if rss_delta is not None else None,
+        }
+        _models[name] = model
+
+        memory_info = f", +{rss_delta:.0f} MB RSS" if rss_delta is not None else ""
+        print(f"✅ {name} model loaded in {load_time:.1f}s{memory_info}")
+
+    return model
+
+
+def _on_backend(name):
+    """Shared model on the inference backend selected in inference_backends"""
+    from inference_backends import backend_model
+    return backend_model(name, get_model(name))
+
+
+def get_language_model():
+    """Shared VoxLingua107 EncoderClassifier (on the selected inference backend)"""
+    return _on_backend(LANGUAGE_MODEL)
+
+
+def get_accent_model():
+    """Shared CommonAccent EncoderClassifier (on the selected inference backend)"""
+    return _on_backend(ACCENT_MODEL)
+
+
+def get_whisper():
+    """Shared Whisper (processor, model) pair"""
+    return get_model(WHISPER_MODEL)
+
+
+def get_vad_model():
+    """Shared SpeechBrain VAD"""
+    return get_model(VAD_MODEL)
+
+
+def is_loaded(name):
+    """Check if a model is already resident in this process"""
+    return name in _models
+
+
+def get_model_stats():
+    """Load time and resident memory for every model loaded so far"""
+    return {name: dict(stats) for name, stats in _model_stats.items()}
+
+
+def report_models():
+    """Print load time and memory usage for each loaded model"""
+    print("📊 Loaded models:")
+    if not _model_stats:
+        print("   (none)")
+        return
+
+    for name, stats in _model_stats.items():
+        delta = stats["rss_delta_mb"]
+        delta_text = f"{delta:+.0f} MB" if delta is not None else "n/a"
+        print(f"   - {name:<10} load {stats['load_time_s']:.1f}s, RSS delta {delta_text}")
+
+    rss = _current_rss_mb()
+    if rss is not None:
+        print(f"   Process RSS: {rss:.0f} MB")
+
+
+# ---------------------------------------------------------------------------
+# Warm-up and readiness
+# ---------------------------------------------------------------------------
+
+_ready = threading.Event()
+_warmup_status = {}
+_warmup_thread = None
+
+
+def probe(name):
+    """
+    Health check: one forward pass of a model (loaded on first use, on its
+    inference backend) on low-level noise. Raises if the model is unknown or fails.
+    Used for warm-up and by the circuit breakers to bring a detector back.
+    """
+    import torch
+
+    if name not in _LOADERS:
+        raise ValueError(f"Unknown model: {name} (available: {', '.join(_LOADERS)})")
+
+    generator = torch.Generator().manual_seed(0)
+    wavs = torch.randn(1, int(SAMPLE_RATE * WARMUP_SECONDS), generator=generator) * 0.01
+
+    with torch.no_grad():
+        if name == LANGUAGE_MODEL:
+            get_language_model().classify_batch(wavs)
+        elif name == ACCENT_MODEL:
+            get_accent_model().classify_batch(wavs)
+        elif name == VAD_MODEL:
+            get_vad_model().get_speech_prob_chunk(wavs)
+        elif name == WHISPER_MODEL:
+            processor, model = get_whisper()
+            input_features = processor(wavs[0].numpy(), sampling_rate=SAMPLE_RATE,
+                                       return_tensors="pt").input_features
+            model.generate(input_features, max_length=2)
+
+
+def warm_up(names=PRELOAD_MODELS):
+    """
+    Download/load models into CACHE_DIR and run one dummy forward pass each,
+    so exports, allocators and kernels are initialized before the first request.
+    The process is marked ready once every model warmed up without errors.
+    Returns: {name: {"warmup_s", "backend"} or {"error"}}
+    """
+    from inference_backends import get_backend
+
+    print(f"🔥 Warming up models: {', '.join(names) or '(none)'}")
+    start = time.perf_counter()
+    for name in names:
+        model_start = time.perf_counter()
+        try:
+            probe(name)
+            backend = get_backend() if name in (LANGUAGE_MODEL, ACCENT_MODEL) else "eager"
+            _warmup_status[name] = {"warmup_s": round(time.perf_counter() - model_start, 2), "backend": backend}
+        except Exception as e:
+            print(f"❌ Warm-up of {name} failed: {e}")
+            _warmup_status[name] = {"error": str(e)}
+
+    if all("error" not in _warmup_status[name] for name in names):
+        _ready.set()
+        print(f"✅ Models warm in {time.perf_counter() - start:.1f}s - ready for requests")
+    return warmup_status()
+
+
+def start_warm_up(names=PRELOAD_MODELS):
+    """Run warm_up() in a daemon thread (once per process); returns the thread"""
+    global _warmup_thread
+    with _registry_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, args=(names,), daemon=True, name="model-warmup")
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def is_ready():
+    """True once warm_up() has loaded and run every preloaded model in this process"""
+    return _ready.is_set()
+
+
+def warmup_status():
+    """Per-model warm-up time and backend (or error) so far"""
+    return {name: dict(status) for name, status in _warmup_status.items()}
@@ -0,0 +1,135 @@
+"""
+Pre-screen for decoded audio
+Cheap checks on the PCM - level, speech ratio (energy VAD), voicing and
+clipping - that reject inputs the models could only guess on (silence, a
+near-empty audio track, noise with no voiced speech, badly clipped
+recordings) in milliseconds, before VoxLingua107 or the accent model run.
+The voicing check looks for pitch periodicity: broadband noise and static
+are caught, pitched sounds (music, hum) pass - vad="speechbrain" removes music.
+"""
+import numpy as np
+
+from utils import SAMPLE_RATE
+from vad import FRAME_MS, HOP_MS, MIN_SPEECH_SECONDS, energy_speech_segments, speech_energy
+
+
+# Clips shorter than this (seconds) are rejected
+MIN_DURATION_SECONDS = 1.0
+
+# Loudest frame (dBFS) below this counts as silence
+SILENCE_DB = -50.0
+
+# |sample| at or above this is clipped...
+CLIPPING_LEVEL = 0.99
+# ...more than this fraction of clipped samples is rejected, and above
+# WARN_CLIPPING_RATIO the result carries a warning
+MAX_CLIPPING_RATIO = 0.2
+WARN_CLIPPING_RATIO = 0.01
+
+# Voicing: a speech frame is voiced if its normalized autocorrelation peaks at
+# VOICING_THRESHOLD or more at a pitch between MIN_PITCH_HZ and MAX_PITCH_HZ.
+# MIN_VOICED_RATIO is kept low so that noisy speech is never rejected.
+MIN_PITCH_HZ = 80.0
+MAX_PITCH_HZ = 400.0
+VOICING_THRESHOLD = 0.5
+MIN_VOICED_RATIO = 0.1
+# Speech frames examined for voicing (evenly spread over the clip)
+VOICING_FRAMES = 2000
+
+MESSAGES = {
+    "too_short": "Audio is too short to analyze",
+    "silent": "Audio is silent (no audio track or muted)",
+    "insufficient_speech": "Not enough speech in the audio",
+    "no_voice": "No voiced speech in the audio (noise only)",
+    "clipped": "Audio is too heavily clipped (distorted) to analyze",
+}
+
+
+def voiced_ratio(samples, segments, sample_rate=SAMPLE_RATE):
+    """
+    Fraction of the frames inside speech segments (sample spans) that have a
+    pitch. At most VOICING_FRAMES frames are examined, so the cost is bounded.
+    """
+    frame_length = int(FRAME_MS * sample_rate / 1000)
+    hop_length = int(HOP_MS * sample_rate / 1000)
+    starts = np.concatenate([np.arange(start, max(start + 1, end - frame_length + 1), hop_length)
+                             for start, end in segments]) if segments else np.array([], dtype=int)
+    if not len(starts):
+        return 0.0
+    starts = starts[np.linspace(0, len(starts) - 1, min(len(starts), VOICING_FRAMES)).astype(int)]
+
+    frames = np.zeros((len(starts), frame_length), dtype=np.float32)
+    for row, start in enumerate(starts):
+        frame = samples[start:start + frame_length]
+        frames[row, :len(frame)] = frame
+    frames -= frames.mean(axis=1, keepdims=True)
+
+    # Autocorrelation through the FFT, normalized by lag 0 and by the overlap at each lag
+    power = np.abs(np.fft.rfft(frames, n=2 * frame_length)) ** 2
+    autocorrelation = np.fft.irfft(power)[:, :frame_length]
+    autocorrelation /= autocorrelation[:, :1] + 1e-12
+    shortest, longest = int(sample_rate / MAX_PITCH_HZ), min(int(sample_rate / MIN_PITCH_HZ), frame_length // 2)
+    lags = np.arange(shortest, longest + 1)
+    candidates = autocorrelation[:, lags] * frame_length / (frame_length - lags)
+    # A pitch peak comes after the autocorrelation has dipped below zero; low-pass
+    # noise decays smoothly from lag 0 and would otherwise look voiced
+    first_dip = np.argmax(autocorrelation < 0, axis=1)
+    first_dip[~(autocorrelation < 0).any(axis=1)] = frame_length
+    candidates[lags[None, :] < first_dip[:, None]] = 0.0
+    return float(np.mean(candidates.max(axis=1) >= VOICING_THRESHOLD))
+
+
+def prescreen_audio(waveform, sample_rate=SAMPLE_RATE, energy=None):
+    """
+    Decide whether a clip is worth running the models on.
+    energy: vad.speech_energy(waveform) if already computed (it is shared with apply_vad)
+    Returns: {"passed", "reason", "message", "seconds", "rms_db", "peak_db",
+    "speech_ratio", "speech_seconds", "voiced_ratio", "clipping_ratio", "warnings"}
+    """
+    samples = waveform.numpy() if hasattr(waveform, "numpy") else np.asarray(waveform, dtype=np.float32)
+    seconds = len(samples) / sample_rate
+
+    if energy is None:
+        energy = speech_energy(samples, sample_rate)
+    rms_db = float(10.0 * np.log10(np.mean(np.square(samples, dtype=np.float64)) + 1e-20))
+    clipping_ratio = float(np.mean(np.abs(samples) >= CLIPPING_LEVEL)) if len(samples) else 0.0
+
+    speech_samples = 0
+    voiced = 0.0
+    if energy.max() >= SILENCE_DB:
+        segments = energy_speech_segments(samples, sample_rate, energy)
+        speech_samples = sum(end - start for start, end in segments)
+        voiced = voiced_ratio(samples, segments, sample_rate)
+
+    screen = {
+        "passed": True,
+        "reason": None,
+        "message": None,
+        "seconds": round(seconds, 2),
+        "rms_db": round(rms_db, 1),
+        "peak_db": round(float(energy.max()), 1),
+        "speech_ratio": round(speech_samples / max(len(samples), 1), 3),
+        "speech_seconds": round(speech_samples / sample_rate, 2),
+        "voiced_ratio": round(voiced, 3),
+        "clipping_ratio": round(clipping_ratio, 4),
+        "warnings": [],
+    }
+
+    if seconds < MIN_DURATION_SECONDS:
+        screen["reason"] = "too_short"
+    elif energy.max() < SILENCE_DB:
+        screen["reason"] = "silent"
+    elif clipping_ratio > MAX_CLIPPING_RATIO:
+        screen["reason"] = "clipped"
+    elif speech_samples < MIN_SPEECH_SECONDS * sample_rate:
+        screen["reason"] = "insufficient_speech"
+    elif voiced < MIN_VOICED_RATIO:
+        screen["reason"] = "no_voice"
+
+    if screen["reason"]:
+        screen.update(passed=False, message=MESSAGES[screen["reason"]])
+        print(f"🚫 Pre-screen: {screen['message']} ({seconds:.1f}s, peak {screen['peak_db']:.0f} dBFS, "
+              f"{screen['speech_seconds']:.1f}s speech, {voiced:.0%} voiced, {clipping_ratio:.1%} clipped)")
+    elif clipping_ratio > WARN_CLIPPING_RATIO:
+        screen["warnings"].append(f"{clipping_ratio:.1%} of the samples are clipped")
+    return screen
@@ -0,0 +1,330 @@
+"""
+Audio-only fetching of remote MP4 videos
+Reads the moov box with HTTP range requests, then downloads only the byte
+ranges that hold audio samples (optionally only the first N seconds).
+Video bytes are never transferred.
+"""
+import os
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import ffmpeg
+import requests
+
+from utils import DOWNLOAD_HEADERS, SAMPLE_RATE, _input_stream, pcm_output, pcm_s16le_to_float32, cleanup_files
+
+
+# Audio chunks closer together than this are fetched with one request
+MERGE_GAP = 64 * 1024
+
+# Parallel range requests per file
+FETCH_WORKERS = 4
+
+# More top-level boxes than this means a fragmented / unusual file
+MAX_TOP_LEVEL_BOXES = 64
+
+_local = threading.local()
+
+
+class RangeFetchError(Exception):
+    """The file can't be fetched selectively (no range support, not a plain MP4, ...)"""
+
+
+def _session():
+    """One keep-alive session per thread"""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers.update(DOWNLOAD_HEADERS)
+    return _local.session
+
+
+def fetch_range(url, start, end):
+    """Bytes start..end (inclusive) of a remote file"""
+    with _session().get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise RangeFetchError("Server does not support byte ranges")
+        return response.content
+
+
+def probe_remote_size(url):
+    """Size of a remote file, or RangeFetchError if the server can't serve ranges"""
+    with _session().get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        content_range = response.headers.get("Content-Range", "")
+        if response.status_code != 206 or "/" not in content_range:
+            raise RangeFetchError("Server does not support byte ranges")
+        total = content_range.rsplit("/", 1)[1]
+        if not total.isdigit():
+            raise RangeFetchError("Server did not report the file size")
+        return int(total)
+
+
+# ---------------------------------------------------------------------------
+# MP4 box parsing
+# ---------------------------------------------------------------------------
+
+def _read_box_header(data, pos):
+    """(size, type, header_size) of the box at pos; size None means 'to the end'"""
+    size, box_type = struct.unpack_from(">I4s", data, pos)
+    if size == 1:
+        return struct.unpack_from(">Q", data, pos + 8)[0], box_type, 16
+    if size == 0:
+        return None, box_type, 8
+    return size, box_type, 8
+
+
+def _children(data, start, end):
+    """Iterate (type, payload_start, box_end) over the boxes in data[start:end]"""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type, header = _read_box_header(data, pos)
+        if size is None:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _find(data, start, end, box_type):
+    """Payload bounds of the first child box of the given type, or None"""
+    for child_type, payload_start, box_end in _children(data, start, end):
+        if child_type == box_type:
+            return payload_start, box_end
+    return None
+
+
+def _find_path(data, start, end, *path):
+    """Follow a chain of box types, e.g. ('mdia', 'minf', 'stbl')"""
+    bounds = (start, end)
+    for box_type in path:
+        bounds = _find(data, bounds[0], bounds[1], box_type)
+        if bounds is None:
+            return None
+    return bounds
+
+
+def _top_level_boxes(url, file_size):
+    """
+    Map of top-level box type to (offset, size), found with tiny header requests.
+    Also returns every box header so the sparse copy keeps a valid box layout.
+    """
+    boxes = {}
+    headers = []
+    pos = 0
+    while pos < file_size:
+        if len(headers) >= MAX_TOP_LEVEL_BOXES:
+            raise RangeFetchError("Too many top-level boxes")
+        head = fetch_range(url, pos, min(pos + 15, file_size - 1))
+        if len(head) < 8:
+            raise RangeFetchError("Truncated MP4 box header")
+        size, box_type, header = _read_box_header(head, 0)
+        if size is None:
+            size = file_size - pos
+        if size < header:
+            raise RangeFetchError("Corrupt MP4 box header")
+        if box_type == b"moof":
+            raise RangeFetchError("Fragmented MP4 is not supported")
+        boxes.setdefault(box_type, (pos, size))
+        headers.append((pos, head[:header]))
+        pos += size
+    return boxes, headers
+
+
+def _full_box_entries(data, bounds, fmt, fields):
+    """Entry table of a 'full box' (version/flags + entry_count + entries)"""
+    start, _ = bounds
+    count = struct.unpack_from(">I", data, start + 4)[0]
+    values = struct.unpack_from(f">{count * fields}{fmt}", data, start + 8)
+    if fields == 1:
+        return list(values)
+    return [values[i:i + fields] for i in range(0, len(values), fields)]
+
+
+def _audio_sample_tables(moov):
+    """Timescale and sample tables of the first audio track in a moov box"""
+    for box_type, trak_start, trak_end in _children(moov, 8, len(moov)):
+        if box_type != b"trak":
+            continue
+
+        hdlr = _find_path(moov, trak_start, trak_end, b"mdia", b"hdlr")
+        if hdlr is None or moov[hdlr[0] + 8:hdlr[0] + 12] != b"soun":
+            continue
+
+        mdhd = _find_path(moov, trak_start, trak_end, b"mdia", b"mdhd")
+        stbl = _find_path(moov, trak_start, trak_end, b"mdia", b"minf", b"stbl")
+        if mdhd is None or stbl is None:
+            raise RangeFetchError("Audio track is missing its sample tables")
+
+        version = moov[mdhd[0]]
+        timescale = struct.unpack_from(">I", moov, mdhd[0] + (20 if version == 1 else 12))[0]
+
+        stts = _find(moov, *stbl, b"stts")
+        stsc = _find(moov, *stbl, b"stsc")
+        stsz = _find(moov, *stbl, b"stsz")
+        stco = _find(moov, *stbl, b"stco")
+        co64 = _find(moov, *stbl, b"co64")
+        if None in (stts, stsc, stsz) or (stco is None and co64 is None):
+            raise RangeFetchError("Unsupported audio sample tables (stz2 or missing boxes)")
+
+        uniform_size, sample_count = struct.unpack_from(">II", moov, stsz[0] + 4)
+        if uniform_size:
+            sizes = [uniform_size] * sample_count
+        else:
+            sizes = list(struct.unpack_from(f">{sample_count}I", moov, stsz[0] + 12))
+
+        return {
+            "timescale": timescale,
+            "stts": _full_box_entries(moov, stts, "I", 2),
+            "stsc": _full_box_entries(moov, stsc, "I", 3),
+            "sizes": sizes,
+            "offsets": _full_box_entries(moov, stco, "I", 1) if stco else _full_box_entries(moov, co64, "Q", 1),
+        }
+
+    raise RangeFetchError("No audio track found")
+
+
+def audio_chunks(tables, max_seconds=None):
+    """
+    (offset, size) of each audio chunk in the file, in decode order.
+    With max_seconds, stops after the chunk containing that timestamp.
+    """
+    timescale = tables["timescale"] or 1
+    sizes = tables["sizes"]
+    offsets = tables["offsets"]
+    stsc = tables["stsc"]
+
+    # Start time (in timescale units) of every sample
+    start_times = []
+    elapsed = 0
+    for count, delta in tables["stts"]:
+        for _ in range(count):
+            start_times.append(elapsed)
+            elapsed += delta
+    limit = max_seconds * timescale if max_seconds else None
+
+    chunks = []
+    sample = 0
+    for i, (first_chunk, samples_per_chunk, _) in enumerate(stsc):
+        last_chunk = stsc[i + 1][0] - 1 if i + 1 < len(stsc) else len(offsets)
+        for chunk in range(first_chunk, last_chunk + 1):
+            if sample >= len(sizes):
+                return chunks
+            if limit is not None and sample < len(start_times) and start_times[sample] >= limit:
+                return chunks
+            size = sum(sizes[sample:sample + samples_per_chunk])
+            chunks.append((offsets[chunk - 1], size))
+            sample += samples_per_chunk
+    return chunks
+
+
+def merge_ranges(chunks, gap=MERGE_GAP):
+    """Coalesce (offset, size) chunks into inclusive (start, end) byte ranges"""
+    ranges = []
+    for offset, size in sorted(chunks):
+        if size <= 0:
+            continue
+        end = offset + size - 1
+        if ranges and offset - ranges[-1][1] <= gap:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([offset, end])
+    return [tuple(r) for r in ranges]
+
+
+# ---------------------------------------------------------------------------
+# Fetching
+# ---------------------------------------------------------------------------
+
+def fetch_audio_only(url, max_seconds=None, output_path=None):
+    """
+    Build a sparse local copy of a remote MP4 that contains only the ftyp/moov
+    boxes and the audio samples (holes everywhere else, so it takes almost no
+    disk). Raises RangeFetchError if the file can't be fetched this way.
+    Returns: (path, bytes_fetched, file_size)
+    """
+    file_size = probe_remote_size(url)
+    boxes, box_headers = _top_level_boxes(url, file_size)
+    if b"moov" not in boxes:
+        raise RangeFetchError("No moov box found (not an MP4/MOV file?)")
+
+    moov_offset, moov_size = boxes[b"moov"]
+    moov = fetch_range(url, moov_offset, moov_offset + moov_size - 1)
+    ranges = merge_ranges(audio_chunks(_audio_sample_tables(moov), max_seconds))
+    if not ranges:
+        raise RangeFetchError("Audio track has no samples")
+
+    if output_path is None:
+        fd, output_path = tempfile.mkstemp(suffix=".mp4")
+        os.close(fd)
+
+    bytes_fetched = len(moov)
+    try:
+        with open(output_path, "r+b") as f:
+            f.truncate(file_size)
+            for offset, header in box_headers:
+                f.seek(offset)
+                f.write(header)
+            f.seek(moov_offset)
+            f.write(moov)
+
+            if b"ftyp" in boxes:
+                ftyp_offset, ftyp_size = boxes[b"ftyp"]
+                f.seek(ftyp_offset)
+                f.write(fetch_range(url, ftyp_offset, ftyp_offset + ftyp_size - 1))
+                bytes_fetched += ftyp_size
+
+            with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+                futures = {pool.submit(fetch_range, url, start, end): start for start, end in ranges}
+                for future in as_completed(futures):
+                    data = future.result()
+                    f.seek(futures[future])
+                    f.write(data)
+                    bytes_fetched += len(data)
+    except Exception:
+        cleanup_files(output_path)
+        raise
+
+    return output_path, bytes_fetched, file_size
+
+
+def fetch_audio(url, max_seconds=None):
+    """
+    Decode the audio of a remote MP4 while downloading only its audio bytes.
+    Returns a 16 kHz mono float32 waveform, or None if the server / file
+    doesn't allow selective fetching (callers should fall back to a full download).
+    """
+    print(f"🎯 Fetching audio track only...")
+
+    path = None
+    try:
+        path, bytes_fetched, file_size = fetch_audio_only(url, max_seconds)
+        print(f"✅ Fetched {bytes_fetched:,} of {file_size:,} bytes "
+              f"({100.0 * bytes_fetched / max(file_size, 1):.1f}%)")
+
+        # Don't let ffmpeg decode past the fetched region
+        stream = _input_stream(path, max_seconds)
+        out, err = pcm_output(stream).run(capture_stdout=True, capture_stderr=True)
+        waveform = pcm_s16le_to_float32(out)
+
+        if waveform.size == 0:
+            print("❌ Audio-only fetch produced no samples")
+            return None
+        print(f"✅ Audio decoded ({waveform.size / SAMPLE_RATE:.1f}s)")
+        return waveform
+
+    except RangeFetchError as e:
+        print(f"⚠️ Audio-only fetch not possible: {e}")
+        return None
+    except ffmpeg.Error as e:
+        print(f"❌ FFmpeg failed: {e.stderr.decode(errors='replace')[-300:] if e.stderr else str(e)}")
+        return None
+    except Exception as e:
+        print(f"❌ Audio-only fetch failed: {e}")
+        return None
+    finally:
+        if path:
+            cleanup_files(path)
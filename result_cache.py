@@ -0,0 +1,221 @@
+"""
+Content-addressed cache of analysis results
+Keys are a hash of the decoded PCM (or of URL + ETag/Last-Modified, so a
+re-submitted link can be answered before downloading anything). Results are
+stored in a local SQLite database with TTL and size-based eviction.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+from utils import CACHE_DIR, DOWNLOAD_HEADERS, TOP_K, load_waveform
+
+
+DEFAULT_CACHE_PATH = CACHE_DIR / "results.sqlite"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 50000
+
+# Every entry point caches the analyze_speech details dict; bump this when its
+# keys change so entries of the old shape are never returned
+RESULT_SCHEMA = "details-v1"
+
+# Fields that describe one request rather than the audio; never cached
+REQUEST_FIELDS = ("error", "cached", "latency_ms", "batch_size")
+
+# Language methods backed by a model. Anything else (the acoustic fallback, the
+# pre-screen, no method at all) is not worth pinning to the audio for the TTL
+MODEL_METHODS = ("speechbrain", "whisper")
+
+
+def _options_suffix(options):
+    """Stable text for the analysis options that change the result"""
+    options = {k: v for k, v in sorted(options.items()) if v is not None}
+    return json.dumps(options, sort_keys=True) if options else ""
+
+
+def _inference_backend():
+    """ECAPA inference backend, without importing inference_backends (and torch) just to ask"""
+    backends = sys.modules.get("inference_backends")
+    if backends is not None:
+        return backends.get_backend()
+    return os.environ.get("ACCENT_INFERENCE_BACKEND", "eager")
+
+
+def analysis_options(max_duration=None, vad=None, top_k=TOP_K, timeline=True, prescreen=True,
+                     windowed=None, progressive_threshold=None):
+    """
+    Key options for a cached analysis result: every analyze_speech option that
+    changes the details dict, plus the inference backend and RESULT_SCHEMA.
+    Use with audio_fingerprint(audio, **analysis_options(...)).
+    """
+    return {
+        "schema": RESULT_SCHEMA,
+        "backend": _inference_backend(),
+        "max_duration": max_duration,
+        "vad": vad,
+        "top_k": top_k,
+        "timeline": timeline,
+        "prescreen": prescreen,
+        "windowed": windowed,
+        "progressive_threshold": progressive_threshold,
+    }
+
+
+def audio_fingerprint(audio, **options):
+    """
+    Cache key for decoded audio: SHA-256 of the 16-bit PCM plus the analysis
+    options (vad, max_duration, ...) that affect the result.
+    """
+    samples = load_waveform(audio).numpy()
+    pcm = np.clip(samples * 32768.0, -32768, 32767).astype('<i2')
+    digest = hashlib.sha256(pcm.tobytes())
+    digest.update(_options_suffix(options).encode())
+    return "pcm:" + digest.hexdigest()
+
+
+def url_fingerprint(url, **options):
+    """
+    Cache key for a remote video from its URL and HTTP validators.
+    Returns None if the server sends neither ETag nor Last-Modified
+    (the content could change without the URL changing).
+    """
+    try:
+        response = requests.head(url, headers=DOWNLOAD_HEADERS, timeout=10, allow_redirects=True)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"⚠️ Could not fingerprint URL: {e}")
+        return None
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return None
+
+    validators = f"{url}\n{etag or ''}\n{last_modified or ''}\n{response.headers.get('Content-Length', '')}"
+    digest = hashlib.sha256(validators.encode())
+    digest.update(_options_suffix(options).encode())
+    return "url:" + digest.hexdigest()
+
+
+def cacheable(result):
+    """
+    Whether a details dict may be cached: no error, the language came from a
+    model and, for English clips, so did the accent (the random accent of a
+    failed accent model has no distribution)
+    """
+    if result.get("error") or result.get("language_method") not in MODEL_METHODS:
+        return False
+    return not result.get("is_english") or result.get("accent_distribution") is not None
+
+
+class ResultCache:
+    """SQLite-backed result cache with TTL and LRU size eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = str(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+        self._db.commit()
+
+    def get(self, key):
+        """Cached result dict for key, or None (expired entries count as misses)"""
+        if key is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT result, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                print(f"💾 Result cache miss ({self.hits} hits / {self.misses} misses)")
+                return None
+
+            self._db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            print(f"💾 Result cache hit ({self.hits} hits / {self.misses} misses)")
+            return json.loads(row[0])
+
+    def put(self, key, result):
+        """
+        Store a details dict (minus REQUEST_FIELDS) and evict expired / least recently used entries.
+        Results that are not cacheable() are skipped. Returns whether the result was stored.
+        """
+        if key is None:
+            return False
+        if not cacheable(result):
+            print(f"💾 Not caching a degraded result (language method: {result.get('language_method')}, "
+                  f"accent from the model: {result.get('accent_distribution') is not None})")
+            return False
+
+        result = {k: v for k, v in result.items() if k not in REQUEST_FIELDS}
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, result, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), now, now),
+            )
+            self._db.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._db.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+        return True
+
+    def clear(self):
+        """Remove every cached result"""
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide ResultCache at the default location"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
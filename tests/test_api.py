@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import api
+import model_registry
+
+
+def _slow_warm_up():
+    time.sleep(0.2)
+    return {"language": {"warmup_s": 0.2}}
+
+
+def test_every_worker_reports_its_own_warm_up(monkeypatch):
+    monkeypatch.setattr(model_registry, "warm_up", _slow_warm_up)
+    monkeypatch.setattr(model_registry, "is_ready", lambda: True)
+    monkeypatch.setattr(api, "INFERENCE_WORKERS", 3)
+    monkeypatch.setattr(api, "_warmup", {"ready": False, "workers": {}})
+
+    context = multiprocessing.get_context("fork")
+    reports = context.Queue()
+    pool = ProcessPoolExecutor(max_workers=3, mp_context=context, initializer=api._init_worker, initargs=(reports,))
+    monkeypatch.setattr(api, "_pool", pool)
+    try:
+        asyncio.run(api._warm_up_workers(reports))
+        worker_pids = {process.pid for process in pool._processes.values()}
+    finally:
+        pool.shutdown()
+
+    assert api._warmup["ready"]
+    assert set(api._warmup["workers"]) == worker_pids
+    assert len(worker_pids) == 3
+
+
+def test_a_failed_warm_up_keeps_the_api_unready(monkeypatch):
+    def broken_warm_up():
+        raise RuntimeError("model download failed")
+
+    monkeypatch.setattr(model_registry, "warm_up", broken_warm_up)
+    monkeypatch.setattr(api, "INFERENCE_WORKERS", 1)
+    monkeypatch.setattr(api, "_warmup", {"ready": False, "workers": {}})
+
+    context = multiprocessing.get_context("fork")
+    reports = context.Queue()
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=api._init_worker, initargs=(reports,))
+    monkeypatch.setattr(api, "_pool", pool)
+    try:
+        asyncio.run(api._warm_up_workers(reports))
+    finally:
+        pool.shutdown()
+
+    assert not api._warmup["ready"]
+    assert "model download failed" in api._warmup["error"]
+
+
+def test_analyze_rejects_a_missing_or_non_string_url(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    started = []
+    monkeypatch.setattr(api, "_start_job", lambda job, **kwargs: started.append(job))
+    client = TestClient(api.app)
+    for body in ({"url": None}, {"url": 42}, {"url": ["https://example.com"]}, {}, ["https://example.com"], None):
+        response = client.post("/analyze", json=body)
+        assert response.status_code == 400, body
+    assert started == []
+
+    response = client.post("/analyze", json={"url": " https://example.com/video.mp4 "})
+    assert response.status_code == 202
+    assert started[0]["source"] == "https://example.com/video.mp4"
+
+
+def test_job_eviction_keeps_unfinished_jobs(monkeypatch):
+    monkeypatch.setattr(api, "_jobs", api.OrderedDict())
+    monkeypatch.setattr(api, "MAX_JOBS", 3)
+    running = api._new_job("running")
+    running["status"] = "analyzing"
+    finished = api._new_job("finished")
+    finished["status"] = "done"
+    for source in ("a", "b", "c"):
+        api._new_job(source)
+
+    assert running["job_id"] in api._jobs
+    assert finished["job_id"] not in api._jobs
+    # Nothing else is finished, so the unfinished jobs are all kept
+    assert len(api._jobs) == 4
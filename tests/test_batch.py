@@ -0,0 +1,34 @@
+import threading
+
+import numpy as np
+
+import batch
+from utils import SAMPLE_RATE
+
+
+def test_inputs_are_loaded_as_results_are_consumed(monkeypatch):
+    started = []
+    lock = threading.Lock()
+
+    def load(item, max_duration=None, vad=None, cache=None):
+        with lock:
+            started.append(item["id"])
+        return np.full(SAMPLE_RATE, 0.1, dtype=np.float32), None, []
+
+    def analyze(waveforms, **kwargs):
+        return [{"is_english": False, "language": "Spanish", "accent": None, "lang_confidence": 90.0,
+                 "accent_confidence": None, "language_distribution": None, "accent_distribution": None,
+                 "timeline": None, "prescreen": None, "language_method": "speechbrain", "error": None}
+                for _ in waveforms]
+
+    monkeypatch.setattr(batch, "_load_with_cache", load)
+    monkeypatch.setattr(batch, "analyze_speech_batch", analyze)
+
+    results = batch.iter_analyze_batch([f"clip{i}.mp4" for i in range(200)], batch_size=4, workers=2,
+                                       use_cache=False)
+    yielded = 0
+    for result in results:
+        yielded += 1
+        # Loaded but not yet returned: bounded by workers + batch_size, not by the input list
+        assert len(started) - yielded <= 2 + 4
+    assert yielded == 200 and sorted(started) == sorted(f"clip{i}.mp4" for i in range(200))
@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+import pytest
+
+import circuit_breaker
+import utils
+from circuit_breaker import CircuitBreaker
+from utils import SAMPLE_RATE
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, cooldown=60)
+    breaker.record_failure("boom")
+    breaker.record_failure("boom")
+    assert breaker.allow() and breaker.state == "closed"
+
+    breaker.record_failure("boom")
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.status()["last_error"] == "boom"
+    assert breaker.status()["retry_in_s"] == 60
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, cooldown=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_without_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown=60)
+    breaker.record_failure()
+    clock[0] += 30
+    assert not breaker.allow()
+
+    clock[0] += 31
+    assert breaker.allow() and breaker.state == "half-open"
+    # Only one trial per cool-down
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock[0] += 61
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_probe_closes_the_circuit(clock):
+    probed = threading.Event()
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown=60, probe=probed.set)
+    breaker.record_failure()
+    clock[0] += 61
+
+    # Requests keep skipping the backend while the probe runs
+    assert not breaker.allow()
+    assert probed.wait(5)
+    for _ in range(100):
+        if breaker.state == "closed":
+            break
+        threading.Event().wait(0.01)
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_probe_keeps_the_circuit_open(clock):
+    def probe():
+        raise RuntimeError("still broken")
+
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown=60, probe=probe)
+    breaker.record_failure()
+    clock[0] += 61
+    assert not breaker.allow()
+    for _ in range(100):
+        if not breaker._probing:
+            break
+        threading.Event().wait(0.01)
+    assert breaker.state == "open" and breaker.last_error == "still broken"
+
+
+def test_batch_skips_speechbrain_while_the_circuit_is_open(monkeypatch):
+    breaker = CircuitBreaker("speechbrain", failure_threshold=1, cooldown=60)
+    breaker.record_failure("model failed to load")
+    monkeypatch.setattr(utils, "_speechbrain_breaker", lambda: breaker)
+
+    def batched(*args, **kwargs):
+        raise AssertionError("batched SpeechBrain ran with the circuit open")
+
+    def per_clip(waveform, **kwargs):
+        return {"is_english": False, "language": "French", "accent": None, "lang_confidence": 80.0,
+                "accent_confidence": None, "language_distribution": None, "accent_distribution": None,
+                "timeline": None, "language_method": "whisper", "detector_timings": {}}
+
+    monkeypatch.setattr(utils, "detect_language_speechbrain_batch", batched)
+    monkeypatch.setattr(utils, "analyze_speech", per_clip)
+
+    clips = [np.zeros(2 * SAMPLE_RATE, dtype=np.float32) for _ in range(2)]
+    results = utils.analyze_speech_batch(clips, timeline=False, prescreen=False)
+    assert [result["language_method"] for result in results] == ["whisper", "whisper"]
+    assert all(result["error"] is None for result in results)
+
+
+def test_batch_failure_is_recorded(monkeypatch):
+    breaker = CircuitBreaker("speechbrain", failure_threshold=1, cooldown=60)
+    monkeypatch.setattr(utils, "_speechbrain_breaker", lambda: breaker)
+
+    def batched(*args, **kwargs):
+        raise RuntimeError("model failed to load")
+
+    monkeypatch.setattr(utils, "detect_language_speechbrain_batch", batched)
+    monkeypatch.setattr(utils, "analyze_speech", lambda waveform, **kwargs: {
+        key: None for key in ("is_english", "language", "accent", "lang_confidence", "accent_confidence",
+                              "language_distribution", "accent_distribution", "timeline",
+                              "language_method", "detector_timings")
+    })
+
+    utils.analyze_speech_batch([np.zeros(2 * SAMPLE_RATE, dtype=np.float32)], timeline=False, prescreen=False)
+    assert breaker.state == "open"
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from embedding_store import EmbeddingStore
+from ecapa_features import log_probabilities
+from utils import COSINE, LOG_PROBS, MAX_ACCENT_CONFIDENCE, _windowed_result, score_distribution, top_confidence
+
+
+class _Labels:
+    def __init__(self, labels):
+        self.labels = labels
+
+    def decode_torch(self, indices):
+        return [self.labels[int(i)] for i in indices.reshape(-1)]
+
+
+LABELS = _Labels(["us", "england", "indian"])
+
+
+def _classifier(weights):
+    """Classifier head only: embeddings (N, 1, D) -> cosine scores (N, 1, C)"""
+    def head(embeddings):
+        normalized = torch.nn.functional.normalize(embeddings, dim=-1)
+        return normalized @ torch.nn.functional.normalize(weights, dim=-1).T
+    return SimpleNamespace(mods=SimpleNamespace(classifier=head), hparams=SimpleNamespace(label_encoder=LABELS))
+
+
+@pytest.mark.parametrize("row, scores", [
+    (torch.tensor([0.31, 0.12, 0.05]), COSINE),
+    (torch.log_softmax(torch.tensor([2.0, 0.5, -1.0]), dim=-1), LOG_PROBS),
+])
+def test_confidence_matches_the_distribution(row, scores):
+    top = score_distribution(row, LABELS, scores, top_k=1)[0]
+    assert top_confidence(row, scores) == pytest.approx(top["probability"] * 100, abs=0.01)
+
+
+def test_negative_cosine_scores_are_not_log_probabilities():
+    # All-negative cosines used to be taken for log-probabilities (exp(-0.05) = 95%)
+    row = torch.tensor([-0.05, -0.06, -0.9])
+    assert top_confidence(row, COSINE) == pytest.approx(100 / (1 + torch.exp(torch.tensor(-0.3)).item()), abs=0.5)
+    assert top_confidence(row, LOG_PROBS) == pytest.approx(95.1, abs=0.1)
+
+
+def test_unknown_score_type():
+    with pytest.raises(ValueError):
+        log_probabilities(torch.zeros(3), "logits")
+
+
+def test_accent_confidence_is_capped():
+    row = torch.tensor([0.9, 0.1, 0.0])
+    assert top_confidence(row, COSINE) > MAX_ACCENT_CONFIDENCE
+    assert top_confidence(row, COSINE, MAX_ACCENT_CONFIDENCE) == MAX_ACCENT_CONFIDENCE
+
+
+def test_windowed_confidence_uses_the_same_calibration():
+    log_probs = torch.log_softmax(30.0 * torch.tensor([[0.31, 0.12, 0.05], [0.28, 0.15, 0.02]]), dim=-1)
+    classifier = SimpleNamespace(hparams=SimpleNamespace(label_encoder=LABELS))
+    result = _windowed_result(classifier, [(0, 16000), (8000, 24000)], log_probs, str, top_k=3,
+                              max_confidence=MAX_ACCENT_CONFIDENCE)
+    assert result["label"] == "us"
+    assert result["confidence"] == pytest.approx(min(result["distribution"][0]["probability"] * 100, 95.0), abs=0.1)
+
+
+def test_rescore_matches_live_scoring(tmp_path):
+    weights = torch.eye(3, 4)
+    classifier = _classifier(weights)
+    store = EmbeddingStore(tmp_path)
+    embedding = torch.tensor([1.0, 0.3, 0.1, 0.0])
+    store.add_clip("clip", {"accent": embedding})
+
+    [(label, confidence)] = store.rescore("accent", classifier, COSINE, max_confidence=MAX_ACCENT_CONFIDENCE).values()
+    out_prob = classifier.mods.classifier(embedding.half().float().reshape(1, 1, -1)).reshape(-1)
+    assert label == "us"
+    assert confidence == round(top_confidence(out_prob, COSINE, MAX_ACCENT_CONFIDENCE), 1)
+    assert confidence <= MAX_ACCENT_CONFIDENCE
@@ -0,0 +1,38 @@
+import types
+
+import torch
+from speechbrain.lobes.features import Fbank
+
+from ecapa_features import FeatureCache, feature_signature, spectrogram_signature
+
+
+def _classifier(**fbank):
+    return types.SimpleNamespace(mods=types.SimpleNamespace(compute_features=Fbank(**fbank)), device="cpu")
+
+
+def test_models_with_different_mel_bands_share_the_spectrogram():
+    # VoxLingua107 uses 60 mel bands, CommonAccent 80, on the same STFT
+    language, accent = _classifier(n_mels=60), _classifier(n_mels=80)
+    assert feature_signature(language) != feature_signature(accent)
+    assert spectrogram_signature(language) == spectrogram_signature(accent)
+
+    wavs = torch.randn(2, 16000, generator=torch.Generator().manual_seed(0)) * 0.1
+    cache = FeatureCache(wavs)
+    for classifier in (language, accent):
+        expected = classifier.mods.compute_features(wavs)
+        assert torch.allclose(cache.features(classifier), expected, atol=1e-5)
+
+    stats = cache.stats()
+    assert (stats["spectrograms"], stats["spectrogram_hits"], stats["feature_sets"]) == (1, 1, 2)
+
+
+def test_deltas_and_a_different_stft_are_respected():
+    plain, deltas, longer = _classifier(n_mels=40), _classifier(n_mels=40, deltas=True), _classifier(n_fft=512)
+    assert spectrogram_signature(plain) != spectrogram_signature(longer)
+
+    wavs = torch.randn(1, 8000, generator=torch.Generator().manual_seed(1)) * 0.1
+    cache = FeatureCache(wavs)
+    for classifier in (plain, deltas, longer):
+        expected = classifier.mods.compute_features(wavs)
+        assert torch.allclose(cache.features(classifier), expected, atol=1e-5)
+    assert cache.stats()["spectrograms"] == 2
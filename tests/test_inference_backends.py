@@ -0,0 +1,36 @@
+import pytest
+
+import inference_backends
+
+
+def test_placeholder_calibration_audio_is_not_used(tmp_path, monkeypatch):
+    empty = tmp_path / "empty.mp4"
+    empty.write_bytes(b"")
+    monkeypatch.setattr(inference_backends, "CALIBRATION_AUDIO", (str(empty), str(tmp_path / "missing.mp4")))
+
+    assert inference_backends._calibration_sources() == []
+    with pytest.raises(RuntimeError):
+        inference_backends._calibration_waveforms()
+    # The parity check may still run on noise
+    assert len(inference_backends._calibration_waveforms(max_clips=2, noise_fallback=True)) == 2
+
+
+def test_calibration_digest_follows_the_file_contents(tmp_path):
+    source = tmp_path / "speech.wav"
+    source.write_bytes(b"first recording")
+    before = inference_backends._calibration_digest([str(source)])
+    assert inference_backends._calibration_digest([str(source)]) == before
+
+    source.write_bytes(b"second recording")
+    assert inference_backends._calibration_digest([str(source)]) != before
+
+
+def test_int8_without_calibration_audio_falls_back_to_eager(monkeypatch):
+    def build(name, classifier, backend):
+        raise RuntimeError("no calibration audio")
+
+    monkeypatch.setattr(inference_backends, "_build", build)
+    monkeypatch.setattr(inference_backends, "_failed", set())
+    classifier = object()
+    assert inference_backends.backend_model("test", classifier, "int8") is classifier
+    assert ("test", "int8") in inference_backends._failed
@@ -0,0 +1,54 @@
+import numpy as np
+
+import utils
+from circuit_breaker import CircuitBreaker
+from utils import SAMPLE_RATE
+
+
+def _windowed(label):
+    def classify(audio, top_k=utils.TOP_K):
+        return {"label": label, "confidence": 90.0, "distribution": [{"label": label, "probability": 0.9}],
+                "segments": [], "embedding": None}
+    return classify
+
+
+def test_batched_answers_name_their_detector(monkeypatch):
+    monkeypatch.setattr(utils, "_speechbrain_breaker", lambda: CircuitBreaker("speechbrain"))
+    monkeypatch.setattr(utils, "detect_language_speechbrain_batch",
+                        lambda clips, **kwargs: [("Spanish", 80.0, []) for _ in clips])
+
+    clips = [np.zeros(2 * SAMPLE_RATE, dtype=np.float32) for _ in range(2)]
+    results = utils.analyze_speech_batch(clips, timeline=False, prescreen=False)
+    for result in results:
+        assert result["language_method"] == "speechbrain"
+        assert result["detector_timings"]["speechbrain"]["status"] == "ok"
+        assert result["detector_timings"]["speechbrain"]["confidence"] == 80.0
+
+
+def test_windowed_answers_name_their_detector(monkeypatch):
+    monkeypatch.setattr(utils, "_speechbrain_breaker", lambda: CircuitBreaker("speechbrain"))
+    monkeypatch.setattr(utils, "detect_language_windowed", _windowed("Spanish"))
+
+    details = utils.analyze_speech(np.zeros(2 * SAMPLE_RATE, dtype=np.float32), windowed=True, timeline=False,
+                                   prescreen=False, return_details=True)
+    assert details["language_method"] == "speechbrain"
+    assert details["detector_timings"]["speechbrain"]["status"] == "ok"
+
+
+def test_windowed_fallback_reports_the_detector_that_answered(monkeypatch):
+    breaker = CircuitBreaker("speechbrain", failure_threshold=1, cooldown=60)
+    breaker.record_failure("model failed to load")
+    monkeypatch.setattr(utils, "_speechbrain_breaker", lambda: breaker)
+    report = {"label": "Spanish", "confidence": 70.0, "distribution": None, "method": "whisper",
+              "strategy": "sequential", "timings": {"whisper": {"status": "ok", "seconds": 1.0}}}
+    seen = []
+    monkeypatch.setattr(utils, "detect_language", lambda audio, **kwargs: seen.append(audio.numel()) or report)
+    monkeypatch.setattr(utils, "LONG_AUDIO_SECONDS", 3.0)
+
+    # Regression: the fallback ran SpeechBrain on the whole long recording
+    details = utils.analyze_speech(np.zeros(5 * SAMPLE_RATE, dtype=np.float32), windowed=True, timeline=False,
+                                   prescreen=False, return_details=True)
+    assert seen == [3 * SAMPLE_RATE]
+    assert details["language"] == "Spanish"
+    assert details["language_method"] == "whisper"
+    assert details["detector_timings"] == report["timings"]
@@ -0,0 +1,31 @@
+import pytest
+
+import model_registry
+
+
+def test_probe_runs_one_forward_pass(monkeypatch):
+    calls = []
+
+    class Classifier:
+        def classify_batch(self, wavs):
+            calls.append(tuple(wavs.shape))
+
+    monkeypatch.setattr(model_registry, "get_language_model", Classifier)
+    model_registry.probe(model_registry.LANGUAGE_MODEL)
+    assert calls == [(1, int(model_registry.SAMPLE_RATE * model_registry.WARMUP_SECONDS))]
+
+
+def test_probe_rejects_unknown_models():
+    with pytest.raises(ValueError):
+        model_registry.probe("no-such-model")
+
+
+def test_detector_breaker_probes_through_the_registry(monkeypatch):
+    import circuit_breaker
+    import utils
+
+    probed = []
+    monkeypatch.setattr(model_registry, "probe", probed.append)
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    utils._speechbrain_breaker().probe()
+    assert probed == [model_registry.LANGUAGE_MODEL]
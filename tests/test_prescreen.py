@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import utils
+import vad
+from prescreen import prescreen_audio, voiced_ratio
+from utils import SAMPLE_RATE
+
+
+def _voiced(seconds=4.0, pitch=120.0, noise=0.01, seed=0):
+    """Harmonic "vowels" at a syllable rate, with a little noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    phase = 2 * np.pi * np.cumsum(pitch + 20 * np.sin(2 * np.pi * 0.5 * t)) / SAMPLE_RATE
+    harmonics = sum(np.sin(k * phase) / k for k in range(1, 20))
+    syllables = np.sin(2 * np.pi * 4 * t) > 0
+    return (0.2 * harmonics * syllables + noise * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def _noise(seconds=4.0, level=0.1, seed=0):
+    return (level * np.random.default_rng(seed).standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+
+@pytest.mark.parametrize("pitch", [100.0, 220.0])
+def test_voiced_audio_passes(pitch):
+    screen = prescreen_audio(_voiced(pitch=pitch))
+    assert screen["passed"] and screen["voiced_ratio"] > 0.3
+
+
+@pytest.mark.parametrize("samples, reason", [
+    (np.zeros(4 * SAMPLE_RATE, dtype=np.float32), "silent"),
+    (_voiced(seconds=0.5), "too_short"),
+    (_noise(), "no_voice"),
+    (np.clip(_voiced() * 50, -1, 1), "clipped"),
+])
+def test_hopeless_audio_is_rejected(samples, reason):
+    screen = prescreen_audio(samples)
+    assert not screen["passed"] and screen["reason"] == reason and screen["message"]
+
+
+def test_noise_is_not_voiced():
+    samples = _noise()
+    assert voiced_ratio(samples, [(0, len(samples))]) < 0.05
+    assert voiced_ratio(samples, []) == 0.0
+
+
+def test_energy_is_computed_once(monkeypatch):
+    calls = []
+    frame_energy_db = vad.frame_energy_db
+    monkeypatch.setattr(vad, "frame_energy_db", lambda *args: calls.append(1) or frame_energy_db(*args))
+    monkeypatch.setattr(utils, "_analyze_prepared", lambda results, prepared, top_k, timeline: results)
+
+    [result] = utils.analyze_speech_batch([_voiced()], vad="energy")
+    assert result["prescreen"]["passed"] and result["speech_ratio"] > 0
+    assert len(calls) == 1
@@ -0,0 +1,81 @@
+import subprocess
+
+import ffmpeg
+import pytest
+
+import range_fetch
+from utils import SAMPLE_RATE
+
+
+@pytest.fixture
+def tone(tmp_path):
+    path = tmp_path / "tone.wav"
+    subprocess.run(["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=220:duration=3",
+                    "-ar", str(SAMPLE_RATE), str(path)], check=True)
+    return path
+
+
+def test_fetched_audio_is_decoded_under_the_thread_policy(tone, monkeypatch):
+    monkeypatch.setattr(range_fetch, "fetch_audio_only",
+                        lambda url, max_seconds=None: (str(tone), tone.stat().st_size, tone.stat().st_size))
+    monkeypatch.setattr("utils.ffmpeg_threads", lambda: 1)
+    inputs = []
+    real_input = ffmpeg.input
+    monkeypatch.setattr(ffmpeg, "input", lambda *args, **kwargs: inputs.append(kwargs) or real_input(*args, **kwargs))
+
+    waveform = range_fetch.fetch_audio("https://example.com/video.mp4", max_seconds=2)
+
+    assert inputs == [{"t": 2, "threads": 1}]
+    assert len(waveform) == 2 * SAMPLE_RATE
+
+
+def _tables(stsc, sizes, offsets, stts=None, timescale=1000):
+    return {"timescale": timescale, "stts": stts or [(len(sizes), 100)],
+            "stsc": stsc, "sizes": sizes, "offsets": offsets}
+
+
+def test_audio_chunks_follow_the_sample_to_chunk_runs():
+    # Chunks 1-2 hold 2 samples each, chunks 3-4 hold 1 sample each
+    tables = _tables(stsc=[(1, 2, 1), (3, 1, 1)], sizes=[10, 11, 12, 13, 14, 15],
+                     offsets=[1000, 2000, 3000, 4000])
+    assert range_fetch.audio_chunks(tables) == [(1000, 21), (2000, 25), (3000, 14), (4000, 15)]
+
+
+def test_audio_chunks_stop_after_max_seconds():
+    # 100 ms per sample, one sample per chunk: 0.25 s ends inside the third sample
+    tables = _tables(stsc=[(1, 1, 1)], sizes=[5] * 10, offsets=list(range(0, 100, 10)))
+    assert range_fetch.audio_chunks(tables, max_seconds=0.25) == [(0, 5), (10, 5), (20, 5)]
+    assert len(range_fetch.audio_chunks(tables, max_seconds=60)) == 10
+
+
+def test_audio_chunks_stop_when_the_samples_run_out():
+    # A last run that claims more chunks than there are samples
+    tables = _tables(stsc=[(1, 2, 1)], sizes=[1, 2, 3], offsets=[0, 100, 200])
+    assert range_fetch.audio_chunks(tables) == [(0, 3), (100, 3)]
+
+
+def test_merge_ranges():
+    chunks = [(300, 50), (0, 100), (100, 100), (90, 20), (1000, 0), (5000, 10)]
+    # Adjacent and overlapping chunks merge, gaps up to `gap` bytes are bridged, empty chunks are dropped
+    assert range_fetch.merge_ranges(chunks, gap=101) == [(0, 349), (5000, 5009)]
+    assert range_fetch.merge_ranges(chunks, gap=100) == [(0, 199), (300, 349), (5000, 5009)]
+    assert range_fetch.merge_ranges([]) == []
+
+
+def test_audio_chunks_of_a_real_mp4(tmp_path):
+    path = tmp_path / "clip.mp4"
+    subprocess.run(["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=duration=4:size=64x64:rate=10",
+                    "-f", "lavfi", "-i", "sine=frequency=220:duration=4", "-c:v", "mpeg4", "-c:a", "aac",
+                    "-shortest", str(path)], check=True)
+    data = path.read_bytes()
+    moov = next(data[start - 8:end] for box_type, start, end in range_fetch._children(data, 0, len(data))
+                if box_type == b"moov")
+
+    tables = range_fetch._audio_sample_tables(moov)
+    chunks = range_fetch.audio_chunks(tables)
+    assert sum(size for _, size in chunks) == sum(tables["sizes"])
+    assert all(offset + size <= len(data) for offset, size in chunks)
+
+    first_second = range_fetch.audio_chunks(tables, max_seconds=1)
+    assert 0 < len(first_second) < len(chunks)
+    assert chunks[:len(first_second)] == first_second
@@ -0,0 +1,180 @@
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+import batch
+import inference_server
+import utils
+from result_cache import REQUEST_FIELDS, ResultCache, analysis_options, audio_fingerprint, cacheable
+from utils import SAMPLE_RATE
+
+
+def _details(**overrides):
+    """analyze_speech(return_details=True)-shaped result, as analyze_speech_batch returns it"""
+    details = {
+        "is_english": True,
+        "language": "English",
+        "accent": "us",
+        "lang_confidence": 97.123,
+        "accent_confidence": 88.0,
+        "total_seconds": 2.0,
+        "analyzed_seconds": 1.5,
+        "early_exit": False,
+        "speech_ratio": 0.75,
+        "vad_segments": [[0.0, 1.5]],
+        "language_distribution": [["English", 97.1]],
+        "accent_distribution": [["us", 88.0]],
+        "language_segments": None,
+        "accent_segments": None,
+        "timeline": None,
+        "language_method": "speechbrain",
+        "detector_timings": None,
+        "prescreen": None,
+        "error": None,
+    }
+    details.update(overrides)
+    return details
+
+
+@pytest.fixture
+def waveform():
+    rng = np.random.default_rng(0)
+    return (0.1 * rng.standard_normal(2 * SAMPLE_RATE)).astype(np.float32)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / "results.sqlite")
+
+
+def test_fingerprint_separates_analysis_options(waveform):
+    keys = {
+        audio_fingerprint(waveform, **analysis_options()),
+        audio_fingerprint(waveform, **analysis_options(top_k=None)),
+        audio_fingerprint(waveform, **analysis_options(prescreen=False)),
+        audio_fingerprint(waveform, **analysis_options(timeline=False)),
+        audio_fingerprint(waveform, **analysis_options(vad="energy")),
+        audio_fingerprint(waveform, **analysis_options(max_duration=60)),
+        audio_fingerprint(waveform, max_duration=None, vad=None),
+    }
+    assert len(keys) == 7
+    assert audio_fingerprint(waveform, **analysis_options()) == audio_fingerprint(waveform, **analysis_options())
+
+
+def test_fingerprint_includes_inference_backend(waveform, monkeypatch):
+    monkeypatch.delitem(sys.modules, "inference_backends", raising=False)
+    monkeypatch.setenv("ACCENT_INFERENCE_BACKEND", "eager")
+    eager = audio_fingerprint(waveform, **analysis_options())
+    monkeypatch.setenv("ACCENT_INFERENCE_BACKEND", "int8")
+    assert audio_fingerprint(waveform, **analysis_options()) != eager
+
+
+def test_put_drops_request_fields(cache):
+    cache.put("key", _details(latency_ms=12.5, batch_size=4, cached=True, error=None))
+    stored = cache.get("key")
+    assert not set(REQUEST_FIELDS) & set(stored)
+    assert stored["speech_ratio"] == 0.75
+
+
+def test_batch_result_is_a_valid_service_hit(waveform, cache, tmp_path, monkeypatch):
+    # Regression: batch.py used to cache its projected result, which InferenceService
+    # then returned without speech_ratio / vad_segments
+    source = tmp_path / "clip.wav"
+    source.write_bytes(b"")
+    monkeypatch.setattr(batch, "load_input", lambda source, max_duration=None: waveform)
+    monkeypatch.setattr(batch, "analyze_speech_batch", lambda waveforms, **kwargs: [_details() for _ in waveforms])
+
+    item = {"id": "clip", "source": str(source)}
+    loaded, cached, cache_keys = batch._load_with_cache(item, cache=cache)
+    assert cached is None
+    [result] = batch._score_batch([(item, loaded, cache_keys)], cache=cache)
+    assert result["lang_confidence"] == 97.1 and "speech_ratio" not in result
+
+    def fail(*args, **kwargs):
+        raise AssertionError("expected a cache hit")
+
+    monkeypatch.setattr(inference_server, "analyze_speech_batch", fail)
+    service = inference_server.InferenceService(result_cache=cache)
+    try:
+        hit = service.analyze(waveform, timeout=10)
+    finally:
+        service.stop()
+    assert hit["cached"] is True
+    assert hit["speech_ratio"] == 0.75 and hit["vad_segments"] == [[0.0, 1.5]]
+    assert "latency_ms" not in hit
+
+    _, cached, _ = batch._load_with_cache(item, cache=cache)
+    assert batch._project(item, loaded, cached) == result
+
+
+def test_service_does_not_cache_latency(waveform, cache, monkeypatch):
+    calls = []
+
+    def analyze(waveforms, **kwargs):
+        calls.append(len(waveforms))
+        return [_details() for _ in waveforms]
+
+    monkeypatch.setattr(inference_server, "analyze_speech_batch", analyze)
+    service = inference_server.InferenceService(result_cache=cache, max_wait_ms=1)
+    try:
+        first = service.analyze(waveform, timeout=10)
+        second = service.analyze(waveform, timeout=10)
+    finally:
+        service.stop()
+    assert calls == [1]
+    assert "latency_ms" in first and "latency_ms" not in second
+
+
+@pytest.mark.parametrize("overrides, expected", [
+    ({}, True),
+    ({"language_method": "whisper"}, True),
+    ({"is_english": False, "language": "Spanish", "accent": None, "accent_distribution": None}, True),
+    ({"error": "model failed"}, False),
+    ({"language_method": "fallback"}, False),
+    ({"language_method": None}, False),
+    # Random accent of a failed accent model
+    ({"accent_distribution": None}, False),
+])
+def test_only_model_answers_are_cacheable(cache, overrides, expected):
+    assert cacheable(_details(**overrides)) is expected
+    assert cache.put("key", _details(**overrides)) is expected
+    assert (cache.get("key") is not None) is expected
+
+
+def test_failed_accent_model_is_not_cached(waveform, cache, monkeypatch):
+    # Regression: the random fallback accent was cached for the whole TTL
+    import model_registry
+
+    report = {"label": "en: English", "confidence": 95.0, "distribution": [], "method": "speechbrain",
+              "strategy": "sequential", "timings": {}}
+    monkeypatch.setattr(utils, "detect_language", lambda *args, **kwargs: report)
+
+    def broken():
+        raise RuntimeError("accent model failed to load")
+
+    monkeypatch.setattr(model_registry, "get_accent_model", broken)
+    details = utils.analyze_speech(waveform, result_cache=cache, timeline=False, prescreen=False,
+                                   return_details=True)
+    assert details["is_english"] and details["accent_distribution"] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_service_survives_a_failing_cache(waveform, monkeypatch):
+    class LockedCache:
+        def get(self, key):
+            return None
+
+        def put(self, key, result):
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(inference_server, "analyze_speech_batch", lambda waveforms, **kwargs: [_details() for _ in waveforms])
+    service = inference_server.InferenceService(result_cache=LockedCache(), max_wait_ms=1)
+    try:
+        for _ in range(2):
+            # Each request fails on its own; the worker thread keeps serving
+            with pytest.raises(sqlite3.OperationalError):
+                service.analyze(waveform, timeout=10)
+    finally:
+        service.stop()
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import utils
+from circuit_breaker import CircuitBreaker
+from ecapa_features import window_spans
+from utils import SAMPLE_RATE, merge_timeline, timeline_spans
+from vad import original_time
+
+
+def test_window_spans_cover_the_clip():
+    assert window_spans(100, 40, 20) == [(0, 40), (20, 60), (40, 80), (60, 100)]
+    # The last window is aligned to the end
+    assert window_spans(110, 40, 30) == [(0, 40), (30, 70), (60, 100), (70, 110)]
+    assert window_spans(30, 40, 20) == [(0, 30)]
+
+
+def test_timeline_spans_do_not_overlap():
+    segment = int(utils.TIMELINE_SEGMENT_SECONDS * SAMPLE_RATE)
+    spans = timeline_spans(3 * segment)
+    assert spans == [(0, segment), (segment, 2 * segment), (2 * segment, 3 * segment)]
+    assert timeline_spans(segment // 2) == [(0, segment // 2)]
+
+
+def _segment(start, end, language, confidence=90.0, accent=None):
+    return {"start": start, "end": end, "language": language, "accent": accent, "confidence": confidence}
+
+
+def test_merge_timeline_joins_equal_neighbours():
+    timeline = merge_timeline([
+        _segment(0, 4, "English", 80.0, "American"),
+        _segment(4, 8, "English", 60.0, "American"),
+        _segment(8, 12, "French", 90.0),
+    ], 12.0)
+    assert [(e["start"], e["end"], e["language"]) for e in timeline] == [(0.0, 8.0, "English"), (8.0, 12.0, "French")]
+    # Confidence is averaged over time
+    assert timeline[0]["confidence"] == 70.0
+
+
+def test_merge_timeline_splits_at_midpoints():
+    timeline = merge_timeline([_segment(0, 4, "English"), _segment(2, 6, "French")], 6.0)
+    assert [(e["start"], e["end"]) for e in timeline] == [(0.0, 3.0), (3.0, 6.0)]
+
+
+def test_original_time_skips_removed_silence():
+    segments = [(1.0, 3.0), (5.0, 6.0), (10.0, 12.0)]
+    assert original_time(0.0, segments) == 1.0
+    assert original_time(1.5, segments) == 2.5
+    # Boundaries go to the next segment's start, or to the previous end for end times
+    assert original_time(2.0, segments) == 5.0
+    assert original_time(2.0, segments, end=True) == 3.0
+    assert original_time(3.5, segments) == 10.5
+    assert original_time(5.0, segments, end=True) == 12.0
+    assert original_time(4.0, []) == 4.0
+
+
+@pytest.fixture
+def speech_with_pauses():
+    """4 s silence, 8 s "speech", 6 s silence, 8 s "speech" """
+    rng = np.random.default_rng(0)
+    parts = []
+    for seconds, level in ((4, 1e-4), (8, 0.3), (6, 1e-4), (8, 0.3)):
+        parts.append(level * rng.standard_normal(seconds * SAMPLE_RATE))
+    return np.concatenate(parts).astype(np.float32)
+
+
+def test_batch_timeline_is_on_the_original_time_axis(speech_with_pauses, monkeypatch):
+    # Regression: the timeline was built on the VAD-concatenated audio, so every
+    # time after the first removed silence was shifted earlier
+    monkeypatch.setattr(utils, "_speechbrain_breaker", lambda: CircuitBreaker("speechbrain"))
+    monkeypatch.setattr(utils, "detect_language_speechbrain_batch",
+                        lambda clips, **kwargs: [("Spanish", 90.0, None) for _ in clips])
+
+    def languages(feature_cache, spans, item=0):
+        return [_segment(start / SAMPLE_RATE, end / SAMPLE_RATE, "Spanish" if start < 8 * SAMPLE_RATE else "German")
+                for start, end in spans]
+
+    monkeypatch.setattr(utils, "timeline_languages", languages)
+
+    [result] = utils.analyze_speech_batch([speech_with_pauses], vad="energy", prescreen=False)
+    assert result["error"] is None
+    first, last = result["vad_segments"][0], result["vad_segments"][-1]
+    assert first[0] > 3.5 and last[1] > 25.5
+
+    timeline = result["timeline"]
+    assert [entry["language"] for entry in timeline] == ["Spanish", "German"]
+    assert timeline[0]["start"] == first[0]
+    assert timeline[-1]["end"] == last[1]
+    # German starts in the second burst's audio, not 6 s early
+    assert timeline[1]["start"] >= 11.0
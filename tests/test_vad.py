@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import vad
+from utils import SAMPLE_RATE
+from vad import apply_vad, energy_speech_segments, frame_energy_db
+
+
+def _bursts(layout, seed=0):
+    """Concatenate (seconds, level) parts of white noise"""
+    rng = np.random.default_rng(seed)
+    return np.concatenate([level * rng.standard_normal(int(seconds * SAMPLE_RATE))
+                           for seconds, level in layout]).astype(np.float32)
+
+
+def test_frame_energy_matches_the_direct_computation(monkeypatch):
+    samples = _bursts([(1.3, 0.1), (0.7, 0.5)])
+    frames = np.lib.stride_tricks.sliding_window_view(samples, 480)[::160]
+    expected = 20 * np.log10(np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1)) + 1e-10)
+
+    # Chunk boundaries must not change the result
+    monkeypatch.setattr(vad, "ENERGY_CHUNK_FRAMES", 7)
+    np.testing.assert_allclose(frame_energy_db(samples, 480, 160), expected, atol=1e-9)
+
+
+def test_frame_energy_of_a_short_clip():
+    energy = frame_energy_db(np.full(100, 0.5, dtype=np.float32), 480, 160)
+    assert len(energy) == 1
+    assert energy[0] == pytest.approx(20 * np.log10(0.5 * np.sqrt(100 / 480)), abs=1e-6)
+
+
+def test_energy_segments_find_the_speech():
+    samples = _bursts([(1.0, 1e-4), (2.0, 0.3), (1.0, 1e-4), (1.5, 0.3), (1.0, 1e-4)])
+    segments = [(start / SAMPLE_RATE, end / SAMPLE_RATE) for start, end in energy_speech_segments(samples)]
+    assert len(segments) == 2
+    (first_start, first_end), (second_start, second_end) = segments
+    # Edges within the padding (PADDING_MS) plus one frame
+    assert first_start == pytest.approx(1.0, abs=0.15) and first_end == pytest.approx(3.0, abs=0.15)
+    assert second_start == pytest.approx(4.0, abs=0.15) and second_end == pytest.approx(5.5, abs=0.15)
+
+
+def test_short_pauses_do_not_split_segments():
+    samples = _bursts([(1.0, 1e-4), (1.0, 0.3), (0.1, 1e-4), (1.0, 0.3), (1.0, 1e-4)])
+    assert len(energy_speech_segments(samples)) == 1
+
+
+def test_silence_has_no_speech():
+    assert energy_speech_segments(np.zeros(2 * SAMPLE_RATE, dtype=np.float32)) == []
+
+
+def test_apply_vad_keeps_almost_speechless_audio():
+    samples = _bursts([(3.0, 1e-4), (0.3, 0.3), (3.0, 1e-4)])
+    kept, info = apply_vad(samples)
+    assert kept is samples and not info["trimmed"]
+
+    samples = _bursts([(1.0, 1e-4), (2.0, 0.3), (1.0, 1e-4)])
+    speech, info = apply_vad(samples)
+    assert info["trimmed"] and len(speech) == pytest.approx(info["speech_seconds"] * SAMPLE_RATE, abs=SAMPLE_RATE * 0.01)
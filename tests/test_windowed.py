@@ -0,0 +1,33 @@
+import numpy as np
+import torch
+
+import utils
+from circuit_breaker import CircuitBreaker
+from embedding_store import EmbeddingStore
+from model_registry import ACCENT_MODEL, LANGUAGE_MODEL
+from utils import SAMPLE_RATE
+
+
+def _windowed(label, embedding):
+    def classify(audio, top_k=utils.TOP_K):
+        return {"label": label, "confidence": 90.0, "distribution": [{"label": label, "probability": 0.9}],
+                "segments": [], "embedding": embedding}
+    return classify
+
+
+def test_long_clips_save_their_window_embeddings(tmp_path, monkeypatch):
+    # Regression: the windowed branch returned before the embeddings were saved
+    language_embedding = torch.arange(4, dtype=torch.float32).reshape(1, 1, 4)
+    accent_embedding = torch.ones(1, 1, 3)
+    monkeypatch.setattr(utils, "_speechbrain_breaker", lambda: CircuitBreaker("speechbrain"))
+    monkeypatch.setattr(utils, "detect_language_windowed", _windowed("en: english", language_embedding))
+    monkeypatch.setattr(utils, "classify_english_accent_windowed", _windowed("American", accent_embedding))
+
+    store = EmbeddingStore(tmp_path)
+    waveform = np.zeros(2 * SAMPLE_RATE, dtype=np.float32)
+    details = utils.analyze_speech(waveform, windowed=True, timeline=False, prescreen=False,
+                                   embedding_store=store, clip_id="long-clip", return_details=True)
+
+    assert details["accent"] == "American"
+    np.testing.assert_allclose(store.get(LANGUAGE_MODEL, "long-clip"), [0, 1, 2, 3])
+    np.testing.assert_allclose(store.get(ACCENT_MODEL, "long-clip"), [1, 1, 1])
@@ -0,0 +1,83 @@
+"""
+Thread policy for model inference and audio decoding
+    latency     one request at a time gets every core (torch intra-op threads,
+                ffmpeg decoder threads, tokenizer parallelism)
+    throughput  many workers, one thread each (api.py process pool)
+Selected with ACCENT_THREAD_POLICY (default: latency); ACCENT_NUM_THREADS
+overrides the thread count of the latency policy.
+"""
+import os
+import sys
+
+
+POLICIES = ("latency", "throughput")
+DEFAULT_POLICY = os.environ.get("ACCENT_THREAD_POLICY", "latency")
+
+_settings = None
+
+
+def cpu_count():
+    """Cores this process may run on (respects CPU affinity / container limits)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def policy_threads(policy=None):
+    """Threads per request under a policy"""
+    policy = policy or DEFAULT_POLICY
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown thread policy: {policy} (available: {', '.join(POLICIES)})")
+    if policy == "throughput":
+        return 1
+    return int(os.environ.get("ACCENT_NUM_THREADS", cpu_count()))
+
+
+def apply_thread_policy(policy=None, num_threads=None):
+    """
+    Apply a policy to torch, tokenizers and ffmpeg for this process.
+    num_threads overrides the policy's thread count. torch is not imported
+    here: OMP_NUM_THREADS covers a later import and configure_torch() runs
+    when the first model loads.
+    Returns: {"policy", "threads"}
+    """
+    global _settings
+
+    policy = policy or DEFAULT_POLICY
+    threads = max(1, num_threads or policy_threads(policy))
+
+    os.environ['TOKENIZERS_PARALLELISM'] = 'true' if threads > 1 else 'false'
+    # Read by torch at import, and inherited by ffmpeg and worker processes
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+
+    _settings = {"policy": policy, "threads": threads}
+    if "torch" in sys.modules:
+        configure_torch()
+    print(f"🧵 Thread policy: {policy} ({threads} thread(s) per request)")
+    return dict(_settings)
+
+
+def configure_torch():
+    """Set torch intra-/inter-op threads from the current policy"""
+    import torch
+
+    settings = current_policy()
+    torch.set_num_threads(settings["threads"])
+    try:
+        torch.set_num_interop_threads(1 if settings["policy"] == "throughput" else min(settings["threads"], 4))
+    except RuntimeError:
+        # Only allowed before the first parallel operation; keep whatever is set
+        pass
+
+
+def current_policy():
+    """Settings applied in this process, or the defaults if none were applied yet"""
+    if _settings is None:
+        return {"policy": DEFAULT_POLICY, "threads": policy_threads()}
+    return dict(_settings)
+
+
+def ffmpeg_threads():
+    """Value for ffmpeg's -threads option under the current policy"""
+    return current_policy()["threads"]
@@ -1,15 +1,18 @@
 # utils.py - FIXED ENGLISH DETECTION
 import requests
 import ffmpeg
-import torchaudio
-import torch
 import os
 import numpy as np
 import warnings
 import tempfile
 import shutil
+import threading
+import math
+import time
 from pathlib import Path
 
+from thread_policy import ffmpeg_threads
+
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -22,6 +25,50 @@ CACHE_DIR.mkdir(exist_ok=True)
 os.environ['HUGGINGFACE_HUB_CACHE'] = str(CACHE_DIR / "huggingface")
 os.environ['TRANSFORMERS_CACHE'] = str(CACHE_DIR / "transformers")
 
+# All models expect 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Chunk size used when piping an HTTP response into ffmpeg
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Progressive analysis: prefix lengths (seconds) tried before the whole clip
+PROGRESSIVE_WINDOWS = (10, 20, 40)
+
+# Progressive analysis stops once a prediction reaches this confidence (%)
+PROGRESSIVE_CONFIDENCE = 80.0
+
+# Alternatives kept in the language / accent distributions (None = every class)
+TOP_K = 5
+
+# Accent confidence is capped (%) on every path
+MAX_ACCENT_CONFIDENCE = 95.0
+
+# What a classifier head outputs: VoxLingua107 log-probabilities, CommonAccent cosine scores
+LOG_PROBS = "log_probs"
+COSINE = "cosine"
+
+# Windowed inference: window length and hop (seconds), windows per forward pass
+WINDOW_SECONDS = 10.0
+WINDOW_HOP_SECONDS = 5.0
+WINDOW_BATCH_SIZE = 8
+
+# analyze_speech switches to windowed inference for recordings longer than this (seconds)
+LONG_AUDIO_SECONDS = 120.0
+
+# Timeline: length of the segments (seconds) that get their own language/accent label
+TIMELINE_SEGMENT_SECONDS = 4.0
+
+# Whisper language ID: "token" reads the language-token probabilities at the first
+# decoder step (one forward pass), "transcribe" decodes text and counts English words
+WHISPER_LANGUAGE_ID = os.environ.get("ACCENT_WHISPER_LANGUAGE_ID", "token")
+
+# Whisper's encoder sees a single 30 s log-mel window
+WHISPER_WINDOW_SECONDS = 30
+
 
 def download_video(url, output_path=None):
     """Download video to temporary file"""
@@ -33,10 +80,7 @@ def download_video(url, output_path=None):
         temp_file.close()
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, stream=True, headers=headers, timeout=30)
+        response = requests.get(url, stream=True, headers=DOWNLOAD_HEADERS, timeout=30)
         response.raise_for_status()
         
         with open(output_path, 'wb') as f:
@@ -58,14 +102,29 @@ def download_video(url, output_path=None):
         return None
 
 
-def extract_audio(video_path, audio_path=None):
-    """Extract audio to temporary file"""
+def pcm_s16le_to_float32(data):
+    """Convert raw 16-bit little-endian PCM bytes into a float32 waveform in [-1, 1]"""
+    usable = len(data) - (len(data) % 2)
+    samples = np.frombuffer(data[:usable], dtype='<i2')
+    return samples.astype(np.float32) / 32768.0
+
+
+def extract_audio(video_path, audio_path=None, to_memory=False, max_duration=None):
+    """
+    Extract audio to temporary file
+    to_memory: ffmpeg writes s16le PCM to stdout instead and a 16 kHz mono
+    float32 numpy waveform is returned - no temporary file is created
+    max_duration: only decode the first max_duration seconds (ffmpeg -t)
+    """
     print(f"🎵 Extracting audio...")
     
     if not video_path or not os.path.exists(video_path):
         print("❌ Video file not found")
         return None
     
+    if to_memory:
+        return extract_audio_to_memory(video_path, max_duration)
+    
     if audio_path is None:
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
         audio_path = temp_file.name
@@ -73,8 +132,7 @@ def extract_audio(video_path, audio_path=None):
     
     try:
         out, err = (
-            ffmpeg
-            .input(video_path)
+            _input_stream(video_path, max_duration)
             .output(audio_path, ac=1, ar='16000', acodec='pcm_s16le')
             .run(overwrite_output=True, capture_stdout=True, capture_stderr=True)
         )
@@ -97,6 +155,201 @@ def extract_audio(video_path, audio_path=None):
         return None
 
 
+def _input_stream(source, max_duration=None, **kwargs):
+    """
+    ffmpeg input spec, limited to the first max_duration seconds if given.
+    Decoder threads follow the thread policy (one per worker for throughput).
+    """
+    if max_duration:
+        kwargs['t'] = max_duration
+    kwargs.setdefault('threads', ffmpeg_threads())
+    return ffmpeg.input(source, **kwargs)
+
+
+def pcm_output(stream):
+    """ffmpeg output spec: 16 kHz mono s16le PCM on stdout"""
+    return stream.output('pipe:', format='s16le', ac=1, ar=str(SAMPLE_RATE), acodec='pcm_s16le')
+
+
+def extract_audio_to_memory(video_path, max_duration=None):
+    """Decode the audio track through an ffmpeg pipe straight into a float32 waveform"""
+    try:
+        stream = _input_stream(video_path, max_duration)
+        out, err = pcm_output(stream).run(capture_stdout=True, capture_stderr=True)
+        
+        waveform = pcm_s16le_to_float32(out)
+        if waveform.size > 0:
+            print(f"✅ Audio extracted to memory ({waveform.size / SAMPLE_RATE:.1f}s, no temp file)")
+            return waveform
+        else:
+            print("❌ Audio extraction produced no samples")
+            return None
+            
+    except ffmpeg.Error as e:
+        print(f"❌ FFmpeg failed: {e.stderr.decode() if e.stderr else str(e)}")
+        return None
+    except Exception as e:
+        print(f"❌ Audio extraction error: {e}")
+        return None
+
+
+def _stream_url_with_ffmpeg(url, max_duration=None):
+    """Let ffmpeg fetch the URL itself (HTTP range requests, decoding overlaps the transfer)"""
+    stream = _input_stream(url, max_duration, user_agent=DOWNLOAD_HEADERS['User-Agent'], reconnect=1)
+    out, err = pcm_output(stream).run(capture_stdout=True, capture_stderr=True)
+    return pcm_s16le_to_float32(out)
+
+
+def _feed_ffmpeg_stdin(process, url, errors):
+    """Copy the HTTP response body into ffmpeg's stdin chunk by chunk"""
+    try:
+        with requests.get(url, stream=True, headers=DOWNLOAD_HEADERS, timeout=30) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if chunk:
+                    process.stdin.write(chunk)
+    except BrokenPipeError:
+        # ffmpeg stopped reading - it already has everything it needs
+        pass
+    except Exception as e:
+        errors.append(e)
+    finally:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+
+def _stream_url_through_pipe(url, max_duration=None):
+    """Download with requests and pipe the bytes into ffmpeg's stdin while it decodes"""
+    process = pcm_output(_input_stream('pipe:', max_duration)).run_async(
+        pipe_stdin=True, pipe_stdout=True, pipe_stderr=True
+    )
+    
+    errors = []
+    stderr_chunks = []
+    feeder = threading.Thread(target=_feed_ffmpeg_stdin, args=(process, url, errors), daemon=True)
+    stderr_reader = threading.Thread(
+        target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
+    )
+    feeder.start()
+    stderr_reader.start()
+    
+    out = process.stdout.read()
+    process.wait()
+    feeder.join()
+    stderr_reader.join()
+    
+    if errors:
+        raise errors[0]
+    if process.returncode != 0:
+        raise ffmpeg.Error('ffmpeg', out, b"".join(stderr_chunks))
+    return pcm_s16le_to_float32(out)
+
+
+def _stream_url_audio_ranges(url, max_duration=None):
+    """Download only the audio track's byte ranges of a remote MP4"""
+    from range_fetch import fetch_audio
+    return fetch_audio(url, max_seconds=max_duration)
+
+
+def stream_audio(url, method="auto", max_duration=None):
+    """
+    Decode the audio of a remote video without saving it to disk first.
+    method:
+      "ranges" - range-request only the moov box and the audio samples of an
+               MP4 (video bytes are never downloaded)
+      "url"  - ffmpeg reads the URL itself (seeks with range requests, so MP4
+               files with the moov box at the end work too)
+      "pipe" - response chunks are fed into ffmpeg's stdin as they arrive
+               (needs a streamable container: faststart MP4, WebM, MKV, ...)
+      "auto" - try "ranges", then "url", then "pipe"
+    max_duration: only fetch/decode the first max_duration seconds
+    Returns a 16 kHz mono float32 waveform, or None on failure.
+    """
+    print(f"📡 Streaming audio from URL...")
+    
+    methods = ["ranges", "url", "pipe"] if method == "auto" else [method]
+    streamers = {
+        "ranges": _stream_url_audio_ranges,
+        "url": _stream_url_with_ffmpeg,
+        "pipe": _stream_url_through_pipe,
+    }
+    
+    for name in methods:
+        if name not in streamers:
+            raise ValueError(f"Unknown streaming method: {name}")
+        try:
+            waveform = streamers[name](url, max_duration)
+            if waveform is not None and waveform.size > 0:
+                print(f"✅ Audio streamed via {name} ({waveform.size / SAMPLE_RATE:.1f}s, nothing written to disk)")
+                return waveform
+            print(f"⚠️ Streaming via {name} produced no samples")
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode(errors='replace') if e.stderr else str(e)
+            print(f"⚠️ Streaming via {name} failed: {stderr[-300:]}")
+        except Exception as e:
+            print(f"⚠️ Streaming via {name} failed: {e}")
+    
+    print("❌ Audio streaming failed")
+    return None
+
+
+def is_audio_path(audio):
+    """Check if audio is given as a file path rather than an in-memory waveform"""
+    return isinstance(audio, (str, os.PathLike))
+
+
+def load_waveform(audio):
+    """
+    Decode audio into a 1-D float32 tensor at 16 kHz mono.
+    Accepts a file path, or a tensor/ndarray that is already 16 kHz mono
+    (in-memory inputs are passed through without any file I/O).
+    """
+    import torch
+
+    if is_audio_path(audio):
+        if not os.path.exists(audio):
+            raise ValueError(f"Audio file not found: {audio}")
+        import torchaudio
+        signal, sr = torchaudio.load(str(audio))
+        if signal.shape[0] > 1:
+            signal = signal.mean(dim=0, keepdim=True)
+        if sr != SAMPLE_RATE:
+            signal = torchaudio.functional.resample(signal, sr, SAMPLE_RATE)
+        return signal.squeeze(0)
+    
+    if isinstance(audio, np.ndarray):
+        if np.issubdtype(audio.dtype, np.integer):
+            audio = audio.astype(np.float32) / -np.iinfo(audio.dtype).min
+        waveform = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32))
+    elif torch.is_tensor(audio):
+        waveform = audio.detach().float().cpu()
+    else:
+        raise TypeError(f"Unsupported audio input: {type(audio).__name__}")
+    
+    # Accept (samples,), (1, samples) or (channels, samples)
+    if waveform.dim() == 2:
+        waveform = waveform.mean(dim=0)
+    if waveform.dim() != 1 or waveform.numel() == 0:
+        raise ValueError(f"Expected a mono waveform, got shape {tuple(waveform.shape)}")
+    
+    return waveform
+
+
+def waveform_to_numpy(audio):
+    """Waveform as a float32 numpy array (for librosa / transformers)"""
+    return load_waveform(audio).numpy()
+
+
+def describe_audio(audio):
+    """Short human-readable description of an audio input for logging"""
+    if is_audio_path(audio):
+        return str(audio)
+    num_samples = audio.shape[-1]
+    return f"in-memory waveform ({num_samples / SAMPLE_RATE:.1f}s)"
+
+
 def is_english_language(language_code):
     """
     Check if detected language is English - handles various English language codes
@@ -141,27 +394,69 @@ def is_english_language(language_code):
     return False
 
 
-def detect_language_speechbrain(audio_path):
-    """Method 1: Language detection using SpeechBrain VoxLingua107"""
+def top_confidence(out_prob, scores, max_confidence=100.0):
+    """
+    Probability (%) of the top class of one row of classifier output, from the
+    same softmax as score_distribution - so it matches the distribution's top-1
+    scores: LOG_PROBS (VoxLingua107) or COSINE (CommonAccent)
+    """
+    from ecapa_features import log_probabilities
+    
+    probability = math.exp(float(log_probabilities(out_prob.reshape(-1), scores).max()))
+    return min(probability * 100, max_confidence)
+
+
+def score_distribution(out_prob, label_encoder, scores, top_k=TOP_K, label_map=str):
+    """
+    Top-k labels and probabilities from one row of classifier output.
+    scores: LOG_PROBS (VoxLingua107, exponentiated) or COSINE (CommonAccent,
+    scaled softmax)
+    Returns: list of {"label", "probability"} dicts, most likely first
+    """
+    import torch
+    from ecapa_features import log_probabilities
+    
+    probs = log_probabilities(out_prob.reshape(-1), scores).exp()
+    k = probs.numel() if top_k is None else min(top_k, probs.numel())
+    values, indices = torch.topk(probs, k)
+    labels = label_encoder.decode_torch(indices)
+    return [{"label": label_map(label), "probability": round(float(p), 4)} for label, p in zip(labels, values)]
+
+
+def _language_label(label):
+    return str(label).lower()
+
+
+def run_ecapa_classifier(classifier, audio, feature_cache=None):
+    """
+    Run an EncoderClassifier on a single clip.
+    With a FeatureCache the filterbanks are shared with the other ECAPA stage.
+    Returns: (out_prob, score, index, text_lab) like classify_batch
+    """
+    if feature_cache is not None:
+        from ecapa_features import classify_cached
+        return classify_cached(classifier, feature_cache)
+    
+    waveform = load_waveform(audio)
+    return classifier.classify_batch(waveform.unsqueeze(0))
+
+
+def detect_language_speechbrain(audio, feature_cache=None, return_distribution=False, top_k=TOP_K):
+    """
+    Method 1: Language detection using SpeechBrain VoxLingua107
+    return_distribution: also return the top_k languages from the same forward pass
+    """
     print("🌍 Method 1: Using SpeechBrain language detection...")
     
     try:
-        from speechbrain.pretrained import EncoderClassifier
+        from model_registry import get_language_model
         
-        print("📦 Loading language detection model...")
-        language_id = EncoderClassifier.from_hparams(
-            source="speechbrain/lang-id-voxlingua107-ecapa", 
-            savedir=str(CACHE_DIR / "lang-id-voxlingua107-ecapa")
-        )
-        print("✅ Language detection model loaded")
+        language_id = get_language_model()
         
         print("🔍 Detecting language...")
-        out_prob, score, index, text_lab = language_id.classify_file(audio_path)
+        out_prob, score, index, text_lab = run_ecapa_classifier(language_id, audio, feature_cache)
         
-        if torch.is_tensor(score):
-            confidence = float(score.max().item()) * 100
-        else:
-            confidence = float(np.max(score)) * 100
+        confidence = top_confidence(out_prob[0], LOG_PROBS)
             
         language = text_lab[0] if isinstance(text_lab, list) else str(text_lab)
         
@@ -171,6 +466,10 @@ def detect_language_speechbrain(audio_path):
         print(f"🔍 DEBUG - Confidence: {confidence:.1f}%")
         
         print(f"🌍 Language detected: {language} ({confidence:.1f}%)")
+        if return_distribution:
+            distribution = score_distribution(out_prob[0], language_id.hparams.label_encoder, LOG_PROBS, top_k,
+                                              _language_label)
+            return language.lower(), confidence, distribution
         return language.lower(), confidence
         
     except Exception as e:
@@ -178,30 +477,51 @@ def detect_language_speechbrain(audio_path):
         raise e
 
 
-def detect_language_whisper(audio_path):
-    """Method 2: Language detection using Whisper"""
-    print("🌍 Method 2: Using Whisper language detection...")
+def whisper_language_distribution(audio, top_k=TOP_K):
+    """
+    Language probabilities from Whisper's first decoder step.
+    The first 30 s of the waveform go through the encoder once, the decoder
+    scores the start-of-transcript position and the softmax is taken over the
+    language tokens only - no text is generated.
+    Returns: list of {"label", "probability"} dicts, most likely first
+    """
+    import torch
+    from transformers.models.whisper.tokenization_whisper import LANGUAGES
+    from model_registry import get_whisper
+    
+    processor, model = get_whisper()
+    samples = waveform_to_numpy(audio)[:WHISPER_WINDOW_SECONDS * SAMPLE_RATE]
+    input_features = processor(samples, sampling_rate=SAMPLE_RATE, return_tensors="pt").input_features
+    
+    tokenizer = processor.tokenizer
+    token_ids = tokenizer.convert_tokens_to_ids([f"<|{code}|>" for code in LANGUAGES])
+    # Older checkpoints lack some language tokens; those map to the unknown token
+    languages = [(code, token_id) for code, token_id in zip(LANGUAGES, token_ids)
+                 if token_id is not None and token_id != tokenizer.unk_token_id]
     
+    decoder_input_ids = torch.tensor([[model.generation_config.decoder_start_token_id]])
+    with torch.no_grad():
+        logits = model(input_features, decoder_input_ids=decoder_input_ids).logits[0, -1]
+    probs = torch.softmax(logits[[token_id for _, token_id in languages]].float(), dim=-1)
+    
+    k = len(languages) if top_k is None else min(top_k, len(languages))
+    values, indices = torch.topk(probs, k)
+    return [{"label": f"{languages[i][0]}: {LANGUAGES[languages[i][0]]}", "probability": round(float(p), 4)}
+            for p, i in zip(values, indices.tolist())]
+
+
+def _whisper_transcription_language(audio):
+    """Transcribe up to 30 tokens with Whisper and call it English if enough English words appear"""
     try:
-        from transformers import WhisperProcessor, WhisperForConditionalGeneration
-        import librosa
+        from model_registry import get_whisper
         
-        print("📦 Loading Whisper model...")
-        processor = WhisperProcessor.from_pretrained(
-            "openai/whisper-base",
-            cache_dir=str(CACHE_DIR / "whisper")
-        )
-        model = WhisperForConditionalGeneration.from_pretrained(
-            "openai/whisper-base",
-            cache_dir=str(CACHE_DIR / "whisper")
-        )
-        print("✅ Whisper loaded")
+        processor, model = get_whisper()
         
-        # Load audio
-        audio, sr = librosa.load(audio_path, sr=16000, mono=True)
+        # Reuse the decoded waveform
+        samples = waveform_to_numpy(audio)
         
         # Process audio
-        input_features = processor(audio, sampling_rate=16000, return_tensors="pt").input_features
+        input_features = processor(samples, sampling_rate=SAMPLE_RATE, return_tensors="pt").input_features
         
         # Generate with language detection
         print("🔍 Detecting language with Whisper...")
@@ -230,22 +550,45 @@ def detect_language_whisper(audio_path):
         raise e
 
 
-def detect_language_fallback(audio_path):
+def detect_language_whisper(audio, return_distribution=False, top_k=TOP_K, mode=None):
+    """
+    Method 2: Language detection using Whisper
+    mode: "token" (language-token probabilities) or "transcribe"; defaults to
+    WHISPER_LANGUAGE_ID. Only the token mode has a distribution.
+    """
+    print("🌍 Method 2: Using Whisper language detection...")
+    mode = mode or WHISPER_LANGUAGE_ID
+    
+    if mode == "transcribe":
+        result = _whisper_transcription_language(audio)
+        return (*result, None) if return_distribution else result
+    if mode != "token":
+        raise ValueError(f"Unknown Whisper language ID mode: {mode} (available: token, transcribe)")
+    
+    try:
+        distribution = whisper_language_distribution(audio, top_k)
+        language, confidence = distribution[0]["label"], distribution[0]["probability"] * 100
+        print(f"🌍 Whisper language token: {language} ({confidence:.1f}%)")
+        if return_distribution:
+            return language, confidence, distribution
+        return language, confidence
+    except Exception as e:
+        print(f"❌ Whisper language detection failed: {e}")
+        raise e
+
+
+def detect_language_fallback(audio):
     """Fallback: Simple acoustic analysis for language detection"""
     print("🌍 Fallback: Using acoustic analysis for language detection...")
     
     try:
-        import librosa
-        
-        # Load audio
-        audio, sr = librosa.load(audio_path, sr=16000, mono=True)
+        from acoustic_features import acoustic_features
         
-        # Extract basic features
-        tempo, _ = librosa.beat.beat_track(y=audio, sr=sr)
-        spectral_centroids = librosa.feature.spectral_centroid(y=audio, sr=sr)[0]
-        avg_spectral = np.mean(spectral_centroids)
-        mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13)
-        mfcc_var = np.var(mfccs)
+        # Reuse the decoded waveform; one chunked STFT feeds every feature (cached per clip)
+        features = acoustic_features(waveform_to_numpy(audio))
+        tempo = features["tempo"]
+        avg_spectral = features["spectral_centroid"]
+        mfcc_var = features["mfcc_var"]
         
         print(f"🔍 DEBUG - Acoustic features: tempo={tempo:.1f}, spectral={avg_spectral:.1f}, mfcc_var={mfcc_var:.1f}")
         
@@ -271,51 +614,93 @@ def detect_language_fallback(audio_path):
         return "unknown", 40
 
 
-def detect_language(audio_path):
-    """Main language detection function"""
-    print(f"🌍 Starting language detection: {audio_path}")
+def detect_language(audio, feature_cache=None, return_distribution=False, top_k=TOP_K,
+                    strategy=None, return_report=False):
+    """
+    Main language detection function
+    audio: WAV path or 16 kHz mono tensor/ndarray (decoded once, shared by every method)
+    feature_cache: optional FeatureCache built from the same waveform
+    return_distribution: return (language, confidence, top_k distribution); the
+    distribution is None when Whisper transcription or the acoustic fallback decided
+    strategy: how SpeechBrain and Whisper are combined - "sequential", "first"
+    or "best" (see detector_strategy); the acoustic fallback only runs if both fail
+    return_report: return the strategy report instead (label, confidence,
+    distribution, winning method and per-method timings)
+    """
+    from detector_strategy import run_detectors
+    from model_registry import LANGUAGE_MODEL, WHISPER_MODEL, probe
     
-    if not audio_path or not os.path.exists(audio_path):
-        raise ValueError(f"Audio file not found: {audio_path}")
+    print(f"🌍 Starting language detection: {describe_audio(audio)}")
     
-    # Try Method 1: SpeechBrain (most accurate)
-    try:
-        return detect_language_speechbrain(audio_path)
-    except Exception as e1:
-        print(f"⚠️ SpeechBrain language detection failed: {str(e1)[:100]}...")
-        
-        # Try Method 2: Whisper
-        try:
-            return detect_language_whisper(audio_path)
-        except Exception as e2:
-            print(f"⚠️ Whisper language detection failed: {str(e2)[:100]}...")
-            
-            # Fallback method
-            print("🔄 Using fallback language detection...")
-            return detect_language_fallback(audio_path)
+    if audio is None or (is_audio_path(audio) and not os.path.exists(audio)):
+        raise ValueError(f"Audio file not found: {audio}")
+    
+    audio = load_waveform(audio)
+    
+    methods = [
+        # Method 1: SpeechBrain (most accurate)
+        ("speechbrain", lambda clip: detect_language_speechbrain(clip, feature_cache, True, top_k), None),
+        # Method 2: Whisper
+        ("whisper", lambda clip: detect_language_whisper(clip, True, top_k), None),
+    ]
+    # Health checks that let a method back in after its circuit breaker opened
+    probes = {
+        "speechbrain": lambda: probe(LANGUAGE_MODEL),
+        "whisper": lambda: probe(WHISPER_MODEL),
+    }
+    report = run_detectors(audio, methods, strategy, probes=probes,
+                           fallback=("fallback", lambda clip: (*detect_language_fallback(clip), None)))
+    
+    if return_report:
+        return report
+    if return_distribution:
+        return report["label"], report["confidence"], report["distribution"]
+    return report["label"], report["confidence"]
+
 
+# Map internal labels to readable names
+ACCENT_MAPPING = {
+    'us': 'American',
+    'england': 'British (England)',
+    'australia': 'Australian',
+    'indian': 'Indian',
+    'canada': 'Canadian',
+    'bermuda': 'Bermudian',
+    'scotland': 'Scottish',
+    'african': 'South African',
+    'ireland': 'Irish',
+    'newzealand': 'New Zealand',
+    'wales': 'Welsh',
+    'malaysia': 'Malaysian',
+    'philippines': 'Filipino',
+    'singapore': 'Singaporean',
+    'hongkong': 'Hong Kong',
+    'southatlandtic': 'South Atlantic'
+}
 
-def classify_english_accent_speechbrain(audio_path):
-    """English accent detection using SpeechBrain ECAPA-TDNN"""
+
+def readable_accent_name(label):
+    """Readable accent name for a CommonAccent label"""
+    return ACCENT_MAPPING.get(str(label).lower(), str(label).title())
+
+
+def classify_english_accent_speechbrain(audio, feature_cache=None, return_distribution=False, top_k=TOP_K):
+    """
+    English accent detection using SpeechBrain ECAPA-TDNN
+    return_distribution: also return the top_k accents from the same forward pass
+    (None when the random fallback was used)
+    """
     print("🎯 Using SpeechBrain for English accent detection...")
     
     try:
-        from speechbrain.pretrained import EncoderClassifier
+        from model_registry import get_accent_model
         
-        print("📦 Loading English accent classifier...")
-        classifier = EncoderClassifier.from_hparams(
-            source="Jzuluaga/accent-id-commonaccent_ecapa", 
-            savedir=str(CACHE_DIR / "accent-id-commonaccent_ecapa")
-        )
-        print("✅ Accent model loaded successfully")
+        classifier = get_accent_model()
         
         print("🔍 Classifying English accent...")
-        out_prob, score, index, text_lab = classifier.classify_file(audio_path)
+        out_prob, score, index, text_lab = run_ecapa_classifier(classifier, audio, feature_cache)
         
-        if torch.is_tensor(score):
-            confidence = float(score.max().item()) * 100
-        else:
-            confidence = float(np.max(score)) * 100
+        confidence = top_confidence(out_prob[0], COSINE, MAX_ACCENT_CONFIDENCE)
             
         accent = text_lab[0] if isinstance(text_lab, list) else str(text_lab)
         
@@ -323,58 +708,605 @@ def classify_english_accent_speechbrain(audio_path):
         print(f"🔍 DEBUG - Accent raw output: {text_lab}")
         print(f"🔍 DEBUG - Processed accent: '{accent}'")
         
-        # Map internal labels to readable names
-        accent_mapping = {
-            'us': 'American',
-            'england': 'British (England)',
-            'australia': 'Australian',
-            'indian': 'Indian',
-            'canada': 'Canadian',
-            'bermuda': 'Bermudian',
-            'scotland': 'Scottish',
-            'african': 'South African',
-            'ireland': 'Irish',
-            'newzealand': 'New Zealand',
-            'wales': 'Welsh',
-            'malaysia': 'Malaysian',
-            'philippines': 'Filipino',
-            'singapore': 'Singaporean',
-            'hongkong': 'Hong Kong',
-            'southatlandtic': 'South Atlantic'
-        }
-        
-        readable_accent = accent_mapping.get(accent.lower(), accent.title())
-        confidence = min(confidence, 95.0)
+        readable_accent = readable_accent_name(accent)
         
         print(f"🎯 English accent: {readable_accent} ({confidence:.1f}%)")
+        if return_distribution:
+            distribution = score_distribution(out_prob[0], classifier.hparams.label_encoder, COSINE, top_k,
+                                              readable_accent_name)
+            return readable_accent, round(confidence, 1), distribution
         return readable_accent, round(confidence, 1)
         
     except Exception as e:
         print(f"❌ English accent detection failed: {e}")
         fallback_accents = ["American", "British (England)", "Australian", "Indian", "Canadian"]
         fallback_accent = np.random.choice(fallback_accents)
+        if return_distribution:
+            return fallback_accent, 65.0, None
         return fallback_accent, 65.0
 
 
-def analyze_speech(audio_path):
+def _classify_batch(classifier, waveforms, feature_cache=None):
+    from ecapa_features import classify_cached, classify_padded
+    
+    if feature_cache is not None:
+        return classify_cached(classifier, feature_cache)
+    return classify_padded(classifier, waveforms)
+
+
+def detect_language_speechbrain_batch(waveforms, return_distribution=False, top_k=TOP_K, feature_cache=None):
+    """
+    VoxLingua107 language ID for several clips in one padded forward pass
+    feature_cache: optional FeatureCache over the padded waveforms (keeps the
+    frame-level outputs for the timeline)
+    Returns: list of (language, confidence), one per waveform
+    (plus the top_k distribution with return_distribution)
+    """
+    from model_registry import get_language_model
+    
+    classifier = get_language_model()
+    out_prob, score, index, text_lab = _classify_batch(classifier, waveforms, feature_cache)
+    results = [(str(label).lower(), top_confidence(row, LOG_PROBS)) for label, row in zip(text_lab, out_prob)]
+    if return_distribution:
+        label_encoder = classifier.hparams.label_encoder
+        results = [result + (score_distribution(row, label_encoder, LOG_PROBS, top_k, _language_label),)
+                   for result, row in zip(results, out_prob)]
+    return results
+
+
+def classify_english_accent_speechbrain_batch(waveforms, return_distribution=False, top_k=TOP_K, feature_cache=None):
+    """
+    CommonAccent accent ID for several clips in one padded forward pass
+    feature_cache: optional FeatureCache over the padded waveforms
+    Returns: list of (accent, confidence), one per waveform
+    (plus the top_k distribution with return_distribution)
+    """
+    from model_registry import get_accent_model
+    
+    classifier = get_accent_model()
+    out_prob, score, index, text_lab = _classify_batch(classifier, waveforms, feature_cache)
+    results = [(readable_accent_name(label), round(top_confidence(row, COSINE, MAX_ACCENT_CONFIDENCE), 1))
+               for label, row in zip(text_lab, out_prob)]
+    if return_distribution:
+        label_encoder = classifier.hparams.label_encoder
+        results = [result + (score_distribution(row, label_encoder, COSINE, top_k, readable_accent_name),)
+                   for result, row in zip(results, out_prob)]
+    return results
+
+
+def _windowed_result(classifier, spans, log_probs, label_map, top_k=TOP_K, max_confidence=100.0):
+    """Clip-level label and distribution plus one label per window, from windowed log-probs"""
+    import torch
+    from ecapa_features import aggregate_log_probs
+    
+    label_encoder = classifier.hparams.label_encoder
+    aggregate = aggregate_log_probs(log_probs)
+    best, index = torch.max(log_probs, dim=-1)
+    labels = label_encoder.decode_torch(index)
+    
+    segments = [{
+        "start": round(start / SAMPLE_RATE, 2),
+        "end": round(end / SAMPLE_RATE, 2),
+        "label": label_map(label),
+        "confidence": round(min(math.exp(float(score)) * 100, max_confidence), 1),
+    } for (start, end), label, score in zip(spans, labels, best)]
+    
+    distribution = score_distribution(aggregate, label_encoder, LOG_PROBS, top_k, label_map)
+    return {
+        "label": distribution[0]["label"],
+        "confidence": round(top_confidence(aggregate, LOG_PROBS, max_confidence), 1),
+        "distribution": distribution,
+        "segments": segments,
+    }
+
+
+def _classify_windows(classifier, scores, audio, window_seconds, hop_seconds):
+    from ecapa_features import classify_windows
+    
+    spans, (log_probs,), (embedding,) = classify_windows(
+        [(classifier, scores)], load_waveform(audio), int(window_seconds * SAMPLE_RATE),
+        int(hop_seconds * SAMPLE_RATE), WINDOW_BATCH_SIZE, return_embeddings=True
+    )
+    print(f"🪟 {len(spans)} window(s) of {window_seconds:.0f}s, hop {hop_seconds:.0f}s")
+    return spans, log_probs, embedding
+
+
+def detect_language_windowed(audio, window_seconds=WINDOW_SECONDS, hop_seconds=WINDOW_HOP_SECONDS, top_k=TOP_K):
+    """
+    VoxLingua107 language ID over overlapping fixed-length windows, with the
+    per-window log-probabilities averaged. Memory is bounded by the window
+    size instead of the recording length.
+    Returns: dict with "label", "confidence", "distribution", per-window "segments"
+    and the mean window "embedding"
+    """
+    from model_registry import get_language_model
+    
+    classifier = get_language_model()
+    spans, log_probs, embedding = _classify_windows(classifier, LOG_PROBS, audio, window_seconds, hop_seconds)
+    result = _windowed_result(classifier, spans, log_probs, _language_label, top_k)
+    result["embedding"] = embedding
+    print(f"🌍 Language detected (windowed): {result['label']} ({result['confidence']:.1f}%)")
+    return result
+
+
+def classify_english_accent_windowed(audio, window_seconds=WINDOW_SECONDS, hop_seconds=WINDOW_HOP_SECONDS, top_k=TOP_K):
+    """
+    CommonAccent accent ID over overlapping fixed-length windows
+    Returns: dict with "label", "confidence", "distribution", per-window "segments"
+    and the mean window "embedding"
+    """
+    from model_registry import get_accent_model
+    
+    classifier = get_accent_model()
+    spans, log_probs, embedding = _classify_windows(classifier, COSINE, audio, window_seconds, hop_seconds)
+    result = _windowed_result(classifier, spans, log_probs, readable_accent_name, top_k,
+                              max_confidence=MAX_ACCENT_CONFIDENCE)
+    result["embedding"] = embedding
+    print(f"🎯 English accent (windowed): {result['label']} ({result['confidence']:.1f}%)")
+    return result
+
+
+def _speechbrain_breaker():
+    """
+    Circuit breaker of the SpeechBrain language model, shared by detect_language
+    and the batched / windowed paths that call the model directly
+    """
+    from circuit_breaker import get_breaker
+    from model_registry import LANGUAGE_MODEL, probe
+    return get_breaker("speechbrain", lambda: probe(LANGUAGE_MODEL))
+
+
+def _analyze_windowed(waveform, details, top_k=TOP_K, embeddings=None):
+    """
+    Windowed language and accent ID for long recordings (fills details in place)
+    embeddings: optional dict that receives {model name: mean window embedding}
+    """
+    from detector_strategy import record_timing
+    from model_registry import LANGUAGE_MODEL, ACCENT_MODEL
+    
+    if embeddings is None:
+        embeddings = {}
+    details["analyzed_seconds"] = round(waveform.numel() / SAMPLE_RATE, 2)
+    # Whole-clip fallbacks only see the first LONG_AUDIO_SECONDS, so memory stays bounded
+    head = waveform[:int(LONG_AUDIO_SECONDS * SAMPLE_RATE)]
+    
+    breaker = _speechbrain_breaker()
+    language = None
+    if breaker.allow():
+        start = time.perf_counter()
+        try:
+            language = detect_language_windowed(waveform, top_k=top_k)
+            breaker.record_success()
+        except Exception as e:
+            breaker.record_failure(e)
+            print(f"⚠️ Windowed language detection failed ({str(e)[:100]}), "
+                  f"using the first {LONG_AUDIO_SECONDS:.0f}s")
+    else:
+        print(f"⏭️ Skipping windowed SpeechBrain (circuit open after repeated failures), "
+              f"using the first {LONG_AUDIO_SECONDS:.0f}s")
+    
+    if language is not None:
+        timings = {}
+        record_timing(timings, "speechbrain", "ok", time.perf_counter() - start,
+                      (language["label"], language["confidence"]))
+        details.update(language=language["label"], lang_confidence=language["confidence"],
+                       language_distribution=language["distribution"], language_segments=language["segments"],
+                       language_method="speechbrain", detector_timings=timings)
+        embeddings[LANGUAGE_MODEL] = language["embedding"]
+    else:
+        report = detect_language(head, top_k=top_k, return_report=True)
+        details.update(language=report["label"], lang_confidence=report["confidence"],
+                       language_distribution=report["distribution"], language_method=report["method"],
+                       detector_timings=report["timings"])
+    
+    if not is_english_language(details["language"]):
+        print(f"\n❌ RESULT: Speaker is NOT speaking English ({details['language']})")
+        return details
+    
+    try:
+        accent = classify_english_accent_windowed(waveform, top_k=top_k)
+        details.update(accent=accent["label"], accent_confidence=accent["confidence"],
+                       accent_distribution=accent["distribution"], accent_segments=accent["segments"])
+        embeddings[ACCENT_MODEL] = accent["embedding"]
+    except Exception as e:
+        print(f"⚠️ Windowed accent detection failed ({str(e)[:100]}), using the first {LONG_AUDIO_SECONDS:.0f}s")
+        accent, confidence, distribution = classify_english_accent_speechbrain(
+            head, return_distribution=True, top_k=top_k
+        )
+        details.update(accent=accent, accent_confidence=confidence, accent_distribution=distribution)
+    
+    details.update(is_english=True, language="English")
+    print(f"\n🎯 FINAL RESULT: English, {details['accent']} accent ({details['accent_confidence']:.1f}% confidence)")
+    return details
+
+
+def merge_timeline(segments, total_seconds):
+    """
+    Turn per-window predictions into a timeline. Each window covers the
+    stretch between the midpoints to its neighbours, and consecutive windows
+    with the same language and accent are merged (confidence averaged over time).
+    segments: dicts with start, end (seconds), language, accent, confidence
+    """
+    centers = [(segment["start"] + segment["end"]) / 2 for segment in segments]
+    timeline = []
+    
+    for i, segment in enumerate(segments):
+        start = 0.0 if i == 0 else (centers[i - 1] + centers[i]) / 2
+        end = total_seconds if i == len(segments) - 1 else (centers[i] + centers[i + 1]) / 2
+        
+        last = timeline[-1] if timeline else None
+        if last and (last["language"], last["accent"]) == (segment["language"], segment["accent"]):
+            covered = last["end"] - last["start"]
+            last["confidence"] = (last["confidence"] * covered + segment["confidence"] * (end - start)) / (covered + end - start)
+            last["end"] = end
+        else:
+            timeline.append({"start": start, "end": end, "language": segment["language"],
+                             "accent": segment["accent"], "confidence": segment["confidence"]})
+    
+    for entry in timeline:
+        entry.update(start=round(entry["start"], 2), end=round(entry["end"], 2),
+                     confidence=round(entry["confidence"], 1))
+    return timeline
+
+
+def _segment_predictions(classifier, scores, feature_cache, spans, item=0):
+    """(labels, probabilities) for sample spans of a cached clip"""
+    import torch
+    from ecapa_features import classify_segments, log_probabilities
+    
+    out_prob = classify_segments(classifier, feature_cache, spans, item)
+    probs, index = torch.max(log_probabilities(out_prob, scores).exp(), dim=-1)
+    return classifier.hparams.label_encoder.decode_torch(index), [float(p) for p in probs]
+
+
+def timeline_spans(num_samples, segment_seconds=TIMELINE_SEGMENT_SECONDS):
+    """Sample spans of the timeline segments of a clip"""
+    from ecapa_features import window_spans
+    
+    segment = int(segment_seconds * SAMPLE_RATE)
+    return window_spans(num_samples, segment, segment)
+
+
+def timeline_languages(feature_cache, spans, item=0):
+    """
+    Language of each timeline span, pooled from the frame-level outputs the
+    whole-clip language decision already computed.
+    Returns: list of partial segments (accent filled in by timeline_accents)
+    """
+    from model_registry import get_language_model
+    
+    labels, probs = _segment_predictions(get_language_model(), LOG_PROBS, feature_cache, spans, item)
+    english = {}
+    segments = []
+    for (start, end), label, prob in zip(spans, labels, probs):
+        language = _language_label(label)
+        if language not in english:
+            english[language] = is_english_language(language)
+        segments.append({
+            "start": start / SAMPLE_RATE,
+            "end": end / SAMPLE_RATE,
+            "language": "English" if english[language] else language,
+            "accent": None,
+            "confidence": prob * 100,
+        })
+    return segments
+
+
+def timeline_accents(segments, feature_cache, spans, item=0):
+    """
+    Add the accent of every English segment (in place). Confidence becomes
+    P(English) * P(accent).
+    """
+    from model_registry import get_accent_model
+    
+    english = [i for i, segment in enumerate(segments) if segment["language"] == "English"]
+    if not english:
+        return segments
+    
+    labels, probs = _segment_predictions(get_accent_model(), COSINE, feature_cache, [spans[i] for i in english], item)
+    for i, label, prob in zip(english, labels, probs):
+        segments[i]["accent"] = readable_accent_name(label)
+        segments[i]["confidence"] *= prob
+    return segments
+
+
+def speech_timeline(feature_cache, segment_seconds=TIMELINE_SEGMENT_SECONDS):
+    """
+    (start, end, language, accent, confidence) per segment of an analyzed clip.
+    Only attentive pooling and the classifier heads run per segment, on top of
+    the frame-level outputs cached by the whole-clip pass; the accent model
+    runs only if some segment is English.
+    """
+    spans = timeline_spans(feature_cache.wavs.shape[-1], segment_seconds)
+    segments = timeline_accents(timeline_languages(feature_cache, spans), feature_cache, spans)
+    return merge_timeline(segments, feature_cache.wavs.shape[-1] / SAMPLE_RATE)
+
+
+def _clip_timeline(feature_cache):
+    """speech_timeline, or None without a FeatureCache or a loaded SpeechBrain model"""
+    from model_registry import LANGUAGE_MODEL, is_loaded
+    
+    if feature_cache is None or not is_loaded(LANGUAGE_MODEL):
+        return None
+    try:
+        timeline = speech_timeline(feature_cache)
+    except Exception as e:
+        print(f"⚠️ Timeline failed: {str(e)[:100]}")
+        return None
+    print(f"🕒 Timeline: {len(timeline)} segment(s)")
+    return timeline
+
+
+def _windowed_timeline(details):
+    """Timeline from the per-window labels of a windowed analysis"""
+    language_segments = details["language_segments"]
+    if not language_segments:
+        return None
+    accent_segments = details["accent_segments"] or [None] * len(language_segments)
+    
+    english = {}
+    segments = []
+    for language_segment, accent_segment in zip(language_segments, accent_segments):
+        language = language_segment["label"]
+        if language not in english:
+            english[language] = is_english_language(language)
+        segment = {
+            "start": language_segment["start"],
+            "end": language_segment["end"],
+            "language": "English" if english[language] else language,
+            "accent": None,
+            "confidence": language_segment["confidence"],
+        }
+        if english[language] and accent_segment:
+            segment["accent"] = accent_segment["label"]
+            segment["confidence"] *= accent_segment["confidence"] / 100
+        segments.append(segment)
+    
+    return merge_timeline(segments, details["analyzed_seconds"])
+
+
+def _original_times(details, vad_info):
+    """
+    Move the timeline and window segments (computed on the VAD-trimmed audio)
+    back onto the time axis of the original recording (in place)
+    """
+    if not vad_info or not vad_info["trimmed"]:
+        return details
+    from vad import original_time
+    
+    for key in ("timeline", "language_segments", "accent_segments"):
+        for segment in details.get(key) or []:
+            segment["start"] = original_time(segment["start"], vad_info["segments"])
+            segment["end"] = original_time(segment["end"], vad_info["segments"], end=True)
+    return details
+
+
+def analysis_windows(num_samples, progressive=False):
+    """
+    Prefix lengths (in samples) to analyze, shortest first.
+    Without progressive mode this is just the whole clip.
+    """
+    if not progressive:
+        return [num_samples]
+    
+    windows = [int(seconds * SAMPLE_RATE) for seconds in PROGRESSIVE_WINDOWS]
+    windows = [n for n in windows if n < num_samples]
+    return windows + [num_samples]
+
+
+def save_clip_embeddings(embedding_store, clip_id, language_cache=None, accent_cache=None, embeddings=None):
+    """
+    Save the ECAPA embeddings computed during an analysis to an EmbeddingStore.
+    Only embeddings already in the FeatureCaches are saved (e.g. none for the
+    language model if detection fell back to Whisper).
+    embeddings: {model name: vector} computed elsewhere, e.g. the mean window
+    embeddings of a windowed analysis
+    """
+    from model_registry import LANGUAGE_MODEL, ACCENT_MODEL, get_language_model, get_accent_model, is_loaded
+    
+    embeddings = dict(embeddings or {})
+    for name, get_classifier, feature_cache in ((LANGUAGE_MODEL, get_language_model, language_cache),
+                                                (ACCENT_MODEL, get_accent_model, accent_cache)):
+        if name in embeddings or feature_cache is None or not is_loaded(name):
+            continue
+        vector = feature_cache.cached_embeddings(get_classifier())
+        if vector is not None:
+            embeddings[name] = vector
+    
+    if not embeddings:
+        return
+    try:
+        embedding_store.add_clip(clip_id, embeddings)
+        print(f"🧬 Saved {', '.join(embeddings)} embedding(s) for {clip_id[:16]}...")
+    except Exception as e:
+        print(f"⚠️ Could not save embeddings: {e}")
+
+
+def _prescreen_rejection(screen, total_seconds):
+    """Details dict for a clip the pre-screen rejected: no labels, the reason under "prescreen" """
+    return {
+        "is_english": False,
+        "language": None,
+        "accent": None,
+        "lang_confidence": None,
+        "accent_confidence": None,
+        "total_seconds": round(total_seconds, 2),
+        "analyzed_seconds": 0.0,
+        "early_exit": True,
+        "speech_ratio": screen["speech_ratio"],
+        "vad_segments": None,
+        "language_distribution": None,
+        "accent_distribution": None,
+        "language_segments": None,
+        "accent_segments": None,
+        "timeline": None,
+        "language_method": "prescreen",
+        "detector_timings": None,
+        "prescreen": screen,
+    }
+
+
+def _analysis_result(details, return_details):
+    """Legacy 5-tuple, or the full details dict"""
+    if return_details:
+        return details
+    return (details["is_english"], details["language"], details["accent"],
+            details["lang_confidence"], details["accent_confidence"])
+
+
+def analyze_speech(audio, share_features=True, max_duration=None, progressive=False,
+                   confidence_threshold=PROGRESSIVE_CONFIDENCE, vad=None, result_cache=None,
+                   embedding_store=None, clip_id=None, top_k=TOP_K, windowed=None, timeline=True,
+                   prescreen=True, return_details=False):
     """
     Main function: First detects language, then analyzes English accent if applicable
+    audio: WAV path or 16 kHz mono tensor/ndarray. It is decoded once and the
+    same buffer feeds every stage.
+    share_features: compute ECAPA filterbanks once and reuse them for both classifiers
+    max_duration: only analyze the first max_duration seconds
+    progressive: classify growing prefixes (PROGRESSIVE_WINDOWS) and stop as soon as
+    the confidence reaches confidence_threshold
+    vad: "energy" or "speechbrain" - drop silence/music first and only classify speech
+    result_cache: optional ResultCache - results are keyed by a hash of the decoded PCM
+    embedding_store: optional EmbeddingStore - saves the ECAPA embeddings of the
+    analyzed audio under clip_id (default: hash of the decoded PCM); windowed
+    analyses save the mean of the window embeddings
+    top_k: alternatives kept in the language/accent distributions of the details dict
+    windowed: classify overlapping WINDOW_SECONDS windows in batches and average
+    them (bounded memory, per-window labels); None = only above LONG_AUDIO_SECONDS
+    timeline: add a per-segment (start, end, language, accent, confidence) timeline
+    to the details dict, pooled from the same forward pass
+    The details dict also names the language method that answered ("language_method")
+    and how long each one took ("detector_timings"); see detector_strategy
+    prescreen: check level, speech and clipping first (prescreen.py) and return an
+    "insufficient speech" result without running any model if the clip is hopeless;
+    the checks are reported under "prescreen"
+    return_details: return a dict with extra information instead of the tuple
     Returns: (is_english: bool, language: str, accent: str, lang_confidence: float, accent_confidence: float)
     """
-    print(f"🎤 Starting complete speech analysis: {audio_path}")
+    print(f"🎤 Starting complete speech analysis: {describe_audio(audio)}")
+    
+    if audio is None or (is_audio_path(audio) and not os.path.exists(audio)):
+        raise ValueError(f"Audio file not found: {audio}")
+    
+    # Decode once - every detector below works on this buffer
+    waveform = load_waveform(audio)
+    total_seconds = waveform.numel() / SAMPLE_RATE
+    
+    # Frame energy is computed once, for both the pre-screen and the energy VAD
+    energy = None
+    if prescreen or vad == "energy":
+        from vad import speech_energy
+        energy = speech_energy(waveform.numpy())
+    
+    screen = None
+    if prescreen:
+        from prescreen import prescreen_audio
+        screen = prescreen_audio(waveform, energy=energy)
+        if not screen["passed"]:
+            return _analysis_result(_prescreen_rejection(screen, total_seconds), return_details)
+    
+    cache_key = None
+    if result_cache is not None:
+        from result_cache import analysis_options, audio_fingerprint
+        cache_key = audio_fingerprint(waveform, **analysis_options(
+            max_duration=max_duration, vad=vad, top_k=top_k, timeline=timeline, prescreen=prescreen,
+            windowed=windowed, progressive_threshold=confidence_threshold if progressive else None
+        ))
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return _analysis_result(cached, return_details)
+    
+    if embedding_store is not None or timeline:
+        # Embeddings and the timeline come from the feature caches, so sharing must be on
+        share_features = True
+    if embedding_store is not None:
+        if clip_id is None:
+            from result_cache import audio_fingerprint
+            clip_id = audio_fingerprint(waveform)
     
-    if not audio_path or not os.path.exists(audio_path):
-        raise ValueError(f"Audio file not found: {audio_path}")
+    vad_info = None
+    if vad:
+        from vad import apply_vad
+        waveform, vad_info = apply_vad(waveform, method=vad, energy=energy)
+    
+    speech_seconds = waveform.numel() / SAMPLE_RATE
+    if max_duration and speech_seconds > max_duration:
+        waveform = waveform[:int(max_duration * SAMPLE_RATE)]
+        print(f"✂️ Analysis bounded to the first {max_duration:.0f}s of {speech_seconds:.0f}s")
+    
+    windows = analysis_windows(waveform.numel(), progressive)
+    feature_caches = {}
+    
+    def prefix(num_samples):
+        """Waveform prefix plus its FeatureCache (shared by both stages)"""
+        segment = waveform[:num_samples]
+        if not share_features:
+            return segment, None
+        if num_samples not in feature_caches:
+            from ecapa_features import FeatureCache
+            feature_caches[num_samples] = FeatureCache(segment)
+        return segment, feature_caches[num_samples]
+    
+    details = {
+        "is_english": False,
+        "language": None,
+        "accent": None,
+        "lang_confidence": None,
+        "accent_confidence": None,
+        "total_seconds": round(total_seconds, 2),
+        "analyzed_seconds": None,
+        "early_exit": False,
+        "speech_ratio": vad_info["speech_ratio"] if vad_info else None,
+        "vad_segments": vad_info["segments"] if vad_info else None,
+        "language_distribution": None,
+        "accent_distribution": None,
+        "language_segments": None,
+        "accent_segments": None,
+        "timeline": None,
+        "language_method": None,
+        "detector_timings": None,
+        "prescreen": screen,
+    }
+    
+    if windowed is None:
+        windowed = waveform.numel() / SAMPLE_RATE > LONG_AUDIO_SECONDS
+    if windowed:
+        window_embeddings = {}
+        _analyze_windowed(waveform, details, top_k, window_embeddings)
+        if timeline:
+            details["timeline"] = _windowed_timeline(details)
+        _original_times(details, vad_info)
+        if result_cache is not None:
+            result_cache.put(cache_key, details)
+        if embedding_store is not None:
+            save_clip_embeddings(embedding_store, clip_id, embeddings=window_embeddings)
+        return _analysis_result(details, return_details)
     
     # Step 1: Detect Language  
     print("\n" + "="*50)
     print("STEP 1: LANGUAGE DETECTION")
     print("="*50)
     
-    language, lang_confidence = detect_language(audio_path)
+    for i, num_samples in enumerate(windows):
+        segment, feature_cache = prefix(num_samples)
+        report = detect_language(segment, feature_cache, top_k=top_k, return_report=True)
+        language, lang_confidence, language_distribution = report["label"], report["confidence"], report["distribution"]
+        details.update(language_method=report["method"], detector_timings=report["timings"])
+        lang_samples = num_samples
+        
+        if i == len(windows) - 1:
+            break
+        if lang_confidence >= confidence_threshold:
+            print(f"⏩ Language confident after {num_samples / SAMPLE_RATE:.0f}s - stopping early")
+            details["early_exit"] = True
+            break
+        print(f"🔄 Language confidence {lang_confidence:.1f}% below {confidence_threshold:.0f}% - extending window")
     
     # FIXED: Use the improved English detection function
     is_english = is_english_language(language)
+    details["analyzed_seconds"] = round(lang_samples / SAMPLE_RATE, 2)
+    details["language_distribution"] = language_distribution
     
     print(f"\n🔍 DEBUG - Final language check:")
     print(f"   - Detected language: '{language}'")
@@ -385,7 +1317,15 @@ def analyze_speech(audio_path):
         print(f"\n❌ RESULT: Speaker is NOT speaking English")
         print(f"   Detected language: {language}")
         print(f"   Confidence: {lang_confidence:.1f}%")
-        return False, language, None, lang_confidence, None
+        details.update(language=language, lang_confidence=lang_confidence)
+        if timeline:
+            details["timeline"] = _clip_timeline(feature_caches.get(lang_samples))
+        _original_times(details, vad_info)
+        if result_cache is not None:
+            result_cache.put(cache_key, details)
+        if embedding_store is not None:
+            save_clip_embeddings(embedding_store, clip_id, feature_caches.get(lang_samples))
+        return _analysis_result(details, return_details)
     
     # Step 2: English Accent Detection
     print(f"\n✅ Language is English! Proceeding to accent detection...")
@@ -393,13 +1333,213 @@ def analyze_speech(audio_path):
     print("STEP 2: ENGLISH ACCENT DETECTION")
     print("="*50)
     
-    accent, accent_confidence = classify_english_accent_speechbrain(audio_path)
+    # Start from the prefix the language decision was made on
+    accent_windows = [n for n in windows if n >= lang_samples]
+    for i, num_samples in enumerate(accent_windows):
+        segment, feature_cache = prefix(num_samples)
+        accent, accent_confidence, accent_distribution = classify_english_accent_speechbrain(
+            segment, feature_cache, return_distribution=True, top_k=top_k
+        )
+        accent_samples = num_samples
+        
+        if i == len(accent_windows) - 1:
+            break
+        if accent_confidence >= confidence_threshold:
+            print(f"⏩ Accent confident after {num_samples / SAMPLE_RATE:.0f}s - stopping early")
+            break
+        print(f"🔄 Accent confidence {accent_confidence:.1f}% below {confidence_threshold:.0f}% - extending window")
+    
+    details["early_exit"] = accent_samples < waveform.numel()
+    details["analyzed_seconds"] = round(accent_samples / SAMPLE_RATE, 2)
+    
+    for feature_cache in feature_caches.values():
+        stats = feature_cache.stats()
+        print(f"🔁 Feature sharing: {stats['spectrograms']} spectrogram(s) for {stats['feature_sets']} filterbank set(s), "
+              f"{stats['hits'] + stats['spectrogram_hits']} reused, {stats['misses']} computed")
     
     print(f"\n🎯 FINAL RESULT:")
     print(f"   Language: English ({lang_confidence:.1f}% confidence)")
     print(f"   English Accent: {accent} ({accent_confidence:.1f}% confidence)")
     
-    return True, "English", accent, lang_confidence, accent_confidence
+    details.update(is_english=True, language="English", accent=accent,
+                   lang_confidence=lang_confidence, accent_confidence=accent_confidence,
+                   accent_distribution=accent_distribution)
+    if timeline:
+        details["timeline"] = _clip_timeline(feature_caches.get(accent_samples))
+    _original_times(details, vad_info)
+    if result_cache is not None:
+        result_cache.put(cache_key, details)
+    if embedding_store is not None:
+        save_clip_embeddings(embedding_store, clip_id, feature_caches.get(lang_samples),
+                             feature_caches.get(accent_samples))
+    return _analysis_result(details, return_details)
+
+
+def _analyze_clips(results, prepared, indices, top_k=TOP_K, timeline=True):
+    """Per-clip fallback of analyze_speech_batch (language ID through detect_language)"""
+    for i in indices:
+        result, waveform = results[i], prepared[i]
+        try:
+            details = analyze_speech(waveform, top_k=top_k, timeline=timeline, prescreen=False,
+                                     return_details=True)
+            for key in ("is_english", "language", "accent", "lang_confidence", "accent_confidence",
+                        "language_distribution", "accent_distribution", "timeline",
+                        "language_method", "detector_timings"):
+                result[key] = details[key]
+        except Exception as clip_error:
+            result["error"] = str(clip_error)
+    return results
+
+
+def analyze_speech_batch(waveforms, vad=None, max_duration=None, top_k=TOP_K, timeline=True, prescreen=True):
+    """
+    analyze_speech for several clips at once: language ID runs on the whole
+    padded batch, accent ID on the English clips only. Clips longer than
+    LONG_AUDIO_SECONDS get windowed inference instead of being padded into the batch.
+    Falls back to per-clip analyze_speech if the batched path fails or the
+    SpeechBrain circuit breaker is open.
+    Clips rejected by the pre-screen get their result without entering the batch.
+    Returns: list of details dicts (same keys as analyze_speech(return_details=True),
+    plus "error" which is None on success)
+    """
+    prepared = []
+    vad_infos = []
+    results = []
+    for audio in waveforms:
+        waveform = load_waveform(audio)
+        total_seconds = waveform.numel() / SAMPLE_RATE
+        
+        energy = None
+        if prescreen or vad == "energy":
+            from vad import speech_energy
+            energy = speech_energy(waveform.numpy())
+        
+        screen = None
+        if prescreen:
+            from prescreen import prescreen_audio
+            screen = prescreen_audio(waveform, energy=energy)
+            if not screen["passed"]:
+                prepared.append(None)
+                vad_infos.append(None)
+                results.append({**_prescreen_rejection(screen, total_seconds), "error": None})
+                continue
+        
+        vad_info = None
+        if vad:
+            from vad import apply_vad
+            waveform, vad_info = apply_vad(waveform, method=vad, energy=energy)
+        if max_duration:
+            waveform = waveform[:int(max_duration * SAMPLE_RATE)]
+        
+        prepared.append(waveform)
+        vad_infos.append(vad_info)
+        results.append({
+            "is_english": False,
+            "language": None,
+            "accent": None,
+            "lang_confidence": None,
+            "accent_confidence": None,
+            "total_seconds": round(total_seconds, 2),
+            "analyzed_seconds": round(waveform.numel() / SAMPLE_RATE, 2),
+            "early_exit": False,
+            "speech_ratio": vad_info["speech_ratio"] if vad_info else None,
+            "vad_segments": vad_info["segments"] if vad_info else None,
+            "language_distribution": None,
+            "accent_distribution": None,
+            "language_segments": None,
+            "accent_segments": None,
+            "timeline": None,
+            "language_method": None,
+            "detector_timings": None,
+            "prescreen": screen,
+            "error": None,
+        })
+    
+    _analyze_prepared(results, prepared, top_k, timeline)
+    # Timelines were computed on the VAD-trimmed audio
+    for result, vad_info in zip(results, vad_infos):
+        _original_times(result, vad_info)
+    return results
+
+
+def _analyze_prepared(results, prepared, top_k=TOP_K, timeline=True):
+    """Model stage of analyze_speech_batch: fills results in place (None in prepared = skipped)"""
+    batched = []
+    for i, waveform in enumerate(prepared):
+        if waveform is None:
+            continue
+        if waveform.numel() / SAMPLE_RATE <= LONG_AUDIO_SECONDS:
+            batched.append(i)
+            continue
+        try:
+            _analyze_windowed(waveform, results[i], top_k)
+            if timeline:
+                results[i]["timeline"] = _windowed_timeline(results[i])
+        except Exception as clip_error:
+            results[i]["error"] = str(clip_error)
+    if not batched:
+        return results
+    
+    breaker = _speechbrain_breaker()
+    if not breaker.allow():
+        print("⏭️ Skipping batched SpeechBrain (circuit open after repeated failures), analyzing clips one by one")
+        return _analyze_clips(results, prepared, batched, top_k, timeline)
+    
+    print(f"📦 Batch analysis of {len(batched)} clip(s)...")
+    try:
+        from detector_strategy import record_timing
+        from ecapa_features import FeatureCache, pad_waveforms
+        
+        clips = [prepared[i] for i in batched]
+        language_cache = FeatureCache(*pad_waveforms(clips))
+        start = time.perf_counter()
+        try:
+            languages = detect_language_speechbrain_batch(clips, return_distribution=True, top_k=top_k,
+                                                          feature_cache=language_cache)
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
+        # One padded pass answers for the whole batch, so every clip reports its time
+        batch_seconds = time.perf_counter() - start
+        english = [i for i, (language, _, _) in zip(batched, languages) if is_english_language(language)]
+        
+        # Timeline languages come from the same padded pass; the accent model also
+        # runs on non-English clips that contain English segments
+        segments = {}
+        if timeline:
+            for item, i in enumerate(batched):
+                spans = timeline_spans(prepared[i].numel())
+                segments[i] = (spans, timeline_languages(language_cache, spans, item))
+        accent_clips = [i for i in batched if i in english or
+                        any(segment["language"] == "English" for segment in segments.get(i, (None, []))[1])]
+        
+        accent_cache = FeatureCache(*pad_waveforms([prepared[i] for i in accent_clips])) if accent_clips else None
+        accents = classify_english_accent_speechbrain_batch(
+            [prepared[i] for i in accent_clips], return_distribution=True, top_k=top_k, feature_cache=accent_cache
+        ) if accent_clips else []
+        
+        for item, i in enumerate(accent_clips):
+            if i in segments:
+                spans, clip_segments = segments[i]
+                timeline_accents(clip_segments, accent_cache, spans, item)
+    except Exception as e:
+        print(f"⚠️ Batched inference failed ({str(e)[:100]}), analyzing clips one by one")
+        return _analyze_clips(results, prepared, batched, top_k, timeline)
+    
+    for i, (language, confidence, distribution) in zip(batched, languages):
+        timings = {}
+        record_timing(timings, "speechbrain", "ok", batch_seconds, (language, confidence))
+        results[i].update(language=language, lang_confidence=confidence, language_distribution=distribution,
+                          language_method="speechbrain", detector_timings=timings)
+    for i, (accent, confidence, distribution) in zip(accent_clips, accents):
+        if i in english:
+            results[i].update(is_english=True, language="English", accent=accent, accent_confidence=confidence,
+                              accent_distribution=distribution)
+    for i, (spans, clip_segments) in segments.items():
+        results[i]["timeline"] = merge_timeline(clip_segments, prepared[i].numel() / SAMPLE_RATE)
+    
+    return results
 
 
 def cleanup_files(*file_paths):
@@ -424,9 +1564,9 @@ def cleanup_cache():
 
 
 # Legacy function for backward compatibility
-def classify_accent(audio_path):
+def classify_accent(audio):
     """Legacy function - now calls the complete analysis"""
-    is_english, language, accent, lang_conf, accent_conf = analyze_speech(audio_path)
+    is_english, language, accent, lang_conf, accent_conf = analyze_speech(audio)
     
     if not is_english:
         return f"Not English (detected: {language})", lang_conf
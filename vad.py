@@ -0,0 +1,178 @@
+"""
+Voice activity detection stage
+Drops silence (and, with the SpeechBrain model, music / hold tones) before
+the audio reaches the classifiers, and reports how much of the clip is speech.
+"""
+import numpy as np
+import torch
+
+from utils import SAMPLE_RATE
+
+
+FRAME_MS = 30
+HOP_MS = 10
+
+# Energy VAD: frames must be this far above the noise floor...
+NOISE_MARGIN_DB = 12.0
+# ...never counts anything below this level as speech...
+ABSOLUTE_FLOOR_DB = -55.0
+# ...and never requires more than (loudest frame - this)
+PEAK_MARGIN_DB = 20.0
+
+MIN_SPEECH_MS = 250
+MIN_SILENCE_MS = 300
+PADDING_MS = 100
+
+# Keep the original audio if less than this much speech is found
+MIN_SPEECH_SECONDS = 1.0
+
+# Frames reduced at a time by frame_energy_db (bounds its temporary memory to a few MB)
+ENERGY_CHUNK_FRAMES = 4096
+
+
+def frame_energy_db(samples, frame_length, hop_length):
+    """
+    RMS energy (dBFS) of overlapping frames. The frames are a strided view
+    reduced ENERGY_CHUNK_FRAMES at a time, so memory stays O(samples)
+    """
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+    power = np.empty(len(frames))
+    for start in range(0, len(frames), ENERGY_CHUNK_FRAMES):
+        chunk = frames[start:start + ENERGY_CHUNK_FRAMES]
+        power[start:start + len(chunk)] = np.einsum("ij,ij->i", chunk, chunk, dtype=np.float64) / frame_length
+    return 20.0 * np.log10(np.sqrt(power) + 1e-10)
+
+
+def _runs(mask):
+    """(start, end) index pairs of consecutive True values"""
+    padded = np.concatenate(([False], mask, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(changes[::2], changes[1::2]))
+
+
+def _clean_segments(segments, num_samples, sample_rate):
+    """Bridge short pauses, drop blips and pad segment edges (all in samples)"""
+    min_silence = int(MIN_SILENCE_MS * sample_rate / 1000)
+    min_speech = int(MIN_SPEECH_MS * sample_rate / 1000)
+    padding = int(PADDING_MS * sample_rate / 1000)
+
+    merged = []
+    for start, end in segments:
+        if merged and start - merged[-1][1] < min_silence:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    cleaned = []
+    for start, end in merged:
+        if end - start < min_speech:
+            continue
+        start, end = max(0, start - padding), min(num_samples, end + padding)
+        if cleaned and start <= cleaned[-1][1]:
+            cleaned[-1] = (cleaned[-1][0], end)
+        else:
+            cleaned.append((start, end))
+    return cleaned
+
+
+def speech_energy(samples, sample_rate=SAMPLE_RATE):
+    """frame_energy_db at FRAME_MS / HOP_MS - computed once per clip and shared by the pre-screen and the VAD"""
+    return frame_energy_db(samples, int(FRAME_MS * sample_rate / 1000), int(HOP_MS * sample_rate / 1000))
+
+
+def energy_speech_segments(samples, sample_rate=SAMPLE_RATE, energy=None):
+    """
+    Speech segments (start, end) in samples, using an adaptive energy threshold
+    energy: speech_energy(samples) if the caller already has it
+    """
+    frame_length = int(FRAME_MS * sample_rate / 1000)
+    hop_length = int(HOP_MS * sample_rate / 1000)
+    if energy is None:
+        energy = speech_energy(samples, sample_rate)
+
+    noise_floor = np.percentile(energy, 10)
+    threshold = max(ABSOLUTE_FLOOR_DB, min(noise_floor + NOISE_MARGIN_DB, energy.max() - PEAK_MARGIN_DB))
+
+    segments = [
+        (int(start * hop_length), int(min(len(samples), (end - 1) * hop_length + frame_length)))
+        for start, end in _runs(energy > threshold)
+    ]
+    return _clean_segments(segments, len(samples), sample_rate)
+
+
+def speechbrain_speech_segments(samples, sample_rate=SAMPLE_RATE):
+    """Speech segments (start, end) in samples from SpeechBrain's CRDNN VAD (rejects music)"""
+    from model_registry import get_vad_model
+
+    vad = get_vad_model()
+    wavs = torch.from_numpy(np.ascontiguousarray(samples)).unsqueeze(0)
+    with torch.no_grad():
+        prob = vad.get_speech_prob_chunk(wavs)
+    prob_th = vad.apply_threshold(prob, activation_th=0.5, deactivation_th=0.25).float()
+    boundaries = vad.get_boundaries(prob_th, output_value="seconds")
+
+    segments = [(int(start * sample_rate), int(end * sample_rate)) for start, end in boundaries.tolist()]
+    return _clean_segments(segments, len(samples), sample_rate)
+
+
+VAD_METHODS = {
+    "energy": energy_speech_segments,
+    "speechbrain": speechbrain_speech_segments,
+}
+
+
+def apply_vad(waveform, method="energy", sample_rate=SAMPLE_RATE, energy=None):
+    """
+    Keep only the speech parts of a waveform (concatenated).
+    energy: speech_energy(waveform) if already computed (used by the energy method)
+    Returns: (speech_waveform, info) where info has speech_ratio, speech_seconds,
+    segments (in seconds), method and trimmed. If almost no speech is found the
+    original waveform is returned (trimmed=False) so the classifiers still get something.
+    """
+    if method not in VAD_METHODS:
+        raise ValueError(f"Unknown VAD method: {method} (available: {', '.join(VAD_METHODS)})")
+
+    is_tensor = torch.is_tensor(waveform)
+    samples = waveform.numpy() if is_tensor else np.asarray(waveform, dtype=np.float32)
+
+    if method == "energy":
+        segments = energy_speech_segments(samples, sample_rate, energy)
+    else:
+        segments = VAD_METHODS[method](samples, sample_rate)
+    speech_samples = int(sum(end - start for start, end in segments))
+    speech_ratio = speech_samples / max(len(samples), 1)
+
+    info = {
+        "method": method,
+        "speech_ratio": round(speech_ratio, 3),
+        "speech_seconds": round(speech_samples / sample_rate, 2),
+        "segments": [(round(start / sample_rate, 2), round(end / sample_rate, 2)) for start, end in segments],
+        "trimmed": False,
+    }
+    print(f"🗣️ VAD ({method}): {speech_ratio:.0%} speech, {len(segments)} segment(s)")
+
+    if speech_samples < MIN_SPEECH_SECONDS * sample_rate:
+        print("⚠️ Almost no speech detected - keeping the original audio")
+        return waveform, info
+
+    speech = np.concatenate([samples[start:end] for start, end in segments])
+    info["trimmed"] = True
+    return (torch.from_numpy(speech) if is_tensor else speech), info
+
+
+def original_time(seconds, segments, end=False):
+    """
+    Map a time in the concatenated speech back to the original recording.
+    segments: info["segments"] of apply_vad. A time on the boundary between two
+    segments maps to the start of the next one, or with end=True to the end of
+    the previous one.
+    """
+    offset = 0.0
+    for start, stop in segments:
+        duration = stop - start
+        if seconds < offset + duration or (end and seconds <= offset + duration):
+            return round(start + seconds - offset, 2)
+        offset += duration
+    return segments[-1][1] if segments else seconds